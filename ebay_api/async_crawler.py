@@ -0,0 +1,236 @@
+"""
+Async crawl engine for the eBay extractors
+Runs many search and item-detail requests concurrently while a token bucket
+keeps the request rate within the eBay call quota
+"""
+
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from urllib.parse import quote
+import logging
+
+import requests
+
+# Shared HTTP client lives in the Django project package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'parts_interchange'))
+from parts_interchange.http_client import HttpClient
+
+logger = logging.getLogger(__name__)
+
+# Browse API page size and result window (offset + limit may not exceed 10000)
+BROWSE_PAGE_LIMIT = 200
+BROWSE_RESULT_WINDOW = 10000
+
+
+class CrawlError(Exception):
+    pass
+
+
+class TokenBucket:
+    """Token bucket rate limiter: `rate` tokens per second, up to `capacity` saved for bursts"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a token is available and take it (callers are served in arrival order)"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncCrawler:
+    """Concurrency-capped, rate-limited execution of blocking HTTP calls
+
+    Calls run on a thread pool so the existing requests-based code can be reused;
+    asyncio provides the fan-out, the token bucket and the concurrency cap. Requests
+    go through an HttpClient (pooled per-host sessions, retry with backoff).
+    """
+
+    def __init__(self,
+                 requests_per_second: float = None,
+                 burst: int = None,
+                 concurrency: int = None,
+                 client: HttpClient = None):
+        self.requests_per_second = requests_per_second or float(os.getenv('EBAY_REQUESTS_PER_SECOND', 5))
+        self.burst = burst or int(os.getenv('EBAY_RATE_BURST', 0)) or None
+        self.concurrency = concurrency or int(os.getenv('EBAY_CRAWL_CONCURRENCY', 8))
+
+        # One keep-alive connection per worker thread
+        self.owns_client = client is None
+        self.client = client or HttpClient(pool_size=self.concurrency)
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='ebay-crawl')
+
+        self.bucket = None
+        self.slots = None
+        self.request_count = 0
+
+    def run(self, main: Callable, *args, **kwargs) -> Any:
+        """Run the coroutine function `main` to completion in a new event loop"""
+        async def runner():
+            # Loop-bound primitives are created per run
+            self.bucket = TokenBucket(self.requests_per_second, self.burst)
+            self.slots = asyncio.Semaphore(self.concurrency)
+            return await main(*args, **kwargs)
+
+        started = time.perf_counter()
+        self.request_count = 0
+        result = asyncio.run(runner())
+        elapsed = time.perf_counter() - started
+        logger.info(f"Crawl finished: {self.request_count} requests in {elapsed:.1f}s "
+                    f"({self.request_count / elapsed if elapsed else 0:.1f}/s)")
+        return result
+
+    async def call(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking call on the pool once a rate token and a concurrency slot are free"""
+        await self.bucket.acquire()
+        async with self.slots:
+            self.request_count += 1
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, partial(func, *args, **kwargs))
+
+    async def map(self, func: Callable, arguments: Iterable[Dict]) -> List[Any]:
+        """call() func once per kwargs dict, concurrently; results keep the input order"""
+        return await asyncio.gather(*(self.call(func, **kwargs) for kwargs in arguments))
+
+    async def for_each(self, func: Callable, arguments: Iterable[Dict], on_result: Callable):
+        """call() func once per kwargs dict, concurrently; each result goes to on_result as soon as it is in"""
+        for result in asyncio.as_completed([self.call(func, **kwargs) for kwargs in arguments]):
+            on_result(await result)
+
+    async def get_json(self, url: str, **kwargs) -> Optional[Dict]:
+        """Rate-limited GET returning the decoded JSON body, or None on any request error"""
+        return await self.call(self._get_json, url, **kwargs)
+
+    def _get_json(self, url: str, **kwargs) -> Optional[Dict]:
+        try:
+            return self.client.get_json(url, **kwargs)
+        except (requests.RequestException, ValueError) as e:
+            logger.error(f"GET {url} failed: {e}")
+            return None
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        if self.owns_client:
+            self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class BrowseCrawler(AsyncCrawler):
+    """Concurrent Browse API crawl: all search pages, then item details, then parsing
+
+    Reuses the OAuth token, request parameters and parsing of an EbayBrowseExtractor.
+    """
+
+    def __init__(self, extractor, **kwargs):
+        super().__init__(**kwargs)
+        self.extractor = extractor
+
+    async def search(self,
+                     query: str,
+                     category_id: str = "33654",
+                     max_results: int = 50,
+                     raise_on_error: bool = False) -> List[Dict]:
+        """Item summaries for one query; pages after the first are fetched concurrently.
+
+        A failed first page returns [] (or raises CrawlError with raise_on_error).
+        """
+        max_results = min(max_results, BROWSE_RESULT_WINDOW)
+        limit = min(max_results, BROWSE_PAGE_LIMIT)
+
+        first = await self.search_page(query, category_id, limit)
+        if first is None and raise_on_error:
+            raise CrawlError(f"Search failed for: {query}")
+        if not first:
+            return []
+        items = first.get('itemSummaries', [])
+        total = min(first.get('total', len(items)), max_results)
+
+        pages = await asyncio.gather(*(
+            self.search_page(query, category_id, min(limit, total - offset), offset)
+            for offset in range(limit, total, limit)
+        ))
+        for page in pages:
+            if page:
+                items.extend(page.get('itemSummaries', []))
+
+        logger.info(f"Found {len(items)} items for: {query}")
+        return items[:max_results]
+
+    async def search_page(self, query: str, category_id: str, limit: int, offset: int = 0) -> Optional[Dict]:
+        """One item_summary/search response, or None if the request failed"""
+        return await self.get_json(
+            f"{self.extractor.browse_url}/item_summary/search",
+            headers=self.extractor.api_headers(),
+            params=self.extractor.search_params(query, category_id, limit, offset)
+        )
+
+    async def item_details(self, item_id: str) -> Optional[Dict]:
+        url = f"{self.extractor.browse_url}/item/{quote(item_id, safe='')}"
+        return await self.get_json(url, headers=self.extractor.api_headers())
+
+    async def crawl(self,
+                    queries: List[str],
+                    category_id: str = "33654",
+                    max_results_per_query: int = 50,
+                    fetch_details: bool = False,
+                    on_part: Callable = None) -> List:
+        """Search every query concurrently and parse the unique items into EbayBrowseParts
+
+        Each query's items are parsed as soon as its pages (and details) are in.
+        With on_part, every part is passed to it then instead of being collected,
+        so the crawl holds no more than one query's items; the result is empty.
+        """
+        # Fetch the OAuth token once before fanning out
+        await self.call(self.extractor.get_access_token)
+
+        seen = set()
+        parts = []
+        for search in asyncio.as_completed([
+            self.search(query, category_id, max_results_per_query) for query in queries
+        ]):
+            items = {}
+            for item in await search:
+                item_id = item.get('itemId', '')
+                if item_id not in seen:
+                    seen.add(item_id)
+                    items[item_id] = item
+
+            if fetch_details:
+                details = await asyncio.gather(*(self.item_details(item_id) for item_id in items))
+                for item_id, detail in zip(list(items), details):
+                    if detail:
+                        items[item_id] = {**items[item_id], **detail}
+
+            for item in items.values():
+                part = self.extractor.parse_browse_item(item)
+                if part is None:
+                    continue
+                if on_part:
+                    on_part(part)
+                else:
+                    parts.append(part)
+        return parts
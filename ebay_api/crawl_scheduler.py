@@ -0,0 +1,438 @@
+"""
+Query-matrix crawl scheduler for the eBay Browse API
+Expands a matrix of (category, make, model, year range, keywords) into crawl jobs,
+runs the stalest and most productive jobs first across concurrent workers, and
+appends parts to a JSONL file page by page
+
+Crawls are resumable: every finished page is checkpointed, so a rerun after a
+crash only fetches the pages a job is missing. Items whose price, title and
+compatibility are unchanged since they were last written are skipped before
+parsing, and so are items a job already rejected (unparseable, or outside its
+make/model/years) at the same content, so a nightly crawl only parses and
+emits new and changed listings.
+
+Usage:
+    python crawl_scheduler.py crawl_matrix.example.json --workers 4 --window-minutes 360
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from itertools import product
+from typing import Dict, List, Optional
+import logging
+
+from async_crawler import BROWSE_PAGE_LIMIT, BROWSE_RESULT_WINDOW, BrowseCrawler, CrawlError
+from ebay_browse_extractor import EbayBrowseExtractor
+from jsonl_records import JsonlWriter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_PATH = os.path.join(os.path.dirname(__file__), 'crawl_state.db')
+CHECKPOINT_MAX_AGE = 24 * 3600  # Older checkpoints are discarded and the job starts over
+SQLITE_BATCH_SIZE = 500  # Stays under SQLite's bound parameter limit
+
+
+@dataclass(frozen=True)
+class CrawlJob:
+    """One search: a keyword query for a make/model and year range in an eBay category"""
+    category_id: str
+    make: str
+    model: str
+    year_start: int
+    year_end: int
+    keywords: str
+    max_results: int = 200
+    part_category: Optional[str] = None  # Overrides EbayBrowsePart.category
+
+    @property
+    def key(self) -> str:
+        return f"{self.category_id}|{self.make}|{self.model}|{self.year_start}-{self.year_end}|{self.keywords}"
+
+    @property
+    def query(self) -> str:
+        return f"{self.make} {self.model} {self.keywords}"
+
+    def matches(self, part) -> bool:
+        """Keep parts naming the make whose extracted fitments (if any) overlap the year range"""
+        if self.make.lower() not in part.title.lower() and part.manufacturer != self.make:
+            return False
+        if not part.fitments:
+            return True
+        return any(self.year_start <= fitment['year'] <= self.year_end for fitment in part.fitments)
+
+
+def load_matrix(path: str) -> List[CrawlJob]:
+    """Expand a JSON matrix file into crawl jobs.
+
+    Each entry has category_id, make, models (list), years ([start, end]) and
+    keywords (list), plus optional max_results and part_category; every
+    model x keywords combination becomes one job.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        matrix = json.load(f)
+
+    jobs = []
+    for entry in matrix:
+        year_start, year_end = entry['years']
+        for model, keywords in product(entry['models'], entry['keywords']):
+            jobs.append(CrawlJob(
+                category_id=str(entry['category_id']),
+                make=entry['make'],
+                model=model,
+                year_start=int(year_start),
+                year_end=int(year_end),
+                keywords=keywords,
+                max_results=int(entry.get('max_results', 200)),
+                part_category=entry.get('part_category'),
+            ))
+    return list(dict.fromkeys(jobs))  # Drop duplicates, keep order
+
+
+def item_content_hash(item: Dict) -> str:
+    """Hash of the item summary fields that matter downstream: price, title and compatibility"""
+    price = item.get('price') or {}
+    content = [
+        price.get('value'), price.get('currency'), item.get('title'),
+        item.get('compatibilityMatch'), item.get('compatibilityProperties'),
+    ]
+    return hashlib.sha1(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
+class CrawlStateStore:
+    """Local SQLite crawl state: per-job run history (for scheduling), pagination
+    checkpoints of unfinished jobs, the content hash of every item written, and
+    per job the content hash of every item it did not keep"""
+
+    def __init__(self, path: str = DEFAULT_STATE_PATH):
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS crawl_jobs (
+                job_key TEXT PRIMARY KEY,
+                last_run_at REAL NOT NULL,
+                last_items INTEGER NOT NULL,
+                last_kept INTEGER NOT NULL,
+                runs INTEGER NOT NULL DEFAULT 1,
+                last_error TEXT
+            );
+            CREATE TABLE IF NOT EXISTS crawl_checkpoints (
+                job_key TEXT PRIMARY KEY,
+                total INTEGER NOT NULL,
+                started_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS crawl_pages (
+                job_key TEXT NOT NULL,
+                page_offset INTEGER NOT NULL,
+                PRIMARY KEY (job_key, page_offset)
+            );
+            CREATE TABLE IF NOT EXISTS seen_items (
+                item_id TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL
+            );
+            -- Another job's make/model/years may match an item, so rejections are per job
+            CREATE TABLE IF NOT EXISTS rejected_items (
+                job_key TEXT NOT NULL,
+                item_id TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                last_seen REAL NOT NULL,
+                PRIMARY KEY (job_key, item_id)
+            );
+        """)
+        self.connection.commit()
+
+    def job_stats(self) -> Dict[str, Dict]:
+        rows = self.connection.execute(
+            "SELECT job_key, last_run_at, last_items, last_kept, runs, last_error FROM crawl_jobs"
+        )
+        return {
+            key: {'last_run_at': run_at, 'last_items': items, 'last_kept': kept, 'runs': runs, 'last_error': error}
+            for key, run_at, items, kept, runs, error in rows
+        }
+
+    def record_run(self, job: CrawlJob, items: int, kept: int, error: str = None):
+        self.connection.execute("""
+            INSERT INTO crawl_jobs (job_key, last_run_at, last_items, last_kept, last_error)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (job_key) DO UPDATE SET
+                last_run_at = excluded.last_run_at, last_items = excluded.last_items,
+                last_kept = excluded.last_kept, last_error = excluded.last_error, runs = runs + 1
+        """, (job.key, time.time(), items, kept, error))
+        if error is None:
+            self.connection.execute("DELETE FROM crawl_checkpoints WHERE job_key = ?", (job.key,))
+            self.connection.execute("DELETE FROM crawl_pages WHERE job_key = ?", (job.key,))
+        self.connection.commit()
+
+    def checkpoint(self, job: CrawlJob, max_age: float = CHECKPOINT_MAX_AGE) -> Optional[Dict]:
+        """{'total', 'offsets'} of an unfinished run of the job, or None (stale checkpoints are dropped)"""
+        row = self.connection.execute(
+            "SELECT total, started_at FROM crawl_checkpoints WHERE job_key = ?", (job.key,)
+        ).fetchone()
+        if row is None:
+            return None
+        total, started_at = row
+        if time.time() - started_at > max_age:
+            self.connection.execute("DELETE FROM crawl_checkpoints WHERE job_key = ?", (job.key,))
+            self.connection.execute("DELETE FROM crawl_pages WHERE job_key = ?", (job.key,))
+            self.connection.commit()
+            return None
+        offsets = {
+            offset for offset, in
+            self.connection.execute("SELECT page_offset FROM crawl_pages WHERE job_key = ?", (job.key,))
+        }
+        return {'total': total, 'offsets': offsets}
+
+    def start_checkpoint(self, job: CrawlJob, total: int):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO crawl_checkpoints (job_key, total, started_at) VALUES (?, ?, ?)",
+            (job.key, total, time.time())
+        )
+        self.connection.execute("DELETE FROM crawl_pages WHERE job_key = ?", (job.key,))
+        self.connection.commit()
+
+    def complete_page(self, job: CrawlJob, offset: int, written: Dict[str, str], rejected: Dict[str, str] = None):
+        """Checkpoint a page and remember the content hashes of the items it wrote and rejected, atomically"""
+        now = time.time()
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR IGNORE INTO crawl_pages (job_key, page_offset) VALUES (?, ?)", (job.key, offset)
+            )
+            self.connection.executemany("""
+                INSERT INTO seen_items (item_id, content_hash, first_seen, last_seen) VALUES (?, ?, ?, ?)
+                ON CONFLICT (item_id) DO UPDATE SET content_hash = excluded.content_hash, last_seen = excluded.last_seen
+            """, [(item_id, content_hash, now, now) for item_id, content_hash in written.items()])
+            self.connection.executemany("""
+                INSERT INTO rejected_items (job_key, item_id, content_hash, last_seen) VALUES (?, ?, ?, ?)
+                ON CONFLICT (job_key, item_id) DO UPDATE SET
+                    content_hash = excluded.content_hash, last_seen = excluded.last_seen
+            """, [(job.key, item_id, content_hash, now) for item_id, content_hash in (rejected or {}).items()])
+            self.connection.executemany(
+                "DELETE FROM rejected_items WHERE job_key = ? AND item_id = ?", [(job.key, item_id) for item_id in written]
+            )
+
+    def seen_hashes(self, item_ids: List[str]) -> Dict[str, str]:
+        """Stored content hash of each item id already written"""
+        return self._hashes("SELECT item_id, content_hash FROM seen_items WHERE item_id IN ({})", [], item_ids)
+
+    def rejected_hashes(self, job: CrawlJob, item_ids: List[str]) -> Dict[str, str]:
+        """Stored content hash of each item id the job did not keep"""
+        return self._hashes(
+            "SELECT item_id, content_hash FROM rejected_items WHERE job_key = ? AND item_id IN ({})", [job.key], item_ids
+        )
+
+    def _hashes(self, query: str, params: List, item_ids: List[str]) -> Dict[str, str]:
+        hashes = {}
+        for start in range(0, len(item_ids), SQLITE_BATCH_SIZE):
+            batch = item_ids[start:start + SQLITE_BATCH_SIZE]
+            hashes.update(self.connection.execute(query.format(', '.join('?' * len(batch))), params + batch))
+        return hashes
+
+    def close(self):
+        self.connection.close()
+
+
+def job_priority(stats: Optional[Dict], now: float) -> float:
+    """Hours since the last run, weighted up by how many parts the last run kept.
+
+    Jobs that never ran (or failed last time) come first.
+    """
+    if stats is None or stats['last_error']:
+        return math.inf
+    age_hours = max(now - stats['last_run_at'], 0) / 3600
+    return age_hours * (1 + math.log1p(stats['last_kept']))
+
+
+def prioritize(jobs: List[CrawlJob], stats: Dict[str, Dict], now: float = None) -> List[CrawlJob]:
+    now = time.time() if now is None else now
+    return sorted(jobs, key=lambda job: job_priority(stats.get(job.key), now), reverse=True)
+
+
+class CrawlScheduler:
+    """Run prioritized crawl jobs on concurrent workers sharing one rate-limited crawler"""
+
+    def __init__(self,
+                 crawler: BrowseCrawler,
+                 state: CrawlStateStore,
+                 output_path: str,
+                 workers: int = 4,
+                 window_seconds: float = None,
+                 max_jobs: int = None,
+                 full: bool = False):
+        self.crawler = crawler
+        self.state = state
+        self.output_path = output_path
+        self.workers = workers
+        self.window_seconds = window_seconds
+        self.max_jobs = max_jobs
+        self.full = full  # Ignore checkpoints and re-emit unchanged items
+        self.totals = {
+            'jobs_run': 0, 'jobs_resumed': 0, 'jobs_failed': 0, 'jobs_skipped': 0,
+            'pages': 0, 'items': 0, 'items_unchanged': 0, 'parts_written': 0,
+        }
+
+    def run(self, jobs: List[CrawlJob]) -> Dict:
+        jobs = prioritize(jobs, self.state.job_stats())
+        if self.max_jobs is not None:
+            self.totals['jobs_skipped'] += max(len(jobs) - self.max_jobs, 0)
+            jobs = jobs[:self.max_jobs]
+        started = time.perf_counter()
+        self.crawler.run(self.run_jobs, jobs)
+        self.totals['elapsed_seconds'] = round(time.perf_counter() - started, 2)
+        logger.info(f"Crawl schedule finished: {self.totals}")
+        return self.totals
+
+    async def run_jobs(self, jobs: List[CrawlJob]):
+        # Fetch the OAuth token once before fanning out
+        await self.crawler.call(self.crawler.extractor.get_access_token)
+
+        queue = asyncio.Queue()
+        for job in jobs:
+            queue.put_nowait(job)
+        deadline = time.monotonic() + self.window_seconds if self.window_seconds else None
+
+        with JsonlWriter(self.output_path) as output:
+            await asyncio.gather(*(self.worker(queue, output, deadline) for _ in range(self.workers)))
+
+    async def worker(self, queue: asyncio.Queue, output: JsonlWriter, deadline: Optional[float]):
+        while not queue.empty():
+            job = queue.get_nowait()
+            if deadline and time.monotonic() >= deadline:
+                self.totals['jobs_skipped'] += 1  # Crawl window is over; the job stays stale for next time
+                continue
+            await self.run_job(job, output)
+
+    async def run_job(self, job: CrawlJob, output: JsonlWriter):
+        """Fetch the job's missing pages concurrently; finish the job once every page is done"""
+        counts = {'items': 0, 'kept': 0}
+        max_results = min(job.max_results, BROWSE_RESULT_WINDOW)
+        limit = min(max_results, BROWSE_PAGE_LIMIT)
+        try:
+            checkpoint = None if self.full else self.state.checkpoint(job)
+            if checkpoint is None:
+                first = await self.crawler.search_page(job.query, job.category_id, limit)
+                if first is None:
+                    raise CrawlError(f"Search failed for: {job.query}")
+                total = min(first.get('total', 0), max_results)
+                self.state.start_checkpoint(job, total)
+                self.handle_page(job, 0, first, output, counts)
+                done = {0}
+            else:
+                self.totals['jobs_resumed'] += 1
+                total, done = checkpoint['total'], checkpoint['offsets']
+                logger.info(f"{job.key}: resuming with {len(done)} pages already done")
+
+            pending = [offset for offset in range(limit, total, limit) if offset not in done]
+            pages = await asyncio.gather(*(
+                self.crawler.search_page(job.query, job.category_id, min(limit, total - offset), offset)
+                for offset in pending
+            ))
+            for offset, page in zip(pending, pages):
+                if page is not None:
+                    self.handle_page(job, offset, page, output, counts)
+            failed = sum(1 for page in pages if page is None)
+            if failed:
+                raise CrawlError(f"{failed} of {len(pending)} pages failed; they are retried on the next run")
+        except Exception as e:
+            logger.error(f"Crawl job {job.key} failed: {e}")
+            self.totals['jobs_failed'] += 1
+            self.state.record_run(job, counts['items'], counts['kept'], error=str(e))
+            return
+
+        self.state.record_run(job, counts['items'], counts['kept'])
+        self.totals['jobs_run'] += 1
+        logger.info(f"{job.key}: {counts['kept']} new or changed parts from {counts['items']} items")
+
+    def handle_page(self, job: CrawlJob, offset: int, page: Dict, output: JsonlWriter, counts: Dict):
+        """Write the page's new and changed matching parts, then checkpoint the page"""
+        items = page.get('itemSummaries', [])
+        hashes = {item.get('itemId', ''): item_content_hash(item) for item in items}
+        if self.full:
+            seen = rejected_before = {}
+        else:
+            seen = self.state.seen_hashes(list(hashes))
+            rejected_before = self.state.rejected_hashes(job, list(hashes))
+
+        written = {}
+        rejected = {}  # Unparseable, or outside the job's make/model/years
+        for item in items:
+            item_id = item.get('itemId', '')
+            content_hash = hashes[item_id]
+            if (item_id in written or item_id in rejected or seen.get(item_id) == content_hash
+                    or rejected_before.get(item_id) == content_hash):
+                self.totals['items_unchanged'] += 1
+                continue
+            part = self.crawler.extractor.parse_browse_item(item)
+            if part and job.matches(part):
+                if job.part_category:
+                    part.category = job.part_category
+                output.write({**asdict(part), 'crawl_job': job.key})
+                written[item_id] = content_hash
+            else:
+                rejected[item_id] = content_hash
+
+        # Flush before checkpointing, so a checkpointed page is always on disk
+        output.flush()
+        self.state.complete_page(job, offset, written, rejected)
+
+        counts['items'] += len(items)
+        counts['kept'] += len(written)
+        self.totals['pages'] += 1
+        self.totals['items'] += len(items)
+        self.totals['parts_written'] += len(written)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crawl eBay for a matrix of category/make/model/year/keyword jobs')
+    parser.add_argument('matrix', help='JSON matrix file (see crawl_matrix.example.json)')
+    parser.add_argument('--output', help='JSONL file to append parts to (default: ebay_crawl_<timestamp>.jsonl)')
+    parser.add_argument('--state', default=DEFAULT_STATE_PATH, help='SQLite job history (default: crawl_state.db)')
+    parser.add_argument('--workers', type=int, default=4, help='Jobs crawled concurrently (default: 4)')
+    parser.add_argument('--window-minutes', type=float, help='Stop starting new jobs after this many minutes')
+    parser.add_argument('--max-jobs', type=int, help='Run at most this many of the highest-priority jobs')
+    parser.add_argument('--full', action='store_true',
+                        help='Ignore checkpoints and write unchanged items again (default: resume, skip unchanged)')
+    args = parser.parse_args()
+
+    client_id = os.getenv('EBAY_APP_ID')
+    client_secret = os.getenv('EBAY_CERT_ID')
+    if not client_id or not client_secret:
+        print("Error: eBay credentials not found")
+        print("Need: EBAY_APP_ID and EBAY_CERT_ID")
+        return
+
+    output = args.output or os.path.join(
+        os.path.dirname(__file__), f"ebay_crawl_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+    )
+    jobs = load_matrix(args.matrix)
+    print(f"Loaded {len(jobs)} crawl jobs from {args.matrix}")
+
+    state = CrawlStateStore(args.state)
+    extractor = EbayBrowseExtractor(client_id, client_secret)
+    with BrowseCrawler(extractor) as crawler:
+        scheduler = CrawlScheduler(
+            crawler, state, output,
+            workers=args.workers,
+            window_seconds=args.window_minutes * 60 if args.window_minutes else None,
+            max_jobs=args.max_jobs,
+            full=args.full,
+        )
+        totals = scheduler.run(jobs)
+    state.close()
+
+    print(f"Jobs run: {totals['jobs_run']} ({totals['jobs_resumed']} resumed), "
+          f"failed: {totals['jobs_failed']}, skipped: {totals['jobs_skipped']}")
+    print(f"Pages: {totals['pages']}, items found: {totals['items']}, unchanged: {totals['items_unchanged']}")
+    print(f"New or changed parts written: {totals['parts_written']} to {output}")
+    print(f"Elapsed: {totals['elapsed_seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,54 +4,82 @@ Analyzes and displays extracted eBay parts data
 """
 
 import os
-import json
 import csv
 import pandas as pd
-from typing import List, Dict
+from typing import Dict, Iterable, Iterator
 from collections import Counter
+from itertools import islice
+
+from jsonl_records import DATA_FILE_EXTENSIONS, DATA_FILE_PREFIXES, iter_records
 
 def find_data_files():
-    """Find all eBay data files in the current directory"""
-    json_files = [f for f in os.listdir('.') if f.startswith('ebay_acura_ac_parts_') and f.endswith('.json')]
-    csv_files = [f for f in os.listdir('.') if f.startswith('ebay_acura_ac_parts_') and f.endswith('.csv')]
+    """Find all eBay data files in the current directory, oldest first"""
+    json_files = [f for f in os.listdir('.') if f.startswith(DATA_FILE_PREFIXES) and f.endswith(DATA_FILE_EXTENSIONS)]
+    csv_files = [f for f in os.listdir('.') if f.startswith(DATA_FILE_PREFIXES) and f.endswith('.csv')]
     
-    return sorted(json_files), sorted(csv_files)
+    return sorted(json_files, key=os.path.getmtime), sorted(csv_files, key=os.path.getmtime)
 
-def load_json_data(filename: str) -> List[Dict]:
-    """Load parts data from JSON file"""
+def load_json_data(filename: str) -> Iterator[Dict]:
+    """Stream parts data from a JSONL (or legacy JSON array) file, one part at a time
+    
+    Each analysis below makes a single pass, so call this again for every pass.
+    """
     try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        yield from iter_records(filename)
     except Exception as e:
         print(f"Error loading {filename}: {e}")
-        return []
 
-def analyze_data(parts_data: List[Dict]):
-    """Analyze the extracted parts data"""
-    if not parts_data:
+def analyze_data(parts_data: Iterable[Dict]):
+    """Analyze the extracted parts data in one pass"""
+    total = 0
+    price_count, price_sum = 0, 0.0
+    min_price = max_price = None
+    condition_counts = Counter()
+    mfg_counts = Counter()
+    name_counts = Counter()
+    part_numbers = 0
+    total_fitments = 0
+    parts_with_fitments = 0
+    
+    for part in parts_data:
+        total += 1
+        price = part.get('price') or 0
+        if price > 0:
+            price_count += 1
+            price_sum += price
+            min_price = price if min_price is None else min(min_price, price)
+            max_price = price if max_price is None else max(max_price, price)
+        condition_counts[part.get('condition', 'Unknown')] += 1
+        if part.get('manufacturer'):
+            mfg_counts[part['manufacturer']] += 1
+        if part.get('part_number'):
+            part_numbers += 1
+        if part.get('part_name'):
+            name_counts[part['part_name']] += 1
+        fitments = part.get('fitments') or []
+        total_fitments += len(fitments)
+        if fitments:
+            parts_with_fitments += 1
+    
+    if not total:
         print("No data to analyze")
         return
     
-    print(f"Data Analysis for {len(parts_data)} parts:")
+    print(f"Data Analysis for {total} parts:")
     print("=" * 50)
     
     # Basic statistics
-    prices = [part['price'] for part in parts_data if part.get('price', 0) > 0]
-    if prices:
-        print(f"Price Range: ${min(prices):.2f} - ${max(prices):.2f}")
-        print(f"Average Price: ${sum(prices)/len(prices):.2f}")
+    if price_count:
+        print(f"Price Range: ${min_price:.2f} - ${max_price:.2f}")
+        print(f"Average Price: ${price_sum/price_count:.2f}")
     
     # Conditions
-    conditions = [part.get('condition', 'Unknown') for part in parts_data]
-    condition_counts = Counter(conditions)
     print(f"\nConditions:")
     for condition, count in condition_counts.most_common():
         print(f"  {condition}: {count}")
     
     # Manufacturers
-    manufacturers = [part.get('manufacturer') for part in parts_data if part.get('manufacturer')]
-    if manufacturers:
-        mfg_counts = Counter(manufacturers)
+    if mfg_counts:
         print(f"\nManufacturers:")
         for mfg, count in mfg_counts.most_common():
             print(f"  {mfg}: {count}")
@@ -59,39 +87,36 @@ def analyze_data(parts_data: List[Dict]):
         print(f"\nManufacturers: None extracted")
     
     # Part numbers found
-    part_numbers = [part.get('part_number') for part in parts_data if part.get('part_number')]
-    print(f"\nPart Numbers: {len(part_numbers)} found out of {len(parts_data)} listings")
+    print(f"\nPart Numbers: {part_numbers} found out of {total} listings")
     
     # Part names
-    part_names = [part.get('part_name') for part in parts_data if part.get('part_name')]
-    if part_names:
-        name_counts = Counter(part_names)
+    if name_counts:
         print(f"\nPart Names:")
         for name, count in name_counts.most_common():
             print(f"  {name}: {count}")
     
     # Fitments
-    total_fitments = sum(len(part.get('fitments', [])) for part in parts_data)
-    parts_with_fitments = sum(1 for part in parts_data if part.get('fitments'))
     print(f"\nFitments: {total_fitments} total, {parts_with_fitments} listings have fitment data")
     
     # Data completeness
     print(f"\nData Completeness:")
-    fields_to_check = ['part_name', 'part_number', 'manufacturer', 'fitments']
-    for field in fields_to_check:
-        if field == 'fitments':
-            count = sum(1 for part in parts_data if part.get(field))
-        else:
-            count = sum(1 for part in parts_data if part.get(field))
-        percentage = (count / len(parts_data)) * 100
-        print(f"  {field}: {count}/{len(parts_data)} ({percentage:.1f}%)")
+    field_counts = {
+        'part_name': sum(name_counts.values()),
+        'part_number': part_numbers,
+        'manufacturer': sum(mfg_counts.values()),
+        'fitments': parts_with_fitments,
+    }
+    for field, count in field_counts.items():
+        percentage = (count / total) * 100
+        print(f"  {field}: {count}/{total} ({percentage:.1f}%)")
 
-def show_sample_parts(parts_data: List[Dict], count: int = 5):
-    """Show sample parts with extracted data"""
-    print(f"\nSample Parts (showing {min(count, len(parts_data))}):")
+def show_sample_parts(parts_data: Iterable[Dict], count: int = 5):
+    """Show sample parts with extracted data (reads only the first `count` parts)"""
+    samples = list(islice(parts_data, count))
+    print(f"\nSample Parts (showing {len(samples)}):")
     print("=" * 80)
     
-    for i, part in enumerate(parts_data[:count], 1):
+    for i, part in enumerate(samples, 1):
         print(f"\n{i}. {part.get('title', 'No title')[:70]}...")
         print(f"   Price: ${part.get('price', 0):.2f}")
         if part.get('shipping_cost'):
@@ -113,75 +138,80 @@ def show_sample_parts(parts_data: List[Dict], count: int = 5):
         
         print(f"   URL: {part.get('item_url', '')}")
 
-def show_fitments_analysis(parts_data: List[Dict]):
-    """Analyze vehicle fitments found in the data"""
+def show_fitments_analysis(parts_data: Iterable[Dict]):
+    """Analyze vehicle fitments found in the data in one pass"""
     print(f"\nFitments Analysis:")
     print("=" * 50)
     
-    all_fitments = []
+    fitment_count = 0
+    min_year = max_year = None
+    make_counts = Counter()
+    model_counts = Counter()
+    ymm_counts = Counter()
     for part in parts_data:
-        all_fitments.extend(part.get('fitments', []))
+        for f in part.get('fitments') or []:
+            fitment_count += 1
+            year = f.get('year')
+            if year:
+                min_year = year if min_year is None else min(min_year, year)
+                max_year = year if max_year is None else max(max_year, year)
+            if f.get('make'):
+                make_counts[f['make']] += 1
+            if f.get('model'):
+                model_counts[f['model']] += 1
+            if year and f.get('make') and f.get('model'):
+                ymm_counts[f"{year} {f['make']} {f['model']}"] += 1
     
-    if not all_fitments:
+    if not fitment_count:
         print("No fitments found in the data")
         return
     
     # Years covered
-    years = [f.get('year') for f in all_fitments if f.get('year')]
-    if years:
-        print(f"Year Range: {min(years)} - {max(years)}")
+    if min_year is not None:
+        print(f"Year Range: {min_year} - {max_year}")
     
     # Makes
-    makes = [f.get('make') for f in all_fitments if f.get('make')]
-    make_counts = Counter(makes)
     print(f"\nMakes:")
     for make, count in make_counts.most_common():
         print(f"  {make}: {count} fitments")
     
     # Models
-    models = [f.get('model') for f in all_fitments if f.get('model')]
-    model_counts = Counter(models)
     print(f"\nTop Models:")
     for model, count in model_counts.most_common(10):
         print(f"  {model}: {count} fitments")
     
     # Year-Make-Model combinations
-    ymm_combinations = []
-    for f in all_fitments:
-        if f.get('year') and f.get('make') and f.get('model'):
-            ymm_combinations.append(f"{f['year']} {f['make']} {f['model']}")
-    
-    ymm_counts = Counter(ymm_combinations)
     print(f"\nTop Year-Make-Model Combinations:")
     for ymm, count in ymm_counts.most_common(10):
         print(f"  {ymm}: {count} listings")
 
-def export_summary_csv(parts_data: List[Dict], filename: str = None):
-    """Export a summary CSV with key information"""
+def export_summary_csv(parts_data: Iterable[Dict], filename: str = None):
+    """Export a summary CSV with key information, one row per part as it is read"""
     if filename is None:
         filename = "ebay_parts_summary.csv"
     
-    summary_data = []
-    for part in parts_data:
-        summary_data.append({
-            'ebay_id': part.get('ebay_item_id', ''),
-            'title': part.get('title', '')[:100],  # Truncate long titles
-            'price': part.get('price', 0),
-            'condition': part.get('condition', ''),
-            'part_name': part.get('part_name', ''),
-            'part_number': part.get('part_number', ''),
-            'manufacturer': part.get('manufacturer', ''),
-            'fitments_count': len(part.get('fitments', [])),
-            'seller': part.get('seller_username', ''),
-            'feedback': part.get('seller_feedback_score', 0),
-            'url': part.get('item_url', '')
-        })
+    fieldnames = [
+        'ebay_id', 'title', 'price', 'condition', 'part_name', 'part_number',
+        'manufacturer', 'fitments_count', 'seller', 'feedback', 'url'
+    ]
     
     with open(filename, 'w', newline='', encoding='utf-8') as f:
-        if summary_data:
-            writer = csv.DictWriter(f, fieldnames=summary_data[0].keys())
-            writer.writeheader()
-            writer.writerows(summary_data)
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for part in parts_data:
+            writer.writerow({
+                'ebay_id': part.get('ebay_item_id', ''),
+                'title': part.get('title', '')[:100],  # Truncate long titles
+                'price': part.get('price', 0),
+                'condition': part.get('condition', ''),
+                'part_name': part.get('part_name', ''),
+                'part_number': part.get('part_number', ''),
+                'manufacturer': part.get('manufacturer', ''),
+                'fitments_count': len(part.get('fitments', [])),
+                'seller': part.get('seller_username', ''),
+                'feedback': part.get('seller_feedback_score', 0),
+                'url': part.get('item_url', '')
+            })
     
     print(f"\nSummary exported to: {filename}")
 
@@ -195,10 +225,10 @@ def main():
     
     if not json_files:
         print("No eBay data files found in current directory.")
-        print("Expected files starting with 'ebay_acura_ac_parts_' and ending with '.json'")
+        print(f"Expected files starting with one of {', '.join(DATA_FILE_PREFIXES)} and ending with .jsonl or .json")
         return
     
-    print(f"\nFound {len(json_files)} JSON data files:")
+    print(f"\nFound {len(json_files)} JSONL/JSON data files:")
     for i, filename in enumerate(json_files, 1):
         file_size = os.path.getsize(filename) / 1024  # KB
         print(f"  {i}. {filename} ({file_size:.1f} KB)")
@@ -218,23 +248,21 @@ def main():
         
         print(f"Using: {selected_file}")
     
-    # Load and analyze data
-    parts_data = load_json_data(selected_file)
-    
-    if not parts_data:
+    # Each analysis streams the file again, so memory use does not grow with file size
+    if next(load_json_data(selected_file), None) is None:
         print("No data found in file or error loading data.")
         return
     
     # Run analysis
-    analyze_data(parts_data)
-    show_sample_parts(parts_data)
-    show_fitments_analysis(parts_data)
+    analyze_data(load_json_data(selected_file))
+    show_sample_parts(load_json_data(selected_file))
+    show_fitments_analysis(load_json_data(selected_file))
     
     # Ask about exporting summary
     print("\n" + "=" * 50)
     export_choice = input("Export summary CSV? (y/n): ").lower()
     if export_choice in ['y', 'yes']:
-        export_summary_csv(parts_data)
+        export_summary_csv(load_json_data(selected_file))
     
     print("\nAnalysis complete!")
 
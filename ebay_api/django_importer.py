@@ -5,9 +5,8 @@ Imports eBay parts data into the Parts Matrix Django database
 
 import os
 import sys
-import json
 import django
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 
 # Add the project root to the path
@@ -20,20 +19,41 @@ django.setup()
 
 # Import Django models
 from django.db import transaction
+from django.utils import timezone
 from apps.parts.models import Part, Manufacturer, PartCategory
+from apps.parts.normalization import normalize_name
 from apps.vehicles.models import Vehicle, Make, Model, Engine, Trim
 from apps.fitments.models import Fitment
 
+from jsonl_records import DATA_FILE_EXTENSIONS, DATA_FILE_PREFIXES, iter_records
+
+PROGRESS_INTERVAL = 100
+BATCH_SIZE = 1000
+EBAY_PART_PREFIX = 'EBAY-'
+IMPORTED_BY = 'ebay_importer'
+PART_NUMBER_MAX_LENGTH = Part._meta.get_field('part_number').max_length
+
 
 class EbayDjangoImporter:
-    """Import eBay parts data into Django database"""
+    """Import eBay parts data into Django database
     
-    def __init__(self):
+    Bulk imports (the default for import_from_json) load the manufacturer, eBay part and
+    vehicle natural keys into memory once, resolve each batch of records against them
+    without queries, and write the batch with bulk_create/bulk_update in one transaction.
+    """
+    
+    def __init__(self, batch_size: int = BATCH_SIZE):
         self.created_parts = 0
         self.updated_parts = 0
         self.created_fitments = 0
         self.skipped_parts = 0
         self.errors = []
+        self.batch_size = batch_size
+        
+        # Natural-key lookup maps for bulk imports, filled by load_lookups()
+        self.manufacturer_ids: Dict[str, int] = {}  # name -> id
+        self.part_ids: Dict[Tuple[int, str], int] = {}  # (manufacturer id, part number) -> id
+        self.vehicle_ids: Dict[Tuple, int] = {}  # (year, make, model, trim), normalized -> id
         
         # Default category for AC compressors
         self.default_category, _ = PartCategory.objects.get_or_create(
@@ -41,6 +61,39 @@ class EbayDjangoImporter:
             defaults={'description': 'Heating, Ventilation, and Air Conditioning components'}
         )
     
+    def load_lookups(self):
+        """Load the natural-key maps used by bulk imports, one query each"""
+        self.manufacturer_ids = dict(Manufacturer.objects.values_list('name', 'id'))
+        
+        parts = Part.objects.filter(part_number__startswith=EBAY_PART_PREFIX).order_by().values_list(
+            'id', 'manufacturer_id', 'part_number'
+        )
+        self.part_ids = {
+            (manufacturer_id, part_number): part_id
+            for part_id, manufacturer_id, part_number in parts.iterator(chunk_size=10000)
+        }
+        
+        # Default vehicle ordering, so the first vehicle per key wins as in find_or_create_vehicle
+        vehicles = Vehicle.objects.values_list('id', 'year', 'make__name', 'model__name', 'trim__name')
+        self.vehicle_ids = {}
+        for vehicle_id, year, make, model, trim in vehicles.iterator(chunk_size=10000):
+            self.vehicle_ids.setdefault(self.vehicle_key(year, make, model, trim), vehicle_id)
+    
+    @staticmethod
+    def vehicle_key(year, make: str, model: str, trim: str) -> Tuple:
+        return (int(year), normalize_name(make), normalize_name(model), normalize_name(trim))
+    
+    @staticmethod
+    def part_description(ebay_part_data: Dict) -> str:
+        return (
+            f"eBay Import: {ebay_part_data.get('title', '')[:200]}\n\n"
+            f"Original Part Number: {ebay_part_data.get('part_number')}\n"
+            f"Condition: {ebay_part_data.get('condition', '')}\n"
+            f"Price: ${ebay_part_data.get('price', 0):.2f}\n"
+            f"Seller: {ebay_part_data.get('seller_username', '')}\n"
+            f"eBay URL: {ebay_part_data.get('item_url', '')}"
+        )
+    
     def get_or_create_manufacturer(self, manufacturer_name: str) -> Optional[Manufacturer]:
         """Get or create manufacturer object"""
         if not manufacturer_name:
@@ -71,12 +124,12 @@ class EbayDjangoImporter:
             if not all([year, make_name, model_name]):
                 return None
             
-            # Try to find existing vehicle
+            # Try to find existing vehicle (whitespace collapsed, as in vehicle_key)
             vehicles = Vehicle.objects.filter(
                 year=year,
-                make__name__iexact=make_name,
-                model__name__iexact=model_name,
-                trim__name__iexact=trim_name
+                make__name__iexact=' '.join(make_name.split()),
+                model__name__iexact=' '.join(model_name.split()),
+                trim__name__iexact=' '.join((trim_name or '').split())
             )
             
             if vehicles.exists():
@@ -90,8 +143,17 @@ class EbayDjangoImporter:
             self.errors.append(f"Error finding vehicle {fitment_data}: {e}")
             return None
     
+    @staticmethod
+    def ebay_part_number(ebay_part_data: Dict) -> str:
+        """Part number that includes the eBay source"""
+        return f"{EBAY_PART_PREFIX}{ebay_part_data.get('ebay_item_id', '')}-{ebay_part_data.get('part_number')}"
+    
     def import_ebay_part(self, ebay_part_data: Dict) -> bool:
-        """Import a single eBay part into the database"""
+        """Import a single eBay part into the database
+        
+        The part and its fitments are written in one savepoint, so a part that fails
+        leaves nothing behind and does not break an enclosing transaction.
+        """
         try:
             # Extract required fields
             part_name = ebay_part_data.get('part_name')
@@ -103,84 +165,262 @@ class EbayDjangoImporter:
                 self.skipped_parts += 1
                 return False
             
-            # Get or create manufacturer
-            manufacturer = self.get_or_create_manufacturer(manufacturer_name)
-            if not manufacturer:
-                # Create a generic "eBay" manufacturer for unknown parts
-                manufacturer, _ = Manufacturer.objects.get_or_create(
-                    name='Unknown',
-                    defaults={'abbreviation': 'UNK', 'country': ''}
-                )
+            created_fitments = 0
+            with transaction.atomic():
+                # Get or create manufacturer
+                manufacturer = self.get_or_create_manufacturer(manufacturer_name)
+                if not manufacturer:
+                    # Create a generic "eBay" manufacturer for unknown parts
+                    manufacturer, _ = Manufacturer.objects.get_or_create(
+                        name='Unknown',
+                        defaults={'abbreviation': 'UNK', 'country': ''}
+                    )
+                
+                ebay_part_number = self.ebay_part_number(ebay_part_data)
+                if len(ebay_part_number) > PART_NUMBER_MAX_LENGTH:
+                    raise ValueError(f"part number {ebay_part_number} is longer than {PART_NUMBER_MAX_LENGTH} characters")
+                
+                # Check if part already exists
+                part = Part.objects.filter(
+                    manufacturer=manufacturer,
+                    part_number=ebay_part_number
+                ).first()
+                
+                created = part is None
+                if part:
+                    # Update existing part with eBay data
+                    part.name = part_name
+                    part.description = self.part_description(ebay_part_data)
+                    part.save()
+                else:
+                    # Create new part
+                    part = Part.objects.create(
+                        manufacturer=manufacturer,
+                        part_number=ebay_part_number,
+                        name=part_name,
+                        category=self.default_category,
+                        description=self.part_description(ebay_part_data),
+                        is_active=True
+                    )
+                
+                # Create fitments for vehicles that exist in the database
+                fitments_data = ebay_part_data.get('fitments', [])
+                for fitment_data in fitments_data:
+                    vehicle = self.find_or_create_vehicle(fitment_data)
+                    if vehicle:
+                        fitment, fitment_created = Fitment.objects.get_or_create(
+                            part=part,
+                            vehicle=vehicle,
+                            defaults={
+                                'is_verified': False,
+                                'created_by': IMPORTED_BY
+                            }
+                        )
+                        if fitment_created:
+                            created_fitments += 1
             
-            # Create part number that includes eBay source
-            ebay_part_number = f"EBAY-{ebay_part_data.get('ebay_item_id', '')}-{part_number}"
+            if created:
+                self.created_parts += 1
+            else:
+                self.updated_parts += 1
+            self.created_fitments += created_fitments
+            return True
             
-            # Check if part already exists
-            existing_part = Part.objects.filter(
-                manufacturer=manufacturer,
-                part_number=ebay_part_number
-            ).first()
+        except Exception as e:
+            self.errors.append(f"Error importing part {ebay_part_data.get('ebay_item_id', 'unknown')}: {e}")
+            return False
+    
+    def resolve_manufacturer(self, manufacturer_name: str) -> Optional[int]:
+        """Manufacturer id from the lookup map, creating missing manufacturers (and 'Unknown') once"""
+        for name in (manufacturer_name, 'Unknown'):
+            if not name:
+                continue
+            if name not in self.manufacturer_ids:
+                if name == 'Unknown':
+                    manufacturer, _ = Manufacturer.objects.get_or_create(
+                        name='Unknown',
+                        defaults={'abbreviation': 'UNK', 'country': ''}
+                    )
+                else:
+                    manufacturer = self.get_or_create_manufacturer(name)
+                if manufacturer:
+                    self.manufacturer_ids[name] = manufacturer.id
+            if name in self.manufacturer_ids:
+                return self.manufacturer_ids[name]
+        return None
+    
+    def resolve_vehicle(self, fitment_data: Dict) -> Optional[int]:
+        """Vehicle id from the lookup map; like find_or_create_vehicle, vehicles are never created"""
+        year = fitment_data.get('year')
+        make_name = fitment_data.get('make')
+        model_name = fitment_data.get('model')
+        if not all([year, make_name, model_name]):
+            return None
+        try:
+            key = self.vehicle_key(year, make_name, model_name, fitment_data.get('trim', 'Base'))
+        except (TypeError, ValueError):
+            self.errors.append(f"Error finding vehicle {fitment_data}: invalid year")
+            return None
+        return self.vehicle_ids.get(key)
+    
+    def import_batch(self, records: List[Dict]) -> int:
+        """Import a batch of eBay parts with bulk queries, in one transaction
+        
+        Records are resolved against the lookup maps in memory; a part repeated in the
+        batch keeps its last record. If the bulk write fails, it is rolled back and the
+        batch is retried record by record (import_records), so one bad record only costs
+        itself. Returns the number of parts written.
+        """
+        now = timezone.now()
+        errors_before = len(self.errors)
+        new_parts = {}  # (manufacturer id, part number) -> unsaved Part
+        updated_parts = {}  # (manufacturer id, part number) -> Part carrying the updated fields
+        vehicles = {}  # (manufacturer id, part number) -> vehicle ids
+        counts = {'created': 0, 'updated': 0, 'skipped': 0}
+        
+        for ebay_part_data in records:
+            part_name = ebay_part_data.get('part_name')
+            part_number = ebay_part_data.get('part_number')
+            if not part_name or not part_number:
+                counts['skipped'] += 1
+                continue
             
-            if existing_part:
-                # Update existing part with eBay data
-                existing_part.name = part_name
-                existing_part.description = f"eBay Import: {ebay_part_data.get('title', '')[:200]}\n\nOriginal Part Number: {part_number}\nCondition: {ebay_part_data.get('condition', '')}\nPrice: ${ebay_part_data.get('price', 0):.2f}\nSeller: {ebay_part_data.get('seller_username', '')}\neBay URL: {ebay_part_data.get('item_url', '')}"
-                existing_part.save()
-                self.updated_parts += 1
-                part = existing_part
+            item_id = ebay_part_data.get('ebay_item_id', '')
+            ebay_part_number = self.ebay_part_number(ebay_part_data)
+            if len(ebay_part_number) > PART_NUMBER_MAX_LENGTH:
+                self.errors.append(f"Error importing part {item_id}: part number {ebay_part_number} "
+                                   f"is longer than {PART_NUMBER_MAX_LENGTH} characters")
+                continue
+            try:
+                description = self.part_description(ebay_part_data)
+            except (TypeError, ValueError) as e:
+                self.errors.append(f"Error importing part {item_id}: {e}")
+                continue
+            
+            key = (self.resolve_manufacturer(ebay_part_data.get('manufacturer')), ebay_part_number)
+            if key in new_parts:
+                new_parts[key].name = part_name
+                new_parts[key].description = description
+                counts['updated'] += 1
+            elif key in self.part_ids:
+                updated_parts[key] = Part(id=self.part_ids[key], name=part_name, description=description, updated_at=now)
+                counts['updated'] += 1
             else:
-                # Create new part
-                part = Part.objects.create(
-                    manufacturer=manufacturer,
+                new_parts[key] = Part(
+                    manufacturer_id=key[0],
                     part_number=ebay_part_number,
                     name=part_name,
                     category=self.default_category,
-                    description=f"eBay Import: {ebay_part_data.get('title', '')[:200]}\n\nOriginal Part Number: {part_number}\nCondition: {ebay_part_data.get('condition', '')}\nPrice: ${ebay_part_data.get('price', 0):.2f}\nSeller: {ebay_part_data.get('seller_username', '')}\neBay URL: {ebay_part_data.get('item_url', '')}",
+                    description=description,
                     is_active=True
                 )
-                self.created_parts += 1
-            
-            # Create fitments for vehicles that exist in the database
-            fitments_data = ebay_part_data.get('fitments', [])
-            for fitment_data in fitments_data:
-                vehicle = self.find_or_create_vehicle(fitment_data)
-                if vehicle:
-                    fitment, created = Fitment.objects.get_or_create(
-                        part=part,
-                        vehicle=vehicle,
-                        defaults={
-                            'is_verified': False,
-                            'created_by': 'ebay_importer'
-                        }
-                    )
-                    if created:
-                        self.created_fitments += 1
-            
-            return True
+                counts['created'] += 1
             
+            vehicle_ids = (self.resolve_vehicle(fitment) for fitment in ebay_part_data.get('fitments') or [])
+            vehicles[key] = {vehicle_id for vehicle_id in vehicle_ids if vehicle_id}
+        
+        try:
+            with transaction.atomic():
+                # ignore_conflicts covers parts inserted concurrently since load_lookups; ids are read back
+                Part.objects.bulk_create(new_parts.values(), batch_size=self.batch_size, ignore_conflicts=True)
+                Part.objects.bulk_update(
+                    updated_parts.values(), ['name', 'description', 'updated_at'], batch_size=self.batch_size
+                )
+                created_ids = {
+                    (manufacturer_id, part_number): part_id
+                    for part_id, manufacturer_id, part_number in Part.objects.filter(
+                        part_number__in={part_number for _, part_number in new_parts}
+                    ).order_by().values_list('id', 'manufacturer_id', 'part_number')
+                    if (manufacturer_id, part_number) in new_parts
+                }
+                part_ids = {**{key: self.part_ids[key] for key in updated_parts}, **created_ids}
+                
+                pairs = {
+                    (part_ids[key], vehicle_id)
+                    for key, vehicle_ids in vehicles.items() if key in part_ids
+                    for vehicle_id in vehicle_ids
+                }
+                existing = set()
+                if pairs:
+                    existing = set(
+                        Fitment.objects
+                        .filter(
+                            part_id__in={part_id for part_id, _ in pairs},
+                            vehicle_id__in={vehicle_id for _, vehicle_id in pairs},
+                        )
+                        .order_by()
+                        .values_list('part_id', 'vehicle_id')
+                    ) & pairs
+                new_fitments = [
+                    Fitment(part_id=part_id, vehicle_id=vehicle_id, is_verified=False, created_by=IMPORTED_BY)
+                    for part_id, vehicle_id in pairs - existing
+                ]
+                Fitment.objects.bulk_create(new_fitments, batch_size=self.batch_size, ignore_conflicts=True)
         except Exception as e:
-            self.errors.append(f"Error importing part {ebay_part_data.get('ebay_item_id', 'unknown')}: {e}")
-            return False
+            first_id = records[0].get('ebay_item_id', 'unknown') if records else 'unknown'
+            print(f"Bulk import of {len(records)} parts starting at {first_id} failed ({e}); "
+                  f"importing them one at a time")
+            del self.errors[errors_before:]  # import_records reports them again
+            return self.import_records(records)
+        
+        self.part_ids.update(created_ids)
+        self.created_parts += counts['created']
+        self.updated_parts += counts['updated']
+        self.skipped_parts += counts['skipped']
+        self.created_fitments += len(new_fitments)
+        return len(part_ids)
     
-    def import_from_json(self, json_file: str) -> Dict:
-        """Import all parts from a JSON file"""
+    def import_records(self, records: List[Dict]) -> int:
+        """Import records one at a time with import_ebay_part (the fallback for a failed batch)"""
+        imported = sum(1 for ebay_part_data in records if self.import_ebay_part(ebay_part_data))
+        
+        # Parts created here are missing from the lookup map used by the next batches
+        part_numbers = {self.ebay_part_number(ebay_part_data) for ebay_part_data in records}
+        self.part_ids.update(
+            ((manufacturer_id, part_number), part_id)
+            for part_id, manufacturer_id, part_number in Part.objects.filter(
+                part_number__in=part_numbers
+            ).order_by().values_list('id', 'manufacturer_id', 'part_number')
+        )
+        return imported
+    
+    def import_from_json(self, json_file: str, bulk: bool = True) -> Dict:
+        """Import all parts from a JSONL (or legacy JSON array) file, streaming one record at a time
+        
+        With bulk, records are imported batch_size at a time through import_batch, one
+        transaction per batch, so an interrupted import keeps its finished batches and can
+        simply be rerun. Otherwise each part is imported with import_ebay_part, all in a
+        single transaction.
+        """
+        total_processed = 0
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                parts_data = json.load(f)
-            
-            print(f"Starting import of {len(parts_data)} parts from {json_file}")
+            print(f"Starting import of parts from {json_file}")
             print("-" * 60)
             
-            with transaction.atomic():
-                for i, part_data in enumerate(parts_data, 1):
-                    if i % 10 == 0:
-                        print(f"Processing part {i}/{len(parts_data)}...")
-                    
-                    self.import_ebay_part(part_data)
+            if bulk:
+                self.load_lookups()
+                batch = []
+                for part_data in iter_records(json_file):
+                    total_processed += 1
+                    batch.append(part_data)
+                    if len(batch) == self.batch_size:
+                        self.import_batch(batch)
+                        batch = []
+                        print(f"Processed {total_processed} parts...")
+                if batch:
+                    self.import_batch(batch)
+            else:
+                with transaction.atomic():
+                    for part_data in iter_records(json_file):
+                        total_processed += 1
+                        if total_processed % PROGRESS_INTERVAL == 0:
+                            print(f"Processing part {total_processed}...")
+                        
+                        self.import_ebay_part(part_data)
             
             # Return summary
             summary = {
-                'total_processed': len(parts_data),
+                'total_processed': total_processed,
                 'created_parts': self.created_parts,
                 'updated_parts': self.updated_parts,
                 'created_fitments': self.created_fitments,
@@ -191,7 +431,7 @@ class EbayDjangoImporter:
             return summary
             
         except Exception as e:
-            self.errors.append(f"Error reading file {json_file}: {e}")
+            self.errors.append(f"Error reading file {json_file} after {total_processed} parts: {e}")
             return {'error': str(e)}
     
     def print_summary(self, summary: Dict):
@@ -214,9 +454,9 @@ class EbayDjangoImporter:
 
 
 def find_ebay_data_files():
-    """Find eBay JSON data files in current directory"""
-    files = [f for f in os.listdir('.') if f.startswith('ebay_acura_ac_parts_') and f.endswith('.json')]
-    return sorted(files)
+    """Find eBay JSONL (and legacy JSON) data files in current directory"""
+    files = [f for f in os.listdir('.') if f.startswith(DATA_FILE_PREFIXES) and f.endswith(DATA_FILE_EXTENSIONS)]
+    return sorted(files, key=os.path.getmtime)
 
 
 def main():
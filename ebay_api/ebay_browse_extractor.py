@@ -5,16 +5,21 @@ Extracts Acura AC compressor parts for Parts Matrix database
 """
 
 import os
+import sys
 import requests
 import json
 import time
 import re
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from itertools import chain, islice
+from typing import Dict, Iterable, List, Optional, Any
 from dataclasses import dataclass, asdict
 import logging
 
+from async_crawler import BrowseCrawler
+from jsonl_records import JsonlWriter, iter_records
+
 # Load environment variables
 project_root = Path(__file__).resolve().parent.parent
 env_path = project_root / '.env'
@@ -27,6 +32,10 @@ if env_path.exists():
                 key, value = line.split('=', 1)
                 os.environ[key.strip()] = value.strip()
 
+# Shared HTTP client lives in the Django project package
+sys.path.insert(0, str(project_root / 'parts_interchange'))
+from parts_interchange.http_client import get_client, get_token_cache
+
 @dataclass
 class EbayBrowsePart:
     """Data structure for eBay Browse API part information"""
@@ -60,15 +69,15 @@ class EbayBrowsePart:
 class EbayBrowseExtractor:
     """Production eBay Browse API extractor for automotive parts"""
     
-    def __init__(self, client_id: str, client_secret: str):
+    def __init__(self, client_id: str, client_secret: str, api_base_url: str = None):
         self.client_id = client_id
         self.client_secret = client_secret
-        self.access_token = None
-        self.token_expires_at = None
+        self.oauth_scope = 'https://api.ebay.com/oauth/api_scope'
         
-        # eBay Browse API endpoints
-        self.auth_url = "https://api.ebay.com/identity/v1/oauth2/token"
-        self.browse_url = "https://api.ebay.com/buy/browse/v1"
+        # eBay Browse API endpoints (EBAY_API_BASE_URL points them at a sandbox or local stub server)
+        api_base_url = (api_base_url or os.getenv('EBAY_API_BASE_URL', 'https://api.ebay.com')).rstrip('/')
+        self.auth_url = f"{api_base_url}/identity/v1/oauth2/token"
+        self.browse_url = f"{api_base_url}/buy/browse/v1"
         
         # Set up logging (without emoji for Windows compatibility)
         logging.basicConfig(
@@ -105,48 +114,23 @@ class EbayBrowseExtractor:
         }
 
     def get_access_token(self) -> str:
-        """Get OAuth access token using client credentials flow"""
-        
-        if (self.access_token and self.token_expires_at and 
-            datetime.now() < self.token_expires_at):
-            return self.access_token
-        
-        self.logger.info("Getting new OAuth access token...")
-        
-        import base64
-        credentials = f"{self.client_id}:{self.client_secret}"
-        encoded = base64.b64encode(credentials.encode()).decode()
-        
-        headers = {
-            'Content-Type': 'application/x-www-form-urlencoded',
-            'Authorization': f'Basic {encoded}'
-        }
-        
-        data = {
-            'grant_type': 'client_credentials',
-            'scope': 'https://api.ebay.com/oauth/api_scope'
-        }
-        
+        """Get an OAuth access token (client credentials flow), cached until shortly before it expires"""
         try:
-            response = requests.post(self.auth_url, headers=headers, data=data, timeout=30)
-            response.raise_for_status()
-            
-            token_data = response.json()
-            
-            self.access_token = token_data['access_token']
-            expires_in = token_data.get('expires_in', 7200)
-            
-            self.token_expires_at = datetime.now() + timedelta(seconds=expires_in - 300)
-            
-            self.logger.info("OAuth token obtained successfully")
-            return self.access_token
-            
+            return get_token_cache().get_token(self.auth_url, self.client_id, self.client_secret, self.oauth_scope)
         except Exception as e:
             self.logger.error(f"OAuth token request failed: {e}")
             raise
 
-    def search_acura_ac_compressors(self, max_results: int = 100) -> List[EbayBrowsePart]:
-        """Search specifically for Acura AC compressors over $50"""
+    def search_acura_ac_compressors(self,
+                                    max_results: int = 100,
+                                    fetch_details: bool = False,
+                                    output: JsonlWriter = None) -> List[EbayBrowsePart]:
+        """Search specifically for Acura AC compressors over $50
+
+        With `output`, each matching part is appended to that JSONL writer as soon
+        as its search term's pages are parsed, and is not kept: the result is
+        then empty and output.count is the number of parts written.
+        """
         
         search_terms = [
             "Acura AC Compressor",
@@ -155,62 +139,62 @@ class EbayBrowseExtractor:
             "Acura Compressor Clutch"
         ]
         
-        all_parts = []
-        
-        for search_term in search_terms:
-            self.logger.info(f"Searching for: {search_term}")
-            
-            items = self.search_items(
-                query=search_term,
+        result = []
+        
+        def keep(part):
+            # Filter for Acura-related items (the crawler already removed duplicates)
+            if 'acura' in part.title.lower() or part.manufacturer == 'Acura':
+                if output:
+                    output.write(asdict(part))
+                else:
+                    result.append(part)
+        
+        # All search terms and result pages run concurrently, rate limited by the crawler
+        with BrowseCrawler(self) as crawler:
+            crawler.run(
+                crawler.crawl,
+                search_terms,
                 category_id="33654",
-                limit=max_results // len(search_terms)
+                max_results_per_query=max_results // len(search_terms),
+                fetch_details=fetch_details,
+                on_part=keep
             )
-            
-            for item in items:
-                browse_part = self.parse_browse_item(item)
-                if browse_part:
-                    # Filter for Acura-related items
-                    title_lower = browse_part.title.lower()
-                    if 'acura' in title_lower or browse_part.manufacturer == 'Acura':
-                        all_parts.append(browse_part)
-            
-            time.sleep(1)  # Respectful rate limiting
         
-        # Remove duplicates
-        unique_parts = {}
-        for part in all_parts:
-            if part.ebay_item_id not in unique_parts:
-                unique_parts[part.ebay_item_id] = part
-        
-        result = list(unique_parts.values())
-        self.logger.info(f"Found {len(result)} unique Acura AC compressor parts")
+        self.logger.info(f"Found {output.count if output else len(result)} unique Acura AC compressor parts")
         return result
 
-    def search_items(self, 
-                    query: str,
-                    category_id: str = "33654",
-                    limit: int = 50) -> List[Dict]:
-        """Search for items using Browse API"""
-        
-        token = self.get_access_token()
-        
-        headers = {
-            'Authorization': f'Bearer {token}',
+    def api_headers(self) -> Dict[str, str]:
+        """Browse API request headers with a valid OAuth token"""
+        return {
+            'Authorization': f'Bearer {self.get_access_token()}',
             'X-EBAY-C-MARKETPLACE-ID': 'EBAY_US',
             'Content-Type': 'application/json'
         }
-        
+
+    def search_params(self, query: str, category_id: str = "33654", limit: int = 50, offset: int = 0) -> Dict:
+        """item_summary/search parameters for one page of results"""
         params = {
             'q': query,
             'limit': min(limit, 200),
             'category_ids': category_id,
             'filter': 'buyingOptions:{FIXED_PRICE},price:[50..],conditions:{NEW,USED}'
         }
+        if offset:
+            params['offset'] = offset
+        return params
+
+    def search_items(self, 
+                    query: str,
+                    category_id: str = "33654",
+                    limit: int = 50) -> List[Dict]:
+        """Search for items using Browse API"""
         
+        headers = self.api_headers()
+        params = self.search_params(query, category_id, limit)
         url = f"{self.browse_url}/item_summary/search"
         
         try:
-            response = requests.get(url, headers=headers, params=params, timeout=30)
+            response = get_client().get(url, headers=headers, params=params)
             response.raise_for_status()
             
             data = response.json()
@@ -274,7 +258,7 @@ class EbayBrowseExtractor:
             browse_part.part_number = self.extract_part_number(title)
             browse_part.manufacturer = self.extract_manufacturer(title)
             browse_part.fitments = self.extract_fitments("", title)
-            browse_part.description = title
+            browse_part.description = item.get('shortDescription') or title  # Item details only
             
             return browse_part
             
@@ -367,33 +351,35 @@ class EbayBrowseExtractor:
         
         return fitments
 
-    def save_to_json(self, parts: List[EbayBrowsePart], filename: str = None) -> str:
-        """Save parts data to JSON file"""
+    def save_to_json(self, parts: Iterable[EbayBrowsePart], filename: str = None) -> str:
+        """Save parts data to a JSONL file, one part per line, writing each part as it is produced"""
         if filename is None:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"ebay_browse_acura_ac_parts_{timestamp}.json"
+            filename = self.default_filename('jsonl')
         
         filepath = os.path.join(os.path.dirname(__file__), filename)
         
-        parts_data = [asdict(part) for part in parts]
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(parts_data, f, indent=2, ensure_ascii=False)
+        with JsonlWriter(filepath, mode='w') as output:
+            for part in parts:
+                output.write(asdict(part))
         
-        self.logger.info(f"Saved {len(parts)} parts to {filepath}")
+        self.logger.info(f"Saved {output.count} parts to {filepath}")
         return filepath
 
-    def save_to_csv(self, parts: List[EbayBrowsePart], filename: str = None) -> str:
-        """Save parts data to CSV file"""
+    def save_to_csv(self, parts: Iterable, filename: str = None) -> str:
+        """Save parts data to CSV file, writing each part as it is produced
+
+        `parts` may be EbayBrowseParts or their dicts, e.g. iter_records() of a JSONL file.
+        """
         import csv
         
         if filename is None:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"ebay_browse_acura_ac_parts_{timestamp}.csv"
+            filename = self.default_filename('csv')
         
         filepath = os.path.join(os.path.dirname(__file__), filename)
         
-        if not parts:
+        parts = iter(parts)
+        first = next(parts, None)
+        if first is None:
             return filepath
         
         headers = [
@@ -403,23 +389,27 @@ class EbayBrowseExtractor:
             'fitments_count', 'category', 'availability_status'
         ]
         
+        count = 0
         with open(filepath, 'w', newline='', encoding='utf-8') as f:
             writer = csv.writer(f)
             writer.writerow(headers)
             
-            for part in parts:
-                row = [
-                    part.ebay_item_id, part.title, part.price, part.shipping_cost,
-                    part.seller_username, part.seller_feedback_score, part.item_url,
-                    part.condition, part.location, part.part_name, part.part_number,
-                    part.manufacturer, part.description, len(part.fitments),
-                    part.category, part.availability_status
-                ]
-                writer.writerow(row)
-        
-        self.logger.info(f"Saved {len(parts)} parts to {filepath}")
+            for part in chain([first], parts):
+                if not isinstance(part, dict):
+                    part = asdict(part)
+                writer.writerow([
+                    len(part['fitments'] or []) if header == 'fitments_count' else part[header]
+                    for header in headers
+                ])
+                count += 1
+        
+        self.logger.info(f"Saved {count} parts to {filepath}")
         return filepath
 
+    def default_filename(self, extension: str) -> str:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return f"ebay_browse_acura_ac_parts_{timestamp}.{extension}"
+
 def main():
     """Main function to run the Browse API parts extractor"""
     
@@ -441,36 +431,39 @@ def main():
     print("- Minimum Price: $50")
     print("-" * 50)
     
-    parts = extractor.search_acura_ac_compressors(max_results=100)
+    # Parts are appended to the JSONL file as they are kept
+    json_file = os.path.join(os.path.dirname(__file__), extractor.default_filename('jsonl'))
+    with JsonlWriter(json_file, mode='w') as output:
+        extractor.search_acura_ac_compressors(max_results=100, output=output)
     
-    if parts:
-        print(f"\nFound {len(parts)} matching parts:")
+    if output.count:
+        print(f"\nFound {output.count} matching parts:")
         print("-" * 50)
         
-        for i, part in enumerate(parts[:10], 1):
-            print(f"{i}. {part.title}")
-            print(f"   Price: ${part.price:.2f}")
-            if part.shipping_cost:
-                print(f"   Shipping: ${part.shipping_cost:.2f}")
-            print(f"   Condition: {part.condition}")
-            print(f"   Part Name: {part.part_name or 'Not extracted'}")
-            print(f"   Part Number: {part.part_number or 'Not extracted'}")
-            print(f"   Manufacturer: {part.manufacturer or 'Not extracted'}")
-            print(f"   Fitments: {len(part.fitments)} found")
+        for i, part in enumerate(islice(iter_records(json_file), 10), 1):
+            print(f"{i}. {part['title']}")
+            print(f"   Price: ${part['price']:.2f}")
+            if part['shipping_cost']:
+                print(f"   Shipping: ${part['shipping_cost']:.2f}")
+            print(f"   Condition: {part['condition']}")
+            print(f"   Part Name: {part['part_name'] or 'Not extracted'}")
+            print(f"   Part Number: {part['part_number'] or 'Not extracted'}")
+            print(f"   Manufacturer: {part['manufacturer'] or 'Not extracted'}")
+            print(f"   Fitments: {len(part['fitments'])} found")
             print()
         
-        if len(parts) > 10:
-            print(f"... and {len(parts) - 10} more parts")
+        if output.count > 10:
+            print(f"... and {output.count - 10} more parts")
         
-        # Save results
-        json_file = extractor.save_to_json(parts)
-        csv_file = extractor.save_to_csv(parts)
+        # Save results, streamed back from the JSONL file
+        csv_file = extractor.save_to_csv(iter_records(json_file))
         
         print(f"\nResults saved to:")
-        print(f"- JSON: {json_file}")
+        print(f"- JSONL: {json_file}")
         print(f"- CSV: {csv_file}")
         
     else:
+        os.remove(json_file)
         print("No matching parts found.")
 
 if __name__ == "__main__":
@@ -18,7 +18,8 @@ import json
 import requests
 import re
 import time
-from typing import Dict, List, Optional, Any
+from itertools import chain, islice
+from typing import Dict, Iterable, List, Optional, Any
 from datetime import datetime
 from dataclasses import dataclass, asdict
 import logging
@@ -73,6 +74,10 @@ from apps.parts.models import Part, Manufacturer, PartCategory
 from apps.vehicles.models import Vehicle, Make, Model, Engine, Trim
 from apps.fitments.models import Fitment
 
+from parts_interchange.http_client import get_client
+from async_crawler import AsyncCrawler
+from jsonl_records import JsonlWriter, iter_records
+
 
 @dataclass
 class EbayPart:
@@ -334,7 +339,7 @@ class EbayPartsExtractor:
         }
         
         try:
-            response = requests.get(self.base_url, params=params, timeout=30)
+            response = get_client().get(self.base_url, params=params)
             response.raise_for_status()
             
             data = response.json()
@@ -445,8 +450,13 @@ class EbayPartsExtractor:
         self.logger.info(f"Detailed item lookup not implemented for item {item_id}")
         return None
 
-    def search_acura_ac_compressors(self, max_results: int = 100) -> List[EbayPart]:
-        """Search specifically for Acura AC compressors over $50"""
+    def search_acura_ac_compressors(self, max_results: int = 100, output: JsonlWriter = None) -> List[EbayPart]:
+        """Search specifically for Acura AC compressors over $50
+
+        With `output`, each unique matching part is appended to that JSONL writer
+        as soon as its search term's results are parsed, and is not kept: the
+        result is then empty and output.count is the number of parts written.
+        """
         
         # Search terms optimized for Acura AC compressors
         search_terms = [
@@ -456,70 +466,69 @@ class EbayPartsExtractor:
             "Acura Compressor Clutch"
         ]
         
-        all_parts = []
+        # Run the searches concurrently; the crawler's token bucket keeps us within eBay's rate limits
+        searches = [
+            {
+                'keywords': search_term,
+                'category_id': "33654",  # AC Compressors & Clutches
+                'min_price': 50.0,
+                'max_results': max_results // len(search_terms),
+            }
+            for search_term in search_terms
+        ]
         
-        for search_term in search_terms:
-            self.logger.info(f"Searching for: {search_term}")
-            
-            items = self.search_parts(
-                keywords=search_term,
-                category_id="33654",  # AC Compressors & Clutches
-                min_price=50.0,
-                max_results=max_results // len(search_terms)
-            )
-            
+        # Remove duplicates based on item ID
+        seen_item_ids = set()
+        result = []
+        
+        def keep(items):
             for item in items:
                 ebay_part = self.parse_item(item)
-                if ebay_part:
+                if ebay_part and ebay_part.ebay_item_id not in seen_item_ids:
                     # Filter for Acura-related items
                     title_lower = ebay_part.title.lower()
                     if 'acura' in title_lower or ebay_part.manufacturer == 'Acura':
-                        all_parts.append(ebay_part)
-            
-            # Be respectful to eBay's rate limits
-            time.sleep(1)
+                        seen_item_ids.add(ebay_part.ebay_item_id)
+                        if output:
+                            output.write(asdict(ebay_part))
+                        else:
+                            result.append(ebay_part)
         
-        # Remove duplicates based on item ID
-        unique_parts = {}
-        for part in all_parts:
-            if part.ebay_item_id not in unique_parts:
-                unique_parts[part.ebay_item_id] = part
+        with AsyncCrawler() as crawler:
+            crawler.run(crawler.for_each, self.search_parts, searches, keep)
         
-        result = list(unique_parts.values())
-        self.logger.info(f"Found {len(result)} unique Acura AC compressor parts")
+        self.logger.info(f"Found {len(seen_item_ids)} unique Acura AC compressor parts")
         return result
 
-    def save_to_json(self, parts: List[EbayPart], filename: str = None) -> str:
-        """Save parts data to JSON file"""
+    def save_to_json(self, parts: Iterable[EbayPart], filename: str = None) -> str:
+        """Save parts data to a JSONL file, one part per line, writing each part as it is produced"""
         if filename is None:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"ebay_acura_ac_parts_{timestamp}.json"
+            filename = self.default_filename('jsonl')
         
         filepath = os.path.join(os.path.dirname(__file__), filename)
         
-        # Convert EbayPart objects to dictionaries
-        parts_data = []
-        for part in parts:
-            part_dict = asdict(part)
-            parts_data.append(part_dict)
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(parts_data, f, indent=2, ensure_ascii=False)
+        with JsonlWriter(filepath, mode='w') as output:
+            for part in parts:
+                output.write(asdict(part))
         
-        self.logger.info(f"Saved {len(parts)} parts to {filepath}")
+        self.logger.info(f"Saved {output.count} parts to {filepath}")
         return filepath
 
-    def save_to_csv(self, parts: List[EbayPart], filename: str = None) -> str:
-        """Save parts data to CSV file"""
+    def save_to_csv(self, parts: Iterable, filename: str = None) -> str:
+        """Save parts data to CSV file, writing each part as it is produced
+
+        `parts` may be EbayParts or their dicts, e.g. iter_records() of a JSONL file.
+        """
         import csv
         
         if filename is None:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"ebay_acura_ac_parts_{timestamp}.csv"
+            filename = self.default_filename('csv')
         
         filepath = os.path.join(os.path.dirname(__file__), filename)
         
-        if not parts:
+        parts = iter(parts)
+        first = next(parts, None)
+        if first is None:
             self.logger.warning("No parts to save to CSV")
             return filepath
         
@@ -531,36 +540,27 @@ class EbayPartsExtractor:
             'fitments_count', 'category', 'listing_type', 'time_left', 'watch_count'
         ]
         
+        count = 0
         with open(filepath, 'w', newline='', encoding='utf-8') as f:
             writer = csv.writer(f)
             writer.writerow(headers)
             
-            for part in parts:
-                row = [
-                    part.ebay_item_id,
-                    part.title,
-                    part.price,
-                    part.shipping_cost,
-                    part.seller_username,
-                    part.seller_feedback_score,
-                    part.item_url,
-                    part.condition,
-                    part.location,
-                    part.part_name,
-                    part.part_number,
-                    part.manufacturer,
-                    part.description,
-                    len(part.fitments) if part.fitments else 0,
-                    part.category,
-                    part.listing_type,
-                    part.time_left,
-                    part.watch_count
-                ]
-                writer.writerow(row)
-        
-        self.logger.info(f"Saved {len(parts)} parts to {filepath}")
+            for part in chain([first], parts):
+                if not isinstance(part, dict):
+                    part = asdict(part)
+                writer.writerow([
+                    len(part['fitments'] or []) if header == 'fitments_count' else part[header]
+                    for header in headers
+                ])
+                count += 1
+        
+        self.logger.info(f"Saved {count} parts to {filepath}")
         return filepath
 
+    def default_filename(self, extension: str) -> str:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return f"ebay_acura_ac_parts_{timestamp}.{extension}"
+
 
 def main():
     """Main function to run the eBay parts extractor"""
@@ -585,38 +585,40 @@ def main():
     print("- Minimum Price: $50")
     print("-" * 50)
     
-    # Search for parts
-    parts = extractor.search_acura_ac_compressors(max_results=100)
+    # Search for parts; they are appended to the JSONL file as they are parsed
+    json_file = os.path.join(os.path.dirname(__file__), extractor.default_filename('jsonl'))
+    with JsonlWriter(json_file, mode='w') as output:
+        extractor.search_acura_ac_compressors(max_results=100, output=output)
     
-    if parts:
-        print(f"\nFound {len(parts)} matching parts:")
+    if output.count:
+        print(f"\nFound {output.count} matching parts:")
         print("-" * 50)
         
-        for i, part in enumerate(parts[:10], 1):  # Show first 10
-            print(f"{i}. {part.title}")
-            print(f"   Price: ${part.price:.2f}")
-            if part.shipping_cost:
-                print(f"   Shipping: ${part.shipping_cost:.2f}")
-            print(f"   Condition: {part.condition}")
-            print(f"   Part Name: {part.part_name or 'Not extracted'}")
-            print(f"   Part Number: {part.part_number or 'Not extracted'}")
-            print(f"   Manufacturer: {part.manufacturer or 'Not extracted'}")
-            print(f"   Fitments: {len(part.fitments)} found")
-            print(f"   URL: {part.item_url}")
+        for i, part in enumerate(islice(iter_records(json_file), 10), 1):  # Show first 10
+            print(f"{i}. {part['title']}")
+            print(f"   Price: ${part['price']:.2f}")
+            if part['shipping_cost']:
+                print(f"   Shipping: ${part['shipping_cost']:.2f}")
+            print(f"   Condition: {part['condition']}")
+            print(f"   Part Name: {part['part_name'] or 'Not extracted'}")
+            print(f"   Part Number: {part['part_number'] or 'Not extracted'}")
+            print(f"   Manufacturer: {part['manufacturer'] or 'Not extracted'}")
+            print(f"   Fitments: {len(part['fitments'])} found")
+            print(f"   URL: {part['item_url']}")
             print()
         
-        if len(parts) > 10:
-            print(f"... and {len(parts) - 10} more parts")
+        if output.count > 10:
+            print(f"... and {output.count - 10} more parts")
         
-        # Save results
-        json_file = extractor.save_to_json(parts)
-        csv_file = extractor.save_to_csv(parts)
+        # Save results, streamed back from the JSONL file
+        csv_file = extractor.save_to_csv(iter_records(json_file))
         
         print(f"\nResults saved to:")
-        print(f"- JSON: {json_file}")
+        print(f"- JSONL: {json_file}")
         print(f"- CSV: {csv_file}")
         
     else:
+        os.remove(json_file)
         print("No matching parts found.")
         print("This could be due to:")
         print("- Invalid eBay App ID")
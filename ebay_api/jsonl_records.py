@@ -0,0 +1,119 @@
+"""
+Streaming JSONL records for eBay extraction results
+Extractors append one JSON record per line as parts are parsed; the importer and
+data viewer read them back one record at a time, so memory use stays flat no
+matter how large a crawl file gets
+
+Older `.json` files holding a single JSON array are still readable: the array is
+decoded element by element instead of being loaded whole.
+"""
+
+import json
+from typing import Dict, Iterator, TextIO
+import logging
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 64 * 1024
+
+# Output files of the extractors and the crawl scheduler
+DATA_FILE_PREFIXES = ('ebay_acura_ac_parts_', 'ebay_browse_acura_ac_parts_', 'ebay_crawl_')
+DATA_FILE_EXTENSIONS = ('.jsonl', '.json')
+
+
+class JsonlWriter:
+    """Appends records to a JSONL file, one JSON object per line"""
+
+    def __init__(self, path: str, mode: str = 'a'):
+        self.path = path
+        self.count = 0
+        self._file = open(path, mode, encoding='utf-8')
+
+    def write(self, record: Dict):
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.count += 1
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def iter_records(path: str) -> Iterator[Dict]:
+    """Yield the records of a JSONL file, or of a legacy JSON array file, one at a time"""
+    with open(path, 'r', encoding='utf-8') as f:
+        head = f.read(READ_CHUNK_SIZE)
+        if head.lstrip().startswith('['):
+            yield from _iter_json_array(f, head)
+        else:
+            yield from _iter_json_lines(f, head)
+
+
+def _iter_json_lines(f: TextIO, head: str) -> Iterator[Dict]:
+    # Undecodable lines (e.g. a line cut short by a crashed crawl) are logged and skipped
+    line_number = 0
+    pending = head
+    for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), ''):
+        lines = (pending + chunk).split('\n')
+        pending = lines.pop()
+        for line in lines:
+            line_number += 1
+            record = _decode_line(line, line_number)
+            if record is not None:
+                yield record
+    for line in pending.split('\n'):
+        line_number += 1
+        record = _decode_line(line, line_number)
+        if record is not None:
+            yield record
+
+
+def _decode_line(line: str, line_number: int):
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        logger.warning(f"Skipping undecodable line {line_number}: {e}")
+        return None
+
+
+def _iter_json_array(f: TextIO, buffer: str) -> Iterator[Dict]:
+    decoder = json.JSONDecoder()
+    position = buffer.index('[') + 1
+    eof = False
+
+    while True:
+        # Skip whitespace and the comma between elements
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if position < len(buffer) and buffer[position] == ']':
+            return
+
+        if position < len(buffer):
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                if eof:
+                    raise
+            else:
+                # A value ending exactly at the buffer end may continue in the next chunk
+                if end < len(buffer) or eof:
+                    yield record
+                    position = end
+                    continue
+        elif eof:
+            raise ValueError("JSON array is not terminated")
+
+        chunk = f.read(READ_CHUNK_SIZE)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
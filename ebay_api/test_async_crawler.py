@@ -0,0 +1,163 @@
+"""
+Test the async crawl engine against a local stub of the eBay Browse API
+No eBay credentials or network access needed
+"""
+
+import csv
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from async_crawler import AsyncCrawler, BrowseCrawler, TokenBucket
+from ebay_browse_extractor import EbayBrowseExtractor
+from jsonl_records import JsonlWriter, iter_records
+
+ITEMS_PER_QUERY = 450
+RESPONSE_DELAY = 0.2  # Simulated eBay latency per request
+
+
+class StubBrowseHandler(BaseHTTPRequestHandler):
+    """Serves OAuth tokens, paginated item_summary/search results and item details"""
+    requests_seen = []
+    failing_offsets = set()  # Search pages answered with 500
+    prices = {}  # itemId -> price overriding 125.00
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, body):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.requests_seen.append(('token', time.monotonic()))
+        self.send_json({'access_token': 'stub-token', 'expires_in': 7200})
+
+    def do_GET(self):
+        time.sleep(RESPONSE_DELAY)
+        url = urlparse(self.path)
+        self.requests_seen.append((url.path, time.monotonic()))
+
+        if url.path.startswith('/buy/browse/v1/item/'):
+            item_id = url.path.rsplit('/', 1)[1]
+            self.send_json({'itemId': item_id, 'shortDescription': f'Fits 2005 Acura TL ({item_id})'})
+            return
+
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        offset, limit = int(params.get('offset', 0)), int(params['limit'])
+        query = params['q']
+        if offset in self.failing_offsets:
+            self.send_response(500)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_json({
+            'total': ITEMS_PER_QUERY,
+            'itemSummaries': [
+                {
+                    'itemId': item_id,
+                    'title': f'2005-2008 Acura TL {query} (38810-RDA-A01)',
+                    'price': {'value': self.prices.get(item_id, '125.00'), 'currency': 'USD'},
+                    'seller': {'username': 'stub', 'feedbackScore': 10},
+                }
+                for item_id in (
+                    f"v1|{query.replace(' ', '')}{index}|0"
+                    for index in range(offset, min(offset + limit, ITEMS_PER_QUERY))
+                )
+            ],
+        })
+
+
+def start_stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubBrowseHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_token_bucket():
+    print("Testing token bucket...")
+    crawler = AsyncCrawler(requests_per_second=20, burst=5, concurrency=50)
+
+    async def burst_of_calls():
+        return await crawler.map(time.monotonic, [{}] * 25)
+
+    with crawler:
+        started = time.monotonic()
+        stamps = crawler.run(burst_of_calls)
+    elapsed = max(stamps) - started
+    # 5 burst tokens, then 20 more at 20/s: about one second
+    print(f"   25 calls at 20/s (burst 5) took {elapsed:.2f}s")
+    assert 0.9 <= elapsed <= 1.5, elapsed
+
+
+def test_browse_crawl():
+    print("Testing concurrent Browse crawl...")
+    server, base_url = start_stub_server()
+    StubBrowseHandler.requests_seen.clear()
+    extractor = EbayBrowseExtractor('stub-id', 'stub-secret', api_base_url=base_url)
+    queries = ["Acura AC Compressor", "Acura Compressor Clutch"]
+
+    with BrowseCrawler(extractor, requests_per_second=200, concurrency=40) as crawler:
+        started = time.monotonic()
+        parts = crawler.run(crawler.crawl, queries, max_results_per_query=ITEMS_PER_QUERY, fetch_details=True)
+        elapsed = time.monotonic() - started
+    server.shutdown()
+
+    searches = [path for path, _ in StubBrowseHandler.requests_seen if path.endswith('/search')]
+    details = [path for path, _ in StubBrowseHandler.requests_seen if '/item/' in path]
+    tokens = [path for path, _ in StubBrowseHandler.requests_seen if path == 'token']
+    print(f"   {len(parts)} parts from {len(searches)} search pages and {len(details)} item details "
+          f"in {elapsed:.2f}s (sequential: {(len(searches) + len(details)) * RESPONSE_DELAY:.0f}s+)")
+
+    assert len(parts) == len(queries) * ITEMS_PER_QUERY, len(parts)
+    assert len(searches) == len(queries) * 3  # 200 + 200 + 50
+    assert len(tokens) == 1
+    assert all(part.description.startswith('Fits 2005 Acura TL') for part in parts)
+    assert all(part.part_number == '38810-RDA-A01' for part in parts)
+
+
+def test_streamed_extraction():
+    print("Testing that extracted parts are written during the crawl...")
+    server, base_url = start_stub_server()
+    StubBrowseHandler.requests_seen.clear()
+    extractor = EbayBrowseExtractor('stub-id', 'stub-secret', api_base_url=base_url)
+
+    with tempfile.TemporaryDirectory() as directory:
+        json_file = os.path.join(directory, 'parts.jsonl')
+        with JsonlWriter(json_file, mode='w') as output:
+            requests_at_write = []
+            write = output.write
+
+            def counting_write(record):
+                requests_at_write.append(len(StubBrowseHandler.requests_seen))
+                write(record)
+
+            output.write = counting_write
+            parts = extractor.search_acura_ac_compressors(max_results=200, fetch_details=True, output=output)
+        total_requests = len(StubBrowseHandler.requests_seen)
+        csv_file = extractor.save_to_csv(iter_records(json_file), os.path.join(directory, 'parts.csv'))
+        with open(csv_file, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+    server.shutdown()
+
+    print(f"   {output.count} parts, first written after {requests_at_write[0]} of {total_requests} requests")
+    assert parts == [] and output.count == 200 == len(rows)
+    # The first search term's parts are on disk before the other terms' item details are fetched
+    assert requests_at_write[0] < total_requests - 100
+    assert rows[0]['fitments_count'] == '4' and rows[0]['part_number'] == '38810-RDA-A01'  # 2005-2008
+
+
+if __name__ == "__main__":
+    test_token_bucket()
+    test_browse_crawl()
+    test_streamed_extraction()
+    print("All async crawler tests passed")
@@ -0,0 +1,157 @@
+"""
+Test the query-matrix crawl scheduler against a local stub of the eBay Browse API
+No eBay credentials or network access needed
+"""
+
+import json
+import os
+import tempfile
+import time
+
+from async_crawler import BrowseCrawler
+from crawl_scheduler import CrawlJob, CrawlScheduler, CrawlStateStore, load_matrix, prioritize
+from ebay_browse_extractor import EbayBrowseExtractor
+from parts_interchange.http_client import HttpClient
+from test_async_crawler import ITEMS_PER_QUERY, StubBrowseHandler, start_stub_server
+
+
+def test_matrix_and_priority():
+    print("Testing matrix expansion and prioritization...")
+    jobs = load_matrix(os.path.join(os.path.dirname(__file__), 'crawl_matrix.example.json'))
+    assert len(jobs) == 4 * 2 + 3 * 1, len(jobs)
+
+    now = time.time()
+    stats = {
+        jobs[0].key: {'last_run_at': now - 3600, 'last_kept': 50, 'last_error': None},
+        jobs[1].key: {'last_run_at': now - 3600, 'last_kept': 0, 'last_error': None},
+        jobs[2].key: {'last_run_at': now - 48 * 3600, 'last_kept': 0, 'last_error': None},
+        jobs[3].key: {'last_run_at': now, 'last_kept': 10, 'last_error': 'timeout'},
+    }
+    ordered = prioritize(jobs[:5], stats, now)
+    # Never run and failed first, then stale, then productive over unproductive
+    assert set(ordered[:2]) == {jobs[3], jobs[4]}, ordered
+    assert ordered[2:] == [jobs[2], jobs[0], jobs[1]], ordered
+    print(f"   {len(jobs)} jobs, priority order ok")
+
+
+def test_scheduled_crawl():
+    print("Testing scheduled crawl...")
+    server, base_url = start_stub_server()
+    StubBrowseHandler.requests_seen.clear()
+    jobs = [
+        CrawlJob('33654', 'Acura', model, 2004, 2010, keywords, max_results=ITEMS_PER_QUERY)
+        for model in ('TL', 'TSX', 'MDX') for keywords in ('AC Compressor', 'Compressor Clutch')
+    ] + [CrawlJob('33654', 'Acura', 'RL', 2010, 2012, 'AC Compressor')]  # Fitments are 2005-2008
+
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, 'crawl.jsonl')
+        state = CrawlStateStore(os.path.join(directory, 'state.db'))
+        extractor = EbayBrowseExtractor('stub-id', 'stub-secret', api_base_url=base_url)
+        with BrowseCrawler(extractor, requests_per_second=200, concurrency=20) as crawler:
+            totals = CrawlScheduler(crawler, state, output, workers=4).run(jobs)
+            # Everything just ran: a one-job budget picks any of them, the rest are skipped,
+            # and the job's items are unchanged
+            again = CrawlScheduler(crawler, state, output, workers=4, max_jobs=1).run(jobs)
+
+        with open(output, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        stats = state.job_stats()
+        state.close()
+    server.shutdown()
+
+    print(f"   {totals}")
+    assert totals['jobs_run'] == len(jobs) and totals['jobs_failed'] == 0
+    assert totals['parts_written'] == 6 * ITEMS_PER_QUERY  # The RL job's items are outside its years
+    assert again['jobs_run'] == 1 and again['jobs_skipped'] == len(jobs) - 1 and again['parts_written'] == 0
+    assert len(records) == totals['parts_written'] + again['parts_written']
+    assert all(record['crawl_job'] in stats for record in records)
+    assert stats[jobs[-1].key]['last_items'] > 0 and stats[jobs[-1].key]['last_kept'] == 0
+
+
+def test_resume_and_change_detection():
+    print("Testing checkpointed resume and change detection...")
+    server, base_url = start_stub_server()
+    job = CrawlJob('33654', 'Acura', 'TL', 2004, 2010, 'AC Compressor', max_results=ITEMS_PER_QUERY)
+
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, 'crawl.jsonl')
+        state = CrawlStateStore(os.path.join(directory, 'state.db'))
+        extractor = EbayBrowseExtractor('stub-id', 'stub-secret', api_base_url=base_url)
+        # No retries, so the failing page fails fast
+        with BrowseCrawler(extractor, requests_per_second=200, concurrency=20,
+                           client=HttpClient(max_retries=0)) as crawler:
+            def crawl():
+                StubBrowseHandler.requests_seen.clear()
+                totals = CrawlScheduler(crawler, state, output).run([job])
+                searches = sum(1 for path, _ in StubBrowseHandler.requests_seen if path.endswith('/search'))
+                return totals, searches
+
+            # The middle page fails: the other two pages are written and checkpointed
+            StubBrowseHandler.failing_offsets = {200}
+            failed, _ = crawl()
+            assert failed['jobs_failed'] == 1 and failed['parts_written'] == 250, failed
+
+            # Resume fetches only the missing page
+            StubBrowseHandler.failing_offsets = set()
+            resumed, searches = crawl()
+            assert resumed['jobs_resumed'] == 1 and resumed['parts_written'] == 200 and searches == 1, resumed
+
+            # Nothing changed: every page is fetched, nothing is written
+            unchanged, searches = crawl()
+            assert unchanged['parts_written'] == 0 and unchanged['items_unchanged'] == ITEMS_PER_QUERY, unchanged
+            assert searches == 3
+
+            # Only the repriced items are written
+            StubBrowseHandler.prices = {'v1|AcuraTLACCompressor7|0': '99.00', 'v1|AcuraTLACCompressor301|0': '110.00'}
+            changed, _ = crawl()
+            assert changed['parts_written'] == 2, changed
+            StubBrowseHandler.prices = {}
+
+        with open(output, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        state.close()
+    server.shutdown()
+
+    assert len(records) == ITEMS_PER_QUERY + 2
+    assert len({record['ebay_item_id'] for record in records}) == ITEMS_PER_QUERY
+    print(f"   failed run wrote {failed['parts_written']}, resume wrote {resumed['parts_written']} "
+          f"from 1 page, unchanged rerun wrote 0, repricing wrote {changed['parts_written']}")
+
+
+def test_rejected_items_are_skipped():
+    print("Testing that unchanged rejected items are not parsed again...")
+    server, base_url = start_stub_server()
+    # Same search, but the stub's 2005-2008 fitments only match the second job's years
+    outside = CrawlJob('33654', 'Acura', 'RL', 2010, 2012, 'AC Compressor', max_results=ITEMS_PER_QUERY)
+    inside = CrawlJob('33654', 'Acura', 'RL', 2005, 2008, 'AC Compressor', max_results=ITEMS_PER_QUERY)
+
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, 'crawl.jsonl')
+        state = CrawlStateStore(os.path.join(directory, 'state.db'))
+        extractor = EbayBrowseExtractor('stub-id', 'stub-secret', api_base_url=base_url)
+        parsed = []
+        parse_browse_item = extractor.parse_browse_item
+        extractor.parse_browse_item = lambda item: parsed.append(item) or parse_browse_item(item)
+        with BrowseCrawler(extractor, requests_per_second=200, concurrency=20) as crawler:
+            first = CrawlScheduler(crawler, state, output).run([outside])
+            parsed_first = len(parsed)
+            rerun = CrawlScheduler(crawler, state, output).run([outside])
+            parsed_rerun = len(parsed) - parsed_first
+            # Another job's rejections do not hide the items from this one
+            other = CrawlScheduler(crawler, state, output).run([inside])
+        state.close()
+    server.shutdown()
+
+    assert first['parts_written'] == 0 and parsed_first == ITEMS_PER_QUERY, first
+    assert rerun['items_unchanged'] == ITEMS_PER_QUERY and parsed_rerun == 0, rerun
+    assert other['parts_written'] == ITEMS_PER_QUERY, other
+    print(f"   first run parsed {parsed_first}, rerun parsed {parsed_rerun}, "
+          f"matching job wrote {other['parts_written']}")
+
+
+if __name__ == "__main__":
+    test_matrix_and_priority()
+    test_scheduled_crawl()
+    test_resume_and_change_detection()
+    test_rejected_items_are_skipped()
+    print("All crawl scheduler tests passed")
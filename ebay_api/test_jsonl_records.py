@@ -0,0 +1,100 @@
+"""
+Test streaming JSONL writing and reading of eBay extraction results
+"""
+
+import json
+import os
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+import jsonl_records
+from jsonl_records import JsonlWriter, iter_records
+
+RECORD_COUNT = 50000
+MAX_PEAK_MEMORY = 4 * 1024 * 1024  # Well under the size of the files read
+
+
+def sample_part(index):
+    return {
+        'ebay_item_id': f'v1|{index}|0',
+        'title': f'2005-2008 Acura TL AC Compressor ❄ #{index}',
+        'price': 100 + index % 50,
+        'fitments': [{'year': 2005 + index % 4, 'make': 'Acura', 'model': 'TL'}],
+    }
+
+
+def test_round_trip(tmp_path):
+    print("Testing JSONL round trip...")
+    path = os.path.join(tmp_path, 'parts.jsonl')
+    with JsonlWriter(path, mode='w') as output:
+        for index in range(3):
+            output.write(sample_part(index))
+    with JsonlWriter(path) as output:
+        output.write(sample_part(3))
+
+    records = list(iter_records(path))
+    assert records == [sample_part(index) for index in range(4)], records
+    assert output.count == 1
+
+
+def test_truncated_line_is_skipped(tmp_path):
+    print("Testing a line cut short by a crash...")
+    path = os.path.join(tmp_path, 'crashed.jsonl')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(sample_part(0)) + '\n\n' + json.dumps(sample_part(1)) + '\n{"ebay_item_id": "v1|2')
+
+    assert [record['ebay_item_id'] for record in iter_records(path)] == ['v1|0|0', 'v1|1|0']
+
+
+def test_legacy_json_array(tmp_path):
+    print("Testing legacy JSON array files...")
+    path = os.path.join(tmp_path, 'legacy.json')
+    parts = [sample_part(index) for index in range(50)]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(parts, f, indent=2, ensure_ascii=False)
+
+    # Tiny chunks make records straddle every read boundary
+    chunk_size = jsonl_records.READ_CHUNK_SIZE
+    jsonl_records.READ_CHUNK_SIZE = 7
+    try:
+        assert list(iter_records(path)) == parts
+    finally:
+        jsonl_records.READ_CHUNK_SIZE = chunk_size
+
+    empty = os.path.join(tmp_path, 'empty.json')
+    with open(empty, 'w') as f:
+        f.write('[ ]\n')
+    assert list(iter_records(empty)) == []
+
+
+def test_bounded_memory(tmp_path):
+    print("Testing memory use while streaming...")
+    for name, write in (('large.jsonl', None), ('large.json', json.dump)):
+        path = os.path.join(tmp_path, name)
+        if write:
+            with open(path, 'w', encoding='utf-8') as f:
+                write([sample_part(index) for index in range(RECORD_COUNT)], f, indent=2)
+        else:
+            with JsonlWriter(path, mode='w') as output:
+                for index in range(RECORD_COUNT):
+                    output.write(sample_part(index))
+
+        tracemalloc.start()
+        count = sum(1 for _ in iter_records(path))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        size = os.path.getsize(path)
+        print(f"   {name}: {count} records from {size / 1024:.0f} KB, peak {peak / 1024:.0f} KB")
+        assert count == RECORD_COUNT
+        assert peak < MAX_PEAK_MEMORY < size, (peak, size)
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        test_round_trip(Path(directory))
+        test_truncated_line_is_skipped(Path(directory))
+        test_legacy_json_array(Path(directory))
+        test_bounded_memory(Path(directory))
+    print("All JSONL record tests passed")
@@ -0,0 +1,22 @@
+import json
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """Newline-delimited JSON: one object per line, blank lines ignored. Parses to a list."""
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        records = []
+        for line_number, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line.decode(encoding)))
+            except (UnicodeDecodeError, ValueError) as e:
+                raise ParseError(f'NDJSON parse error on line {line_number}: {e}')
+        return records
@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from apps.parts.models import (
     Part, Manufacturer, PartCategory, InterchangeGroup, PartGroup, PartGroupMembership,
-    RawListingData, ConsensusFitment, ConflictingFitment
+    RawListingData, ConsensusFitment, ConflictingFitment, PartPriceRollup
 )
 from apps.vehicles.models import Vehicle, Make, Model, Engine, Trim
 from apps.fitments.models import Fitment
@@ -189,3 +189,14 @@ class PartGroupLookupSerializer(serializers.ModelSerializer):
     
     def get_parts_count(self, obj):
         return obj.memberships.count()
+
+
+class PartPriceRollupSerializer(serializers.ModelSerializer):
+    mean_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    
+    class Meta:
+        model = PartPriceRollup
+        fields = [
+            'part_number', 'vehicle_make', 'vehicle_model', 'listing_count',
+            'min_price', 'max_price', 'mean_price', 'median_price', 'updated_at'
+        ]
@@ -24,4 +24,6 @@ urlpatterns = [
     path('stats/', views.DatabaseStatsView.as_view(), name='database-stats'),
     path('junkyard-search/', views.JunkyardSearchView.as_view(), name='junkyard-search'),
     path('bulk/fitments/', views.BulkFitmentCreateView.as_view(), name='bulk-fitment-create'),
+    path('ingest/listings/', views.RawListingIngestView.as_view(), name='raw-listing-ingest'),
+    path('prices/<str:part_number>/', views.PartPriceView.as_view(), name='part-price'),
 ]
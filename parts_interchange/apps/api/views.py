@@ -1,25 +1,32 @@
 import logging
+from django.conf import settings
 from django.core.cache import cache
-from django.db.models import Count, Min, Max
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_page
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import BasePermission, IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
+from rest_framework.throttling import ScopedRateThrottle
 from rest_framework.views import APIView
 
-from apps.parts.models import Part, Manufacturer, PartCategory, InterchangeGroup, PartGroup, PartGroupMembership
+from apps.parts.models import (
+    Part, Manufacturer, PartCategory, InterchangeGroup, PartGroup, PartGroupMembership, PartPriceRollup
+)
 from apps.vehicles.models import Vehicle, Make, Model, Engine
 from apps.fitments.models import Fitment
+from apps.parts.stats import get_statistics
+from apps.parts.ingestion import ListingIngestor
+from .parsers import NDJSONParser
 from .serializers import (
     PartSerializer, PartLookupSerializer,
     VehicleSerializer, VehicleLookupSerializer,
     FitmentSerializer, FitmentLookupSerializer,
     ManufacturerSerializer, MakeSerializer, ModelSerializer,
     EngineSerializer, InterchangeGroupSerializer,
-    PartGroupSerializer, PartGroupMembershipSerializer
+    PartGroupSerializer, PartGroupMembershipSerializer, PartPriceRollupSerializer
 )
 
 logger = logging.getLogger(__name__)
@@ -231,15 +238,17 @@ class DatabaseStatsView(APIView):
     """Get database statistics."""
     permission_classes = [IsAdminUser]
 
-    @method_decorator(cache_page(CACHE_TIMEOUT_LONG))
     def get(self, request):
+        snapshot = get_statistics()
+        vehicles = snapshot['vehicles']
         stats = {
-            'parts': {'total': Part.objects.count(), 'active': Part.objects.filter(is_active=True).count()},
-            'vehicles': {'total': Vehicle.objects.count(), 'active': Vehicle.objects.filter(is_active=True).count()},
-            'fitments': {'total': Fitment.objects.count(), 'verified': Fitment.objects.filter(is_verified=True).count()},
-            'interchange_groups': InterchangeGroup.objects.count(),
-            'part_groups': PartGroup.objects.count(),
-            'year_range': Vehicle.objects.aggregate(min_year=Min('year'), max_year=Max('year')),
+            'parts': {'total': snapshot['parts']['total'], 'active': snapshot['parts']['active']},
+            'vehicles': {'total': vehicles['total'], 'active': vehicles['active']},
+            'fitments': snapshot['fitments'],
+            'interchange_groups': snapshot['interchange_groups'],
+            'part_groups': snapshot['part_groups'],
+            'year_range': {'min_year': vehicles['min_year'], 'max_year': vehicles['max_year']},
+            'computed_at': snapshot['computed_at'],
         }
         return Response(stats)
 
@@ -337,3 +346,81 @@ class BulkFitmentCreateView(APIView):
                 {'error': 'An error occurred during bulk creation.'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class CanIngestListings(BasePermission):
+    """Authenticated users with the parts.add_rawlistingdata permission (e.g. crawler tokens)"""
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(user and user.is_authenticated and user.has_perm('parts.add_rawlistingdata'))
+
+
+class RawListingIngestView(APIView):
+    """
+    Bulk-ingest raw eBay listings for consensus processing.
+    Body: NDJSON (application/x-ndjson, one listing per line) or a JSON array of listings.
+    Duplicates of (source_ebay_item_id, vehicle fitment) are skipped; invalid listings are reported.
+    """
+    permission_classes = [CanIngestListings]
+    parser_classes = [NDJSONParser, JSONParser]
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'listing_ingest'
+
+    def post(self, request, *args, **kwargs):
+        records = request.data
+        if not isinstance(records, list):
+            return Response(
+                {'error': 'Expected NDJSON listings or a JSON array of listing objects.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        max_batch = getattr(settings, 'PARTS_INTERCHANGE', {}).get('INGEST_MAX_BATCH_SIZE', 10000)
+        if len(records) > max_batch:
+            return Response(
+                {'error': f'At most {max_batch} listings per request; received {len(records)}.'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
+        result = ListingIngestor().ingest(records)
+        return Response(result, status=status.HTTP_201_CREATED if result['inserted'] else status.HTTP_200_OK)
+
+
+class PartPriceView(APIView):
+    """
+    Listing price statistics for a part number from the maintained price index.
+    Optional `make` and `model` query params narrow it to one vehicle; otherwise the
+    part-level rollup is returned together with every make/model rollup.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, part_number, *args, **kwargs):
+        make = request.query_params.get('make', '').strip().upper()
+        model = request.query_params.get('model', '').strip().upper()
+        if bool(make) != bool(model):
+            return Response(
+                {'error': 'Provide both make and model, or neither.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        rollups = PartPriceRollup.objects.filter(part_number=part_number)
+        if make:
+            rollup = rollups.filter(vehicle_make=make, vehicle_model=model).first()
+            if rollup is None:
+                return Response(
+                    {'error': 'No priced listings for this part and vehicle.'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            return Response(PartPriceRollupSerializer(rollup).data)
+
+        rollups = list(rollups)
+        overall = next((rollup for rollup in rollups if not rollup.vehicle_make), None)
+        if overall is None:
+            return Response(
+                {'error': 'No priced listings for this part.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response({
+            **PartPriceRollupSerializer(overall).data,
+            'by_vehicle': PartPriceRollupSerializer([rollup for rollup in rollups if rollup.vehicle_make], many=True).data,
+        })
@@ -3,10 +3,14 @@ from django.db import models
 from django.conf import settings
 from django.utils.html import format_html
 from django.urls import reverse
+from django.utils.http import urlencode
+from django.utils import timezone
 from .models import (
-    Manufacturer, PartCategory, Part, InterchangeGroup, PartInterchange,
-    PartGroup, PartGroupMembership, RawListingData, ConsensusFitment, ConflictingFitment
+    FITMENT_SIGNATURE_FIELDS, Manufacturer, PartCategory, Part, InterchangeGroup, PartInterchange,
+    PartGroup, PartGroupMembership, RawListingData, ConsensusFitment, ConflictingFitment,
+    PartConsensusState, ConsensusPromotionIssue, ArchivedListingGroup, PartPriceRollup
 )
+from .consensus.incremental import mark_parts_dirty
 
 
 # Get page size from settings
@@ -452,16 +456,18 @@ class RawListingDataAdmin(admin.ModelAdmin):
     quality_weight.short_description = 'Quality Weight'
     
     def get_fitment_signature(self, obj):
-        return obj.get_fitment_signature()
+        return format_html('{} <code>#{}</code>', obj.get_fitment_signature(), obj.fitment_hash)
     get_fitment_signature.short_description = 'Fitment Signature'
     
     def mark_verified_seller(self, request, queryset):
         updated = queryset.update(is_verified_seller=True)
+        mark_parts_dirty(queryset.values_list('part_number', flat=True))
         self.message_user(request, f"Marked {updated} listings as verified seller")
     mark_verified_seller.short_description = "Mark as verified seller"
     
     def mark_has_oem_reference(self, request, queryset):
         updated = queryset.update(has_oem_reference=True)
+        mark_parts_dirty(queryset.values_list('part_number', flat=True))
         self.message_user(request, f"Marked {updated} listings as having OEM reference")
     mark_has_oem_reference.short_description = "Mark as having OEM reference"
     
@@ -502,6 +508,23 @@ class RawListingDataAdmin(admin.ModelAdmin):
     )
 
 
+def packed_listings_display(obj):
+    """Link to the RawListingData rows behind a packed listing id blob.
+
+    Filters on the part number, plus the fitment columns for a consensus group,
+    instead of listing every id, which would not fit in a URL for large groups.
+    A conflict links all listings of its part number.
+    """
+    if obj.listing_ids_packed is None:
+        return '-'
+    query = urlencode({
+        'part_number': obj.part_number,
+        **{field: getattr(obj, field) for field in FITMENT_SIGNATURE_FIELDS if hasattr(obj, field)},
+    })
+    url = reverse('admin:parts_rawlistingdata_changelist') + '?' + query
+    return format_html('<a href="{}">{} listings</a>', url, obj.get_listing_count())
+
+
 @admin.register(ConsensusFitment)
 class ConsensusFitmentAdmin(admin.ModelAdmin):
     list_display = [
@@ -513,7 +536,7 @@ class ConsensusFitmentAdmin(admin.ModelAdmin):
         'status', 'vehicle_year', 'vehicle_make', 'last_updated'
     ]
     search_fields = ['part_number', 'vehicle_make', 'vehicle_model']
-    readonly_fields = ['last_updated', 'production_ready', 'get_fitment_signature']
+    readonly_fields = ['last_updated', 'production_ready', 'get_fitment_signature', 'packed_listings']
     list_per_page = ADMIN_PAGE_SIZE
     ordering = ['-confidence_score', 'part_number']
     show_full_result_count = False
@@ -529,16 +552,20 @@ class ConsensusFitmentAdmin(admin.ModelAdmin):
     production_ready.boolean = True
     
     def get_fitment_signature(self, obj):
-        return obj.get_fitment_signature()
+        return format_html('{} <code>#{}</code>', obj.get_fitment_signature(), obj.fitment_hash)
     get_fitment_signature.short_description = 'Fitment Signature'
     
+    def packed_listings(self, obj):
+        return packed_listings_display(obj)
+    packed_listings.short_description = 'Packed Listings'
+    
     def mark_verified(self, request, queryset):
-        updated = queryset.update(status='VERIFIED')
+        updated = queryset.update(status='VERIFIED', last_updated=timezone.now())  # update() skips auto_now
         self.message_user(request, f"Marked {updated} consensus fitments as verified")
     mark_verified.short_description = "Mark as manually verified"
     
     def mark_rejected(self, request, queryset):
-        updated = queryset.update(status='REJECTED')
+        updated = queryset.update(status='REJECTED', last_updated=timezone.now())  # update() skips auto_now
         self.message_user(request, f"Marked {updated} consensus fitments as rejected")
     mark_rejected.short_description = "Mark as rejected/incorrect"
     
@@ -558,7 +585,7 @@ class ConsensusFitmentAdmin(admin.ModelAdmin):
             'fields': ('confidence_score', 'supporting_listings_count', 'total_weight_score', 'status')
         }),
         ('Source Data', {
-            'fields': ('supporting_raw_listings',),
+            'fields': ('supporting_raw_listings', 'packed_listings'),
             'classes': ('collapse',)
         }),
         ('Metadata', {
@@ -580,7 +607,7 @@ class ConflictingFitmentAdmin(admin.ModelAdmin):
         'resolution_status', 'created_date', 'resolved_date'
     ]
     search_fields = ['part_number', 'conflict_description', 'resolution_notes']
-    readonly_fields = ['created_date', 'conflicting_listings_count']
+    readonly_fields = ['created_date', 'conflicting_listings_count', 'packed_listings']
     list_per_page = ADMIN_PAGE_SIZE
     ordering = ['-created_date']
     show_full_result_count = False
@@ -592,9 +619,13 @@ class ConflictingFitmentAdmin(admin.ModelAdmin):
     conflict_description_short.short_description = 'Conflict Description'
     
     def conflicting_listings_count(self, obj):
-        return obj.conflicting_listings.count()
+        return obj.get_listing_count()
     conflicting_listings_count.short_description = 'Listings Count'
     
+    def packed_listings(self, obj):
+        return packed_listings_display(obj)
+    packed_listings.short_description = 'Packed Listings'
+    
     def mark_resolved(self, request, queryset):
         from django.utils import timezone
         updated = queryset.update(
@@ -628,7 +659,7 @@ class ConflictingFitmentAdmin(admin.ModelAdmin):
             'fields': ('resolution_status', 'resolved_by', 'resolved_date', 'resolution_notes')
         }),
         ('Source Data', {
-            'fields': ('conflicting_listings',),
+            'fields': ('conflicting_listings', 'packed_listings'),
             'classes': ('collapse',)
         }),
         ('Metadata', {
@@ -638,3 +669,69 @@ class ConflictingFitmentAdmin(admin.ModelAdmin):
     )
     
     filter_horizontal = ['conflicting_listings']
+
+
+@admin.register(ArchivedListingGroup)
+class ArchivedListingGroupAdmin(admin.ModelAdmin):
+    list_display = [
+        'part_number', 'vehicle_year', 'vehicle_make', 'vehicle_model', 'listing_count',
+        'first_extraction_date', 'last_extraction_date', 'archived_at'
+    ]
+    list_filter = ['vehicle_make']
+    search_fields = ['part_number', 'vehicle_make', 'vehicle_model']
+    readonly_fields = [
+        'part_number', 'vehicle_year', 'vehicle_make', 'vehicle_model', 'vehicle_trim', 'vehicle_engine',
+        'fitment_hash', 'listing_count', 'weight_sum_milli', 'business_seller_count', 'verified_seller_count',
+        'oem_reference_count', 'detailed_description_count', 'first_extraction_date', 'last_extraction_date',
+        'archived_at'
+    ]
+    list_per_page = ADMIN_PAGE_SIZE
+    ordering = ['part_number']
+    show_full_result_count = False
+
+
+@admin.register(PartPriceRollup)
+class PartPriceRollupAdmin(admin.ModelAdmin):
+    list_display = [
+        'part_number', 'vehicle_make', 'vehicle_model', 'listing_count', 'min_price', 'median_price',
+        'mean_price', 'max_price', 'updated_at'
+    ]
+    search_fields = ['part_number']
+    readonly_fields = [
+        'part_number', 'vehicle_make', 'vehicle_model', 'listing_count', 'min_price', 'median_price',
+        'mean_price', 'max_price', 'price_sum', 'price_histogram', 'archived_count', 'archived_min_price',
+        'archived_max_price', 'archived_price_sum', 'archived_histogram', 'updated_at'
+    ]
+    list_per_page = ADMIN_PAGE_SIZE
+    ordering = ['part_number', 'vehicle_make', 'vehicle_model']
+    show_full_result_count = False
+
+
+@admin.register(PartConsensusState)
+class PartConsensusStateAdmin(admin.ModelAdmin):
+    list_display = ['part_number', 'needs_processing', 'queued_at', 'last_processed', 'leased_by', 'lease_expires_at']
+    list_filter = ['needs_processing']
+    search_fields = ['part_number', 'leased_by']
+    readonly_fields = ['input_fingerprint', 'last_processed', 'leased_by', 'lease_expires_at']
+    list_per_page = ADMIN_PAGE_SIZE
+    ordering = ['part_number']
+    show_full_result_count = False
+    
+    actions = ['requeue']
+    
+    def requeue(self, request, queryset):
+        queued = mark_parts_dirty(queryset.values_list('part_number', flat=True))
+        self.message_user(request, f"Queued {queued} part numbers for consensus processing")
+    requeue.short_description = "Queue for consensus processing"
+
+
+@admin.register(ConsensusPromotionIssue)
+class ConsensusPromotionIssueAdmin(admin.ModelAdmin):
+    list_display = ['part_number', 'consensus_fitment', 'reason', 'candidates', 'first_seen', 'last_seen']
+    list_filter = ['reason']
+    search_fields = ['part_number', 'consensus_fitment__vehicle_make', 'consensus_fitment__vehicle_model']
+    readonly_fields = ['consensus_fitment', 'part_number', 'reason', 'candidates', 'first_seen', 'last_seen']
+    list_select_related = ['consensus_fitment']
+    list_per_page = ADMIN_PAGE_SIZE
+    ordering = ['reason', 'part_number']
+    show_full_result_count = False
@@ -5,3 +5,6 @@ class PartsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.parts'
     verbose_name = 'Parts Management'
+
+    def ready(self):
+        from . import signals  # noqa: F401 - registers consensus queue receivers
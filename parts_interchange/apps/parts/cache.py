@@ -93,16 +93,16 @@ class PartsCacheManager:
         return cache.get(key)
     
     @classmethod
-    def cache_database_stats(cls, stats: Dict) -> str:
-        """Cache database statistics"""
-        key = cls._make_key(cls.PREFIX_STATS, 'database')
-        cache.set(key, stats, cls.TIMEOUT_LONG)  # Long timeout for stats
+    def cache_statistics_snapshot(cls, stats: Dict) -> str:
+        """Cache the dashboard statistics snapshot (see apps.parts.stats)"""
+        key = cls._make_key(cls.PREFIX_STATS, 'snapshot')
+        cache.set(key, stats, cls.TIMEOUT_LONG)
         return key
     
     @classmethod
-    def get_database_stats(cls) -> Optional[Dict]:
-        """Get cached database statistics"""
-        key = cls._make_key(cls.PREFIX_STATS, 'database')
+    def get_statistics_snapshot(cls) -> Optional[Dict]:
+        """Get the cached dashboard statistics snapshot"""
+        key = cls._make_key(cls.PREFIX_STATS, 'snapshot')
         return cache.get(key)
     
     @classmethod
@@ -144,8 +144,7 @@ class PartsCacheManager:
     @classmethod
     def warm_critical_caches(cls) -> Dict[str, Any]:
         """Warm up critical caches - called by management command"""
-        from apps.parts.models import Part, Manufacturer
-        from apps.vehicles.models import Make
+        from apps.parts.models import Manufacturer
         from django.db.models import Count
         
         results = {
@@ -154,14 +153,10 @@ class PartsCacheManager:
         }
         
         try:
-            # Warm database stats
-            stats = {
-                'parts_count': Part.objects.filter(is_active=True).count(),
-                'manufacturers_count': Manufacturer.objects.count(),
-                'makes_count': Make.objects.filter(is_active=True).count(),
-            }
-            cls.cache_database_stats(stats)
-            results['warmed_caches'].append('database_stats')
+            # Warm the dashboard statistics snapshot (the only cached table counts)
+            from apps.parts.stats import refresh_statistics
+            refresh_statistics()
+            results['warmed_caches'].append('statistics_snapshot')
             
             # Warm top manufacturers
             top_manufacturers = Manufacturer.objects.annotate(
@@ -0,0 +1,291 @@
+"""Aggregate queries behind the consensus quality analysis report
+
+Each section of the report is one aggregate query: per-part listing
+distributions (with percentiles and a histogram) are computed over a
+grouped subquery, status and confidence breakdowns use conditional
+counts, and trends are bucketed by day in the database. Nothing loads
+rows into Python except iter_part_distribution(), which streams.
+"""
+
+from datetime import datetime, time, timedelta
+from django.db import connection
+from django.db.models import Aggregate, Avg, Count, IntegerField, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from typing import Dict, Iterator, List, Tuple
+import math
+
+from ..models import RawListingData, ConsensusFitment, ConflictingFitment
+
+PERCENTILES = (0.5, 0.9, 0.99)
+
+# (label, lowest count, highest count or None) over listings per part number
+LISTING_COUNT_BUCKETS = (
+    ('1', 1, 1), ('2', 2, 2), ('3-4', 3, 4), ('5-9', 5, 9), ('10-19', 10, 19),
+    ('20-49', 20, 49), ('50-99', 50, 99), ('100+', 100, None),
+)
+
+# (label, lowest confidence, next bucket's lowest confidence or None)
+CONFIDENCE_BUCKETS = (
+    ('90-100', 90, None), ('80-89', 80, 90), ('70-79', 70, 80), ('60-69', 60, 70), ('50-59', 50, 60),
+    ('40-49', 40, 50), ('30-39', 30, 40), ('20-29', 20, 30), ('0-19', 0, 20),
+)
+
+# (label, youngest age in days, oldest age in days or None)
+CONFLICT_AGE_BUCKETS = (
+    ('0-7 days', 0, 7), ('8-30 days', 8, 30), ('31-90 days', 31, 90), ('90+ days', 91, None),
+)
+
+
+class PercentileDisc(Aggregate):
+    """PostgreSQL percentile_disc(fraction) WITHIN GROUP (ORDER BY expression)"""
+    function = 'percentile_disc'
+    template = '%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = IntegerField()
+
+    def __init__(self, expression, fraction: float, **extra):
+        super().__init__(expression, fraction=float(fraction), **extra)
+
+
+def percentage(count, total) -> float:
+    return (count / total * 100) if total else 0
+
+
+def _count_range(field: str, low, high, inclusive_high: bool = True) -> Q:
+    """low <= field <= high (or < high); a None bound is open"""
+    condition = Q()
+    if low is not None:
+        condition &= Q(**{f'{field}__gte': low})
+    if high is not None:
+        condition &= Q(**{f'{field}__lte' if inclusive_high else f'{field}__lt': high})
+    return condition
+
+
+def part_listing_counts():
+    """Listings per part number, as a grouped queryset"""
+    return (
+        RawListingData.objects
+        .order_by()
+        .values('part_number')
+        .annotate(listing_count=Count('id'))
+    )
+
+
+def listing_distribution(min_listings: int = 2) -> Dict:
+    """Distribution of listings per part number, aggregated over the grouped subquery"""
+    aggregates = {
+        'part_numbers': Count('part_number'),
+        'max_listings_per_part': Max('listing_count'),
+        'min_listings_per_part': Min('listing_count'),
+        'avg_listings_per_part': Avg('listing_count'),
+        'parts_with_single_listing': Count('part_number', filter=Q(listing_count=1)),
+        'parts_with_multiple_listings': Count('part_number', filter=Q(listing_count__gt=1)),
+        'eligible_part_numbers': Count('part_number', filter=Q(listing_count__gte=min_listings)),
+    }
+    aggregates.update({
+        f'bucket_{label}': Count('part_number', filter=_count_range('listing_count', low, high))
+        for label, low, high in LISTING_COUNT_BUCKETS
+    })
+    if connection.vendor == 'postgresql':
+        aggregates.update({
+            f'p{int(fraction * 100)}': PercentileDisc('listing_count', fraction) for fraction in PERCENTILES
+        })
+
+    row = part_listing_counts().aggregate(**aggregates)
+    part_count = row['part_numbers']
+    if connection.vendor != 'postgresql':
+        row.update(_percentiles_by_offset(part_count))
+
+    return {
+        'part_numbers': part_count,
+        'eligible_part_numbers': row['eligible_part_numbers'],
+        'max_listings_per_part': row['max_listings_per_part'] or 0,
+        'min_listings_per_part': row['min_listings_per_part'] or 0,
+        'avg_listings_per_part': float(row['avg_listings_per_part'] or 0),
+        'parts_with_single_listing': row['parts_with_single_listing'],
+        'parts_with_multiple_listings': row['parts_with_multiple_listings'],
+        'percentiles': {f'p{int(fraction * 100)}': row[f'p{int(fraction * 100)}'] for fraction in PERCENTILES},
+        'histogram': {label: row[f'bucket_{label}'] for label, _, _ in LISTING_COUNT_BUCKETS},
+    }
+
+
+def _percentiles_by_offset(part_count: int) -> Dict:
+    """Nearest-rank percentiles with one ORDER BY ... LIMIT 1 OFFSET n query each (non-PostgreSQL)"""
+    values = {}
+    for fraction in PERCENTILES:
+        key = f'p{int(fraction * 100)}'
+        if not part_count:
+            values[key] = None
+            continue
+        offset = max(0, math.ceil(fraction * part_count) - 1)
+        values[key] = (
+            part_listing_counts()
+            .order_by('listing_count')
+            .values_list('listing_count', flat=True)[offset]
+        )
+    return values
+
+
+def raw_data_summary(min_listings: int = 2, recent_days: int = 30) -> Dict:
+    """Raw listing counts, quality flags and the per-part distribution"""
+    recent_cutoff = timezone.now() - timedelta(days=recent_days)
+    row = RawListingData.objects.order_by().aggregate(
+        total=Count('id'),
+        verified_sellers=Count('id', filter=Q(is_verified_seller=True)),
+        business_sellers=Count('id', filter=Q(seller_is_business=True)),
+        oem_references=Count('id', filter=Q(has_oem_reference=True)),
+        detailed_descriptions=Count('id', filter=Q(has_detailed_description=True)),
+        recent=Count('id', filter=Q(extraction_date__gte=recent_cutoff)),
+        weight_milli=Sum(RawListingData.quality_weight_expression()),
+    )
+    total = row['total']
+    distribution = listing_distribution(min_listings)
+
+    return {
+        'total_listings': total,
+        'unique_part_numbers': distribution['part_numbers'],
+        'eligible_part_numbers': distribution['eligible_part_numbers'],
+        'recent_listings_30_days': row['recent'],
+        'average_listing_weight': (row['weight_milli'] or 0) / 1000 / total if total else 0,
+        'quality_indicators': {
+            'verified_sellers': row['verified_sellers'],
+            'verified_sellers_percentage': percentage(row['verified_sellers'], total),
+            'business_sellers': row['business_sellers'],
+            'business_sellers_percentage': percentage(row['business_sellers'], total),
+            'has_oem_reference': row['oem_references'],
+            'oem_reference_percentage': percentage(row['oem_references'], total),
+            'detailed_description': row['detailed_descriptions'],
+            'detailed_desc_percentage': percentage(row['detailed_descriptions'], total),
+        },
+        'listing_distribution': {
+            key: distribution[key] for key in (
+                'max_listings_per_part', 'min_listings_per_part', 'avg_listings_per_part',
+                'parts_with_single_listing', 'parts_with_multiple_listings', 'percentiles', 'histogram',
+            )
+        },
+    }
+
+
+def consensus_summary() -> Dict:
+    """Status, confidence histogram, support and production readiness in one query"""
+    aggregates = {
+        'total': Count('id'),
+        'part_numbers': Count('part_number', distinct=True),
+        'avg_supporting_listings': Avg('supporting_listings_count'),
+        'max_supporting_listings': Max('supporting_listings_count'),
+        'min_supporting_listings': Min('supporting_listings_count'),
+        'avg_confidence': Avg('confidence_score'),
+        'high_quality': Count('id', filter=Q(confidence_score__gte=80)),
+        'production_ready': Count(
+            'id', filter=Q(status__in=['HIGH_CONFIDENCE', 'VERIFIED'], confidence_score__gte=80)
+        ),
+    }
+    aggregates.update({
+        f'status_{status}': Count('id', filter=Q(status=status)) for status, _ in ConsensusFitment.STATUS_CHOICES
+    })
+    aggregates.update({
+        f'confidence_{label}': Count('id', filter=_count_range('confidence_score', low, high, inclusive_high=False))
+        for label, low, high in CONFIDENCE_BUCKETS
+    })
+    row = ConsensusFitment.objects.order_by().aggregate(**aggregates)
+    total = row['total']
+
+    return {
+        'total_consensus_fitments': total,
+        'processed_part_numbers': row['part_numbers'],
+        'status_distribution': {
+            status: {
+                'count': row[f'status_{status}'],
+                'percentage': percentage(row[f'status_{status}'], total),
+                'description': description,
+            }
+            for status, description in ConsensusFitment.STATUS_CHOICES
+        },
+        'confidence_distribution': {
+            label: {
+                'count': row[f'confidence_{label}'],
+                'percentage': percentage(row[f'confidence_{label}'], total),
+            }
+            for label, _, _ in CONFIDENCE_BUCKETS
+        },
+        'supporting_listings_stats': {
+            key: row[key] for key in ('avg_supporting_listings', 'max_supporting_listings', 'min_supporting_listings')
+        },
+        'production_ready': {
+            'count': row['production_ready'],
+            'percentage': percentage(row['production_ready'], total),
+        },
+        'average_confidence_score': float(row['avg_confidence'] or 0),
+        'high_quality_percentage': percentage(row['high_quality'], total),
+    }
+
+
+def conflict_summary() -> Dict:
+    """Conflict totals by resolution status and pending-conflict ages in one query"""
+    now = timezone.now()
+    aggregates = {
+        'total': Count('id'),
+        'pending': Count('id', filter=Q(resolution_status='PENDING')),
+        'resolved': Count('id', filter=Q(resolution_status='RESOLVED')),
+        'dismissed': Count('id', filter=Q(resolution_status='DISMISSED')),
+    }
+    aggregates.update({
+        f'age_{index}': Count('id', filter=Q(resolution_status='PENDING') & _count_range(
+            'created_date', now - timedelta(days=oldest) if oldest is not None else None,
+            now - timedelta(days=youngest),
+        ))
+        for index, (_, youngest, oldest) in enumerate(CONFLICT_AGE_BUCKETS)
+    })
+    row = ConflictingFitment.objects.order_by().aggregate(**aggregates)
+
+    return {
+        'total_conflicts': row['total'],
+        'pending_conflicts': row['pending'],
+        'resolved_conflicts': row['resolved'],
+        'dismissed_conflicts': row['dismissed'],
+        'resolution_rate_percentage': percentage(row['resolved'] + row['dismissed'], row['total']),
+        'pending_age_distribution': {
+            label: row[f'age_{index}'] for index, (label, _, _) in enumerate(CONFLICT_AGE_BUCKETS)
+        },
+    }
+
+
+def daily_counts(queryset, date_field: str, start) -> Dict:
+    """{date: rows} for rows at or after start, bucketed by day in the database"""
+    rows = (
+        queryset
+        .filter(**{f'{date_field}__gte': start})
+        .order_by()
+        .annotate(day=TruncDate(date_field))
+        .values('day')
+        .annotate(count=Count('id'))
+        .values_list('day', 'count')
+    )
+    return dict(rows)
+
+
+def daily_trends(days_back: int) -> List[Dict]:
+    """Raw listings extracted and consensus fitments updated per day, oldest first"""
+    if days_back <= 0:
+        return []
+    first_day = timezone.localdate() - timedelta(days=days_back - 1)
+    start = timezone.make_aware(datetime.combine(first_day, time.min))
+
+    raw = daily_counts(RawListingData.objects, 'extraction_date', start)
+    consensus = daily_counts(ConsensusFitment.objects, 'last_updated', start)
+
+    days = [first_day + timedelta(days=offset) for offset in range(days_back)]
+    return [
+        {
+            'date': day.strftime('%Y-%m-%d'),
+            'raw_listings': raw.get(day, 0),
+            'consensus_fitments': consensus.get(day, 0),
+        }
+        for day in days
+    ]
+
+
+def iter_part_distribution(chunk_size: int = 5000) -> Iterator[Tuple[str, int]]:
+    """Stream (part_number, listing_count) rows, busiest part numbers first"""
+    rows = part_listing_counts().order_by('-listing_count', 'part_number').values_list('part_number', 'listing_count')
+    return rows.iterator(chunk_size=chunk_size)
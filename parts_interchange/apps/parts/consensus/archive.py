@@ -0,0 +1,216 @@
+"""Hot/cold split of RawListingData keyed on extraction_date
+
+RawListingData only keeps the hot window (RAW_LISTING_HOT_DAYS). Older
+listings are folded into ArchivedListingGroup rows (one per part number and
+fitment signature, holding the statistics consensus scores from) and then
+deleted, so the raw table, its indexes and every consensus GROUP BY stay
+proportional to the hot window.
+
+Both consensus engines add the archived statistics to the hot groups before
+scoring (see add_archived_groups), and groups that only exist in the archive
+still produce consensus rows, so archiving never changes consensus output.
+Archived listings are no longer linked from ConsensusFitment or
+ConflictingFitment (through rows and packed ids alike), and conflict
+detection only looks at hot listings. Archived listings keep their
+(source_ebay_item_id, fitment_hash) in ArchivedListingKey, so ingestion does
+not insert them again as hot listings. The prices of archived listings move
+into the price index's archived statistics in the same transaction that
+deletes them (see pricing.fold_archived_prices).
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.utils import timezone
+from typing import Dict, Iterable, List
+import logging
+import time
+
+from ..models import (
+    FITMENT_SIGNATURE_FIELDS as FITMENT_FIELDS, ArchivedListingGroup, ArchivedListingKey, ConflictingFitment,
+    ConsensusFitment,
+    RawListingData, raw_listing_hot_days
+)
+from ..pricing import fold_archived_prices
+from .scoring import FLAG_COUNT_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# Additive per-group statistics, named like listing_group_annotations()
+STATISTIC_KEYS = ('listing_count', 'weight_milli', *FLAG_COUNT_FIELDS)
+
+
+def listing_group_annotations() -> Dict:
+    """Count, quality weight (thousandths) and quality flag counts of grouped RawListingData"""
+    return {
+        'listing_count': Count('id'),
+        'weight_milli': Sum(RawListingData.quality_weight_expression()),
+        'business_seller_count': Count('id', filter=Q(seller_is_business=True)),
+        'verified_seller_count': Count('id', filter=Q(is_verified_seller=True)),
+        'oem_reference_count': Count('id', filter=Q(has_oem_reference=True)),
+        'detailed_description_count': Count('id', filter=Q(has_detailed_description=True)),
+    }
+
+
+def archived_groups(part_numbers: Iterable[str]) -> Dict[str, Dict[int, Dict]]:
+    """Archived statistics as {part_number: {fitment_hash: row}}, rows keyed like STATISTIC_KEYS"""
+    rows = (
+        ArchivedListingGroup.objects
+        .filter(part_number__in=part_numbers)
+        .order_by()
+        .values('part_number', 'fitment_hash', *FITMENT_FIELDS, 'listing_count', *FLAG_COUNT_FIELDS,
+                weight_milli=F('weight_sum_milli'))
+    )
+    groups = {}
+    for row in rows:
+        groups.setdefault(row['part_number'], {})[row['fitment_hash']] = row
+    return groups
+
+
+def add_archived_statistics(rows: List[Dict], archived: Dict[int, Dict]) -> List[Dict]:
+    """Add one part number's archived groups ({fitment_hash: row}) to its grouped rows in place.
+
+    rows carry fitment_hash, FITMENT_FIELDS and STATISTIC_KEYS; archive-only
+    groups are appended (without listing ids).
+    """
+    by_hash = {row['fitment_hash']: row for row in rows}
+    for fitment_hash, group in archived.items():
+        row = by_hash.get(fitment_hash)
+        if row is None:
+            rows.append(dict(group))
+            continue
+        for key in STATISTIC_KEYS:
+            row[key] = (row[key] or 0) + group[key]
+    return rows
+
+
+def add_archived_groups(rows: List[Dict], part_numbers: Iterable[str]) -> List[Dict]:
+    """add_archived_statistics() for grouped rows of several part numbers"""
+    rows_by_part = defaultdict(list)
+    for row in rows:
+        rows_by_part[row['part_number']].append(row)
+    for part_number, archived in archived_groups(part_numbers).items():
+        part_rows = rows_by_part[part_number]
+        known = len(part_rows)
+        rows.extend(add_archived_statistics(part_rows, archived)[known:])
+    return rows
+
+
+def archive_listings(older_than_days: int = None, batch_size: int = 500, dry_run: bool = False) -> Dict:
+    """Fold listings extracted before the hot window into ArchivedListingGroup and delete them.
+
+    Works batch_size part numbers at a time, one transaction per batch.
+    """
+    started = time.perf_counter()
+    days = raw_listing_hot_days() if older_than_days is None else older_than_days
+    cutoff = timezone.now() - timedelta(days=days)
+    old_listings = RawListingData.objects.filter(extraction_date__lt=cutoff)
+
+    part_numbers = list(old_listings.order_by('part_number').values_list('part_number', flat=True).distinct())
+    totals = {'cutoff': cutoff.isoformat(), 'part_numbers': len(part_numbers), 'listings_archived': 0,
+              'groups_created': 0, 'groups_updated': 0}
+
+    if dry_run:
+        totals['listings_archived'] = old_listings.count()
+    else:
+        for start in range(0, len(part_numbers), batch_size):
+            result = archive_part_numbers(part_numbers[start:start + batch_size], cutoff)
+            for key, value in result.items():
+                totals[key] += value
+
+    totals['elapsed_seconds'] = round(time.perf_counter() - started, 2)
+    logger.info(f"Archived raw listings older than {days} days: {totals}")
+    return totals
+
+
+@transaction.atomic
+def archive_part_numbers(part_numbers: List[str], cutoff) -> Dict:
+    """Archive one batch: one GROUP BY, one upsert, the link cleanup and one listing delete"""
+    listings = RawListingData.objects.filter(part_number__in=part_numbers, extraction_date__lt=cutoff)
+    rows = list(
+        listings
+        .order_by()
+        .values('part_number', 'fitment_hash', *FITMENT_FIELDS)
+        .annotate(
+            **listing_group_annotations(),
+            first_extraction_date=Min('extraction_date'),
+            last_extraction_date=Max('extraction_date'),
+        )
+    )
+    if not rows:
+        return {'listings_archived': 0, 'groups_created': 0, 'groups_updated': 0}
+
+    existing = {
+        (group.part_number, group.fitment_hash): group
+        for group in ArchivedListingGroup.objects.filter(part_number__in=part_numbers)
+    }
+    groups = []
+    updated = 0
+    for row in rows:
+        group = existing.get((row['part_number'], row['fitment_hash']))
+        if group is None:
+            group = ArchivedListingGroup(
+                part_number=row['part_number'],
+                first_extraction_date=row['first_extraction_date'],
+                last_extraction_date=row['last_extraction_date'],
+                **{field: row[field] for field in FITMENT_FIELDS},
+            )
+        else:
+            updated += 1
+            group.first_extraction_date = min(group.first_extraction_date, row['first_extraction_date'])
+            group.last_extraction_date = max(group.last_extraction_date, row['last_extraction_date'])
+        group.listing_count += row['listing_count']
+        group.weight_sum_milli += row['weight_milli']
+        for field in FLAG_COUNT_FIELDS:
+            setattr(group, field, getattr(group, field) + row[field])
+        groups.append(group)
+
+    ArchivedListingGroup.objects.bulk_create(
+        groups,
+        update_conflicts=True,
+        unique_fields=['part_number', 'fitment_hash'],
+        update_fields=[
+            'listing_count', 'weight_sum_milli', *FLAG_COUNT_FIELDS,
+            'first_extraction_date', 'last_extraction_date', 'archived_at',
+        ],
+    )
+
+    for through in (ConsensusFitment.supporting_raw_listings.through, ConflictingFitment.conflicting_listings.through):
+        through.objects.filter(
+            rawlistingdata__part_number__in=part_numbers, rawlistingdata__extraction_date__lt=cutoff
+        ).delete()
+    remove_packed_listing_ids(part_numbers, set(listings.values_list('id', flat=True)))
+    fold_archived_prices(listings)
+    # Ingestion checks these keys, so a re-crawled archived listing is not counted twice
+    keys = listings.exclude(source_ebay_item_id='').order_by().values_list('source_ebay_item_id', 'fitment_hash')
+    ArchivedListingKey.objects.bulk_create(
+        [ArchivedListingKey(source_ebay_item_id=item_id, fitment_hash=fitment_hash) for item_id, fitment_hash in keys],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    # Consensus output is unchanged, so skip delete() and its per-listing re-queue signals
+    archived = listings.delete_rows()
+
+    return {'listings_archived': archived, 'groups_created': len(groups) - updated, 'groups_updated': updated}
+
+
+def remove_packed_listing_ids(part_numbers: List[str], listing_ids: set) -> int:
+    """Drop listing_ids from the packed links of the part numbers' consensus and conflict rows"""
+    updated = 0
+    for model in (ConsensusFitment, ConflictingFitment):
+        rows = []
+        packed = (
+            model.objects
+            .filter(part_number__in=part_numbers, listing_ids_packed__isnull=False)
+            .only('id', 'listing_ids_packed')
+        )
+        for row in packed:
+            linked = row.get_listing_ids()
+            kept = [listing_id for listing_id in linked if listing_id not in listing_ids]
+            if len(kept) < len(linked):
+                row.set_listing_ids(kept)
+                rows.append(row)
+        model.objects.bulk_update(rows, ['listing_ids_packed'], batch_size=1000)
+        updated += len(rows)
+    return updated
@@ -0,0 +1,251 @@
+"""Synthetic RawListingData datasets and per-phase timing of the consensus pipeline
+
+generate_listings() builds deterministic datasets (same seed, same rows) with
+the shape of real marketplace data: part number popularity follows a Zipf
+curve, so a few hot part numbers carry most of the listings over a long tail,
+and a share of listings report a wrong vehicle so conflicts get flagged.
+
+ConsensusBenchmark runs FitmentConsensusProcessor over such a dataset phase
+by phase (read, group, score, write, conflict detection) and reports the
+timings as a JSON-serializable dict that can be compared across commits.
+
+The datasets go into RawListingData itself, so benchmarks belong on a test or
+benchmark database (see is_scratch_database); the price index skips them.
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+from decimal import Decimal
+from itertools import accumulate
+from typing import Dict, Iterator, List
+import os
+import random
+import time
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+
+from ..models import (
+    BENCHMARK_PART_PREFIX, ConflictingFitment, ConsensusFitment, PartConsensusState, RawListingData
+)
+from .processor import ENGINE_SQL
+from .writer import ConsensusWriter
+
+BENCHMARK_PREFIX = BENCHMARK_PART_PREFIX
+SCRATCH_DATABASE_MARKERS = ('test', 'bench')
+ZIPF_EXPONENT = 1.1
+INSERT_BATCH_SIZE = 5000
+
+VEHICLE_CATALOG = (
+    ('Honda', 'Civic'), ('Honda', 'Accord'), ('Acura', 'TL'), ('Acura', 'TSX'),
+    ('Toyota', 'Camry'), ('Toyota', 'Corolla'), ('Ford', 'F-150'), ('Ford', 'Taurus'),
+    ('Chevrolet', 'Malibu'), ('Chevrolet', 'Silverado'), ('Nissan', 'Altima'), ('BMW', '330i'),
+)
+TRIMS = ('', '', 'Base', 'LX', 'EX', 'Sport', 'Limited')
+ENGINES = ('', '2.0L I4', '2.4L I4', '3.5L V6', '5.3L V8')
+FEEDBACK_COUNTS = (None, 0, 12, 150, 900, 4000, 25000)
+
+
+def is_scratch_database(alias: str = DEFAULT_DB_ALIAS) -> bool:
+    """True for in-memory SQLite and databases named like test or benchmark databases"""
+    database = connections[alias]
+    if database.vendor == 'sqlite' and database.is_in_memory_db():
+        return True
+    name = os.path.basename(str(database.settings_dict['NAME'] or '')).lower()
+    return any(marker in name for marker in SCRATCH_DATABASE_MARKERS)
+
+
+def part_number_for(index: int) -> str:
+    return f"{BENCHMARK_PREFIX}{index:07d}"
+
+
+def part_fitments(seed: int, index: int) -> List[tuple]:
+    """The true (year, make, model, trim, engine) fitments of one synthetic part"""
+    rng = random.Random(seed * 1_000_003 + index)
+    make, model = rng.choice(VEHICLE_CATALOG)
+    first_year = rng.randint(1998, 2020)
+    engine = rng.choice(ENGINES)
+    return [
+        (first_year + offset, make, model, rng.choice(TRIMS), engine)
+        for offset in range(rng.randint(1, 4))
+    ]
+
+
+def generate_listings(rows: int, seed: int = 0, part_count: int = None,
+                      conflict_rate: float = 0.03) -> Iterator[RawListingData]:
+    """Yield rows unsaved RawListingData instances, deterministic for a given seed.
+
+    part_count defaults to one part number per 20 listings. conflict_rate is
+    the share of listings whose vehicle is drawn from the whole catalog
+    instead of the part's true fitments.
+    """
+    rng = random.Random(seed)
+    part_count = part_count or max(1, rows // 20)
+    cum_weights = list(accumulate(1 / rank ** ZIPF_EXPONENT for rank in range(1, part_count + 1)))
+    fitments = {}
+
+    for start in range(0, rows, INSERT_BATCH_SIZE):
+        indexes = rng.choices(range(part_count), cum_weights=cum_weights, k=min(INSERT_BATCH_SIZE, rows - start))
+        for offset, index in enumerate(indexes):
+            if index not in fitments:
+                fitments[index] = part_fitments(seed, index)
+            if rng.random() < conflict_rate:
+                make, model = rng.choice(VEHICLE_CATALOG)
+                year, trim, engine = rng.randint(1990, 2024), rng.choice(TRIMS), rng.choice(ENGINES)
+            else:
+                year, make, model, trim, engine = rng.choice(fitments[index])
+            feedback = rng.choice(FEEDBACK_COUNTS)
+            part_number = part_number_for(index)
+            yield RawListingData(
+                part_number=part_number,
+                vehicle_year=year,
+                vehicle_make=make,
+                vehicle_model=model,
+                vehicle_trim=trim,
+                vehicle_engine=engine,
+                source_ebay_item_id=str(start + offset),
+                seller_feedback_count=feedback,
+                seller_is_business=rng.random() < 0.35,
+                is_verified_seller=rng.random() < 0.25,
+                has_oem_reference=rng.random() < 0.3,
+                has_detailed_description=rng.random() < 0.5,
+                listing_title=f"{part_number} {make} {model} {year}",
+                listing_price=Decimal(rng.randint(1000, 40000)) / 100,
+            )
+
+
+def load_dataset(rows: int, seed: int = 0, part_count: int = None, conflict_rate: float = 0.03) -> int:
+    """Insert a synthetic dataset; bulk_create bypasses the dirty-queue signals"""
+    batch = []
+    created = 0
+    for listing in generate_listings(rows, seed, part_count, conflict_rate):
+        batch.append(listing)
+        if len(batch) >= INSERT_BATCH_SIZE:
+            RawListingData.objects.bulk_create(batch, batch_size=INSERT_BATCH_SIZE)
+            created += len(batch)
+            batch = []
+    if batch:
+        RawListingData.objects.bulk_create(batch, batch_size=INSERT_BATCH_SIZE)
+        created += len(batch)
+    return created
+
+
+def clear_results():
+    """Delete consensus output for the benchmark part numbers, keeping their listings"""
+    prefix = {'part_number__startswith': BENCHMARK_PREFIX}
+    ConsensusFitment.objects.filter(**prefix).delete()
+    ConflictingFitment.objects.filter(**prefix).delete()
+    PartConsensusState.objects.filter(**prefix).delete()
+
+
+def clear_dataset() -> int:
+    """Delete every benchmark row (part numbers starting with BENCHMARK_PREFIX)"""
+    prefix = {'part_number__startswith': BENCHMARK_PREFIX}
+    clear_results()
+    for through in (ConsensusFitment.supporting_raw_listings.through, ConflictingFitment.conflicting_listings.through):
+        through.objects.filter(rawlistingdata__part_number__startswith=BENCHMARK_PREFIX).delete()
+    # A regular delete() would load every listing to send post_delete (and re-queue its part)
+    return RawListingData.objects.filter(**prefix).delete_rows()
+
+
+class PhaseTimer:
+    """Accumulate wall-clock seconds per named phase"""
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - started
+
+    def as_dict(self) -> Dict[str, float]:
+        return {name: round(seconds, 4) for name, seconds in self.seconds.items()}
+
+
+class ConsensusBenchmark:
+    """Time the consensus pipeline phase by phase over the benchmark part numbers.
+
+    Mirrors FitmentConsensusProcessor.process_part_numbers(): the python
+    engine reads, groups, scores and writes one part number at a time; the
+    sql engine aggregates batch_size part numbers per query (read, group and
+    score happen in that one query, reported as 'aggregate') and writes each
+    batch with one flush. Both finish with a single conflict detection pass.
+    """
+
+    def __init__(self, processor):
+        self.processor = processor
+
+    def part_numbers(self) -> List[str]:
+        return list(
+            RawListingData.objects
+            .filter(part_number__startswith=BENCHMARK_PREFIX)
+            .order_by('part_number')
+            .values_list('part_number', flat=True)
+            .distinct()
+        )
+
+    def run(self) -> Dict:
+        part_numbers = self.part_numbers()
+        timer = PhaseTimer()
+        started = time.perf_counter()
+
+        if self.processor.engine == ENGINE_SQL:
+            fitments = self.run_sql(part_numbers, timer)
+        else:
+            fitments = self.run_python(part_numbers, timer)
+
+        with timer.phase('conflicts'):
+            conflicts = self.processor.detect_conflicts(part_numbers)['conflicts']
+
+        elapsed = time.perf_counter() - started
+        listings = RawListingData.objects.filter(part_number__startswith=BENCHMARK_PREFIX).count()
+        return {
+            'engine': self.processor.engine,
+            'database': connection.vendor,
+            'part_numbers': len(part_numbers),
+            'listings': listings,
+            'fitments_written': fitments,
+            'conflicts': conflicts,
+            'phases': timer.as_dict(),
+            'elapsed_seconds': round(elapsed, 4),
+            'parts_per_second': round(len(part_numbers) / elapsed, 1) if elapsed > 0 else 0.0,
+            'listings_per_second': round(listings / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+
+    def run_python(self, part_numbers: List[str], timer: PhaseTimer) -> int:
+        processor = self.processor
+        written = 0
+        for part_number in part_numbers:
+            with timer.phase('read'):
+                records = list(processor.iter_listing_records(part_number))
+            if len(records) < processor.min_listings_required:
+                continue
+            with timer.phase('group'):
+                groups = processor.group_by_fitment_signature(records)
+            with timer.phase('score'):
+                scores = processor.score_fitment_groups(groups)
+            with timer.phase('write'):
+                writer = ConsensusWriter()
+                for signature, listings in groups.items():
+                    writer.add(part_number, scores[signature], listings)
+                written += writer.flush()
+        return written
+
+    def run_sql(self, part_numbers: List[str], timer: PhaseTimer) -> int:
+        processor = self.processor
+        written = 0
+        for start in range(0, len(part_numbers), processor.batch_size):
+            batch = part_numbers[start:start + processor.batch_size]
+            with timer.phase('aggregate'):
+                aggregated = processor.aggregate_fitment_groups(batch)
+            with timer.phase('write'):
+                writer = ConsensusWriter()
+                for part_number in batch:
+                    processor.process_aggregated_groups(
+                        part_number, aggregated.get(part_number, {}), writer=writer, detect_conflicts=False
+                    )
+                written += writer.flush()
+        return written
@@ -0,0 +1,231 @@
+"""Batch conflict detection over per-part fitment aggregates
+
+One GROUP BY over RawListingData computes, for every part number, the
+listing count, year range and distinct make/model counts. Conflict rules
+are registered predicates (Q objects) over those aggregates; they are
+evaluated in the database, so only flagged part numbers come back, and
+only those are read again for make/model names and written as
+ConflictingFitment records in bulk.
+"""
+
+from collections import defaultdict, namedtuple
+from django.db import transaction
+from django.db.models import BooleanField, Case, Count, F, Max, Min, Q, Value, When
+from typing import Callable, Dict, Iterable, List, Optional
+import logging
+
+from ..models import RawListingData, ConflictingFitment, packed_listing_ids_enabled
+
+logger = logging.getLogger(__name__)
+
+DETECT_CHUNK_SIZE = 5000
+
+# condition: Q over the PART_AGGREGATES names; describe(PartConflictStats) -> message
+ConflictRule = namedtuple('ConflictRule', ['name', 'condition', 'describe'])
+
+PartConflictStats = namedtuple('PartConflictStats', [
+    'part_number', 'listing_count', 'min_year', 'max_year', 'year_span',
+    'make_count', 'model_count', 'makes', 'models',
+])
+
+PART_AGGREGATES = {
+    'listing_count': Count('id'),
+    'min_year': Min('vehicle_year'),
+    'max_year': Max('vehicle_year'),
+    'make_count': Count('vehicle_make', distinct=True),
+    'model_count': Count('vehicle_model', distinct=True),
+}
+
+CONFLICT_RULES: List[ConflictRule] = []
+
+
+def register_conflict_rule(name: str, condition: Q, describe: Callable[[PartConflictStats], str]):
+    """Add a conflict rule; rules run (and describe conflicts) in registration order"""
+    if any(rule.name == name for rule in CONFLICT_RULES):
+        raise ValueError(f"Conflict rule already registered: {name}")
+    CONFLICT_RULES.append(ConflictRule(name, condition, describe))
+
+
+# Most generations are 6-8 years
+register_conflict_rule(
+    'year_span',
+    Q(year_span__gt=8),
+    lambda stats: f"Suspicious year range: {stats.min_year}-{stats.max_year} (span: {stats.year_span} years)"
+)
+# Cross-manufacturer fitments are unusual but possible
+register_conflict_rule(
+    'cross_manufacturer',
+    Q(make_count__gt=1),
+    lambda stats: f"Cross-manufacturer fitment: {', '.join(stats.makes)}"
+)
+# Many models may indicate a part family
+register_conflict_rule(
+    'multiple_models',
+    Q(model_count__gt=3),
+    lambda stats: f"Multiple models: {', '.join(stats.models)}"
+)
+
+
+class ConflictDetector:
+    """Flag conflicting part numbers with one aggregate query per chunk.
+
+    Reads and writes scale with the number of flagged part numbers: the
+    rules are applied in HAVING, and ConflictingFitment rows and their
+    listing links are bulk inserted. Existing records with the same part
+    number and description are left as they are.
+    """
+
+    def __init__(self, min_listings: int = 2, rules: Optional[List[ConflictRule]] = None,
+                 chunk_size: int = DETECT_CHUNK_SIZE, packed: Optional[bool] = None):
+        self.min_listings = min_listings
+        self.rules = CONFLICT_RULES if rules is None else rules
+        self.chunk_size = chunk_size
+        self.packed = packed_listing_ids_enabled() if packed is None else packed
+
+    def detect(self, part_numbers: Optional[Iterable[str]] = None) -> Dict:
+        """Detect and record conflicts; part_numbers=None scans every part number"""
+        totals = {'parts_flagged': 0, 'conflicts': 0, 'records_created': 0}
+        if not self.rules:
+            return totals
+
+        if part_numbers is None:
+            chunks = [None]
+        else:
+            part_numbers = sorted(set(part_numbers))
+            chunks = [part_numbers[i:i + self.chunk_size] for i in range(0, len(part_numbers), self.chunk_size)]
+
+        for chunk in chunks:
+            descriptions = self.find_conflicts(chunk)
+            totals['parts_flagged'] += len(descriptions)
+            totals['conflicts'] += sum(len(messages) for messages in descriptions.values())
+            totals['records_created'] += self.write_conflicts(descriptions)
+
+        logger.info(
+            f"Conflict detection flagged {totals['parts_flagged']} part numbers, "
+            f"created {totals['records_created']} conflict records"
+        )
+        return totals
+
+    def find_conflicts(self, part_numbers: Optional[List[str]] = None) -> Dict[str, List[str]]:
+        """{part_number: [conflict messages]} for flagged part numbers only"""
+        queryset = RawListingData.objects.order_by()
+        if part_numbers is not None:
+            queryset = queryset.filter(part_number__in=part_numbers)
+
+        flags = {
+            f'rule_{index}': Case(When(rule.condition, then=Value(True)), default=Value(False), output_field=BooleanField())
+            for index, rule in enumerate(self.rules)
+        }
+        any_rule = Q()
+        for rule in self.rules:
+            any_rule |= rule.condition
+
+        rows = list(
+            queryset
+            .values('part_number')
+            .annotate(**PART_AGGREGATES)
+            .annotate(year_span=F('max_year') - F('min_year'))
+            .filter(any_rule, listing_count__gte=self.min_listings)
+            .annotate(**flags)
+        )
+        if not rows:
+            return {}
+
+        names = self.fitment_names([row['part_number'] for row in rows])
+        conflicts = {}
+        for row in rows:
+            makes, models = names[row['part_number']]
+            stats = PartConflictStats(
+                makes=sorted(makes), models=sorted(models),
+                **{field: row[field] for field in PartConflictStats._fields if field in row}
+            )
+            conflicts[row['part_number']] = [
+                rule.describe(stats) for index, rule in enumerate(self.rules) if row[f'rule_{index}']
+            ]
+        return conflicts
+
+    def fitment_names(self, part_numbers: List[str]) -> Dict[str, tuple]:
+        """Distinct makes and models of the given part numbers"""
+        names = defaultdict(lambda: (set(), set()))
+        rows = (
+            RawListingData.objects
+            .filter(part_number__in=part_numbers)
+            .order_by()
+            .values_list('part_number', 'vehicle_make', 'vehicle_model')
+            .distinct()
+        )
+        for part_number, make, model in rows:
+            names[part_number][0].add(make)
+            names[part_number][1].add(model)
+        return names
+
+    def write_conflicts(self, conflicts: Dict[str, List[str]]) -> int:
+        """Bulk insert new conflict records and link them to their part's listings.
+
+        Existing records and listing ids are read before the transaction, so
+        it starts with a write: a read-then-write transaction on SQLite fails
+        with "database is locked" under concurrent writers instead of waiting.
+        """
+        if not conflicts:
+            return 0
+
+        wanted = {(part_number, "; ".join(messages)) for part_number, messages in conflicts.items()}
+        part_numbers = list(conflicts)
+        through = ConflictingFitment.conflicting_listings.through
+
+        existing = set(
+            ConflictingFitment.objects
+            .filter(part_number__in=part_numbers)
+            .values_list('part_number', 'conflict_description')
+        )
+        new_records = wanted - existing
+        if not new_records:
+            return 0
+
+        created_parts = sorted({part_number for part_number, _ in new_records})
+        listing_ids = defaultdict(list)
+        listing_rows = (
+            RawListingData.objects
+            .filter(part_number__in=created_parts)
+            .order_by()
+            .values_list('id', 'part_number')
+        )
+        for listing_id, part_number in listing_rows.iterator():
+            listing_ids[part_number].append(listing_id)
+
+        records = []
+        for part_number, description in sorted(new_records):
+            record = ConflictingFitment(
+                part_number=part_number, conflict_description=description, resolution_status='PENDING'
+            )
+            if self.packed:
+                record.set_listing_ids(listing_ids[part_number])
+            records.append(record)
+
+        with transaction.atomic():
+            ConflictingFitment.objects.bulk_create(records, batch_size=self.chunk_size)
+
+            if not self.packed:
+                # Ids are not returned by every backend; look the new rows up
+                conflict_ids = {}
+                rows = (
+                    ConflictingFitment.objects
+                    .filter(part_number__in=created_parts)
+                    .values_list('id', 'part_number', 'conflict_description')
+                )
+                for conflict_id, part_number, description in rows:
+                    if (part_number, description) in new_records:
+                        conflict_ids[part_number] = conflict_id
+
+                through.objects.bulk_create(
+                    [
+                        through(conflictingfitment_id=conflict_ids[part_number], rawlistingdata_id=listing_id)
+                        for part_number, ids in listing_ids.items()
+                        for listing_id in ids
+                    ],
+                    batch_size=self.chunk_size,
+                )
+
+        for part_number, description in sorted(new_records):
+            logger.info(f"Created conflict record for {part_number}: {description}")
+        return len(new_records)
@@ -0,0 +1,407 @@
+"""Dirty-part queue and input fingerprints for incremental consensus runs
+
+Raw listing writes mark their part number dirty in PartConsensusState.
+An incremental run only looks at dirty parts, fingerprints their listing
+inputs, and skips parts whose fingerprint matches the last processed one.
+
+Runs lease the dirty parts they work on (leased_by / lease_expires_at), so
+any number of runs on any number of hosts can drain the same queue without
+processing a part number twice. A lease that is not released before it
+expires (crashed or stalled worker) can be claimed again.
+"""
+
+from contextlib import nullcontext
+from itertools import chain
+from datetime import timedelta
+from django.db import connection, transaction
+from django.db.models import CharField, Q, Value
+from django.db.models.functions import Cast, Concat, MD5
+from django.utils import timezone
+from typing import Dict, Iterable, List, Tuple
+import hashlib
+import logging
+import os
+import socket
+import time
+import uuid
+
+from ..models import ArchivedListingGroup, RawListingData, PartConsensusState
+from .archive import STATISTIC_KEYS, archived_groups
+
+logger = logging.getLogger(__name__)
+
+# Columns that influence grouping or scoring; price/title changes do not
+FINGERPRINT_FIELDS = (
+    'id', 'fitment_hash',
+    'seller_feedback_count', 'seller_is_business', 'is_verified_seller',
+    'has_oem_reference', 'has_detailed_description',
+)
+
+MARK_BATCH_SIZE = 1000
+LEASE_SECONDS = 900
+
+
+def mark_parts_dirty(part_numbers: Iterable[str]) -> int:
+    """Queue part numbers for the next incremental consensus run"""
+    unique_parts = {part_number for part_number in part_numbers if part_number}
+    if not unique_parts:
+        return 0
+
+    now = timezone.now()
+    PartConsensusState.objects.bulk_create(
+        [PartConsensusState(part_number=part_number, needs_processing=True, queued_at=now)
+         for part_number in unique_parts],
+        batch_size=MARK_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['part_number'],
+        update_fields=['needs_processing', 'queued_at'],
+    )
+    return len(unique_parts)
+
+
+def enqueue_all_parts() -> int:
+    """Mark every part number with hot or archived listings dirty (bootstrap / full refresh)"""
+    part_numbers = chain.from_iterable(
+        model.objects.order_by().values_list('part_number', flat=True).distinct().iterator()
+        for model in (RawListingData, ArchivedListingGroup)
+    )
+    return mark_parts_dirty(part_numbers)
+
+
+def dirty_part_numbers(limit: int = None) -> List[str]:
+    """Part numbers waiting for consensus, oldest first"""
+    queryset = (
+        PartConsensusState.objects
+        .filter(needs_processing=True)
+        .order_by('queued_at')
+        .values_list('part_number', flat=True)
+    )
+    if limit:
+        queryset = queryset[:limit]
+    return list(queryset)
+
+
+def make_worker_id() -> str:
+    """Lease owner name, unique per process: host, pid and a random suffix"""
+    return f"{socket.gethostname()[:60]}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _lease_available(now) -> Q:
+    return Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now)
+
+
+def claim_dirty_parts(worker_id: str, limit: int = None, lease_seconds: int = LEASE_SECONDS) -> List[str]:
+    """Lease up to limit unleased dirty part numbers, oldest first, to worker_id.
+
+    PostgreSQL locks the candidate rows with SELECT ... FOR UPDATE SKIP LOCKED,
+    so concurrent claimers pick disjoint rows without waiting on each other.
+    The lease itself is a conditional UPDATE (still dirty, not leased), which
+    keeps claims disjoint on backends without row locks too; it also skips
+    parts another worker finished after they were read. Those backends run
+    it outside a transaction: a read-then-write transaction on SQLite fails
+    with "database is locked" under concurrent writers instead of waiting.
+    """
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=lease_seconds)
+    skip_locked = connection.features.has_select_for_update_skip_locked
+
+    with transaction.atomic() if skip_locked else nullcontext():
+        candidates = (
+            PartConsensusState.objects
+            .filter(needs_processing=True)
+            .filter(_lease_available(now))
+            .order_by('queued_at')
+            .select_for_update(skip_locked=True)
+            .values_list('id', flat=True)
+        )
+        if limit:
+            candidates = candidates[:limit]
+        ids = list(candidates)
+        for batch in _batches(ids, MARK_BATCH_SIZE):
+            (
+                PartConsensusState.objects
+                .filter(id__in=batch, needs_processing=True)
+                .filter(_lease_available(now))
+                .update(leased_by=worker_id, lease_expires_at=expires_at)
+            )
+
+    leased = {}
+    for batch in _batches(ids, MARK_BATCH_SIZE):
+        leased.update(
+            PartConsensusState.objects
+            .filter(id__in=batch, leased_by=worker_id)
+            .values_list('id', 'part_number')
+        )
+    return [leased[state_id] for state_id in ids if state_id in leased]
+
+
+def extend_leases(worker_id: str, part_numbers: List[str], lease_seconds: int = LEASE_SECONDS) -> int:
+    """Push back the expiry of worker_id's leases on part_numbers (heartbeat)"""
+    expires_at = timezone.now() + timedelta(seconds=lease_seconds)
+    extended = 0
+    for batch in _batches(part_numbers, MARK_BATCH_SIZE):
+        extended += (
+            PartConsensusState.objects
+            .filter(part_number__in=batch, leased_by=worker_id)
+            .update(lease_expires_at=expires_at)
+        )
+    return extended
+
+
+class LeaseHeartbeat:
+    """Keeps worker_id's leases on part_numbers alive while they are processed.
+
+    beat() is cheap enough to call between any two chunks of work: it only
+    extends the leases once a third of lease_seconds has passed since the
+    last extension, so a lease cannot expire under a worker that is still
+    making progress.
+    """
+
+    def __init__(self, worker_id: str, part_numbers: List[str], lease_seconds: int = LEASE_SECONDS):
+        self.worker_id = worker_id
+        self.part_numbers = part_numbers
+        self.lease_seconds = lease_seconds
+        self.extended_at = time.monotonic()
+
+    def beat(self):
+        if time.monotonic() - self.extended_at >= self.lease_seconds / 3:
+            extend_leases(self.worker_id, self.part_numbers, self.lease_seconds)
+            self.extended_at = time.monotonic()
+
+
+def release_leases(worker_id: str, part_numbers: List[str]) -> int:
+    """Give up worker_id's leases without touching the dirty flags"""
+    released = 0
+    for batch in _batches(part_numbers, MARK_BATCH_SIZE):
+        released += (
+            PartConsensusState.objects
+            .filter(part_number__in=batch, leased_by=worker_id)
+            .update(leased_by='', lease_expires_at=None)
+        )
+    return released
+
+
+def processor_parameters(processor) -> str:
+    """Processor settings that change consensus output for identical inputs"""
+    thresholds = ','.join(str(threshold) for threshold in processor.status_thresholds)
+    return f"{processor.min_listings_required}|{processor.base_confidence}|{processor.max_weight_bonus}|{thresholds}"
+
+
+def compute_input_fingerprints(part_numbers: List[str], processor) -> Dict[str, str]:
+    """Fingerprint the consensus inputs of each part number.
+
+    PostgreSQL digests each part's rows in one grouped query; other
+    backends hash a narrow values_list stream in Python. Archived group
+    statistics (see archive.py) are hashed in Python.
+    """
+    parameters = processor_parameters(processor)
+    digests = {}
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.aggregates import StringAgg
+
+        row_text = Concat(
+            *[part for field in FINGERPRINT_FIELDS
+              for part in (Cast(field, CharField()), Value(':'))],
+            output_field=CharField(),
+        )
+        rows = (
+            RawListingData.objects
+            .filter(part_number__in=part_numbers)
+            .order_by()
+            .values('part_number')
+            .annotate(digest=MD5(StringAgg(row_text, delimiter=',', ordering='id')))
+            .values_list('part_number', 'digest')
+        )
+        digests = dict(rows)
+    else:
+        hashers = {}
+        rows = (
+            RawListingData.objects
+            .filter(part_number__in=part_numbers)
+            .order_by('part_number', 'id')
+            .values_list('part_number', *FINGERPRINT_FIELDS)
+        )
+        for part_number, *values in rows.iterator():
+            hasher = hashers.get(part_number)
+            if hasher is None:
+                hasher = hashers[part_number] = hashlib.md5()
+            hasher.update(repr(values).encode())
+        digests = {part_number: hasher.hexdigest() for part_number, hasher in hashers.items()}
+
+    # Archived groups count as inputs too; parts without any keep their old fingerprint
+    archived = {}
+    for part_number, groups in archived_groups(part_numbers).items():
+        archived[part_number] = '|' + hashlib.md5(repr(sorted(
+            (fitment_hash, *(group[key] for key in STATISTIC_KEYS)) for fitment_hash, group in groups.items()
+        )).encode()).hexdigest()
+
+    return {
+        part_number: hashlib.sha1(
+            f"{parameters}|{digests.get(part_number, '')}{archived.get(part_number, '')}".encode()
+        ).hexdigest()
+        for part_number in part_numbers
+    }
+
+
+def changed_parts(part_numbers: List[str], processor) -> Tuple[Dict[str, str], List[str]]:
+    """Fingerprint part_numbers; returns the fingerprints and the parts whose inputs changed"""
+    fingerprints = {}
+    stored = {}
+    for batch in _batches(part_numbers, processor.batch_size):
+        fingerprints.update(compute_input_fingerprints(batch, processor))
+        stored.update(
+            PartConsensusState.objects
+            .filter(part_number__in=batch)
+            .values_list('part_number', 'input_fingerprint')
+        )
+    changed = [part_number for part_number in part_numbers if stored.get(part_number) != fingerprints[part_number]]
+    return fingerprints, changed
+
+
+def record_processed(part_numbers: List[str], changed: List[str], fingerprints: Dict[str, str],
+                     run_started, worker_id: str = None, failed: Iterable[str] = ()):
+    """Record fingerprints, then clear the flag unless a newer write re-queued the part.
+
+    worker_id's leases on part_numbers are released as well. Failed part
+    numbers are left untouched: they stay dirty with their old fingerprint,
+    and keep their lease until it expires so they are retried later rather
+    than re-claimed straight away.
+    """
+    failed = set(failed)
+    if failed:
+        part_numbers = [part_number for part_number in part_numbers if part_number not in failed]
+        changed = [part_number for part_number in changed if part_number not in failed]
+
+    processed_at = timezone.now()
+    PartConsensusState.objects.bulk_create(
+        [PartConsensusState(part_number=part_number, input_fingerprint=fingerprints[part_number],
+                            last_processed=processed_at, needs_processing=True)
+         for part_number in changed],
+        batch_size=MARK_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['part_number'],
+        update_fields=['input_fingerprint', 'last_processed'],
+    )
+    for batch in _batches(part_numbers, MARK_BATCH_SIZE):
+        (
+            PartConsensusState.objects
+            .filter(part_number__in=batch)
+            .filter(Q(queued_at__lte=run_started) | Q(queued_at__isnull=True))
+            .update(needs_processing=False)
+        )
+    if worker_id:
+        release_leases(worker_id, part_numbers)
+
+
+def process_dirty_parts(processor, workers: int = 1, limit: int = None, dry_run: bool = False,
+                        lease_seconds: int = LEASE_SECONDS) -> Dict:
+    """Run consensus for dirty parts whose inputs changed since the last run.
+
+    The dirty parts are leased for the whole run, so a concurrent run skips
+    them; a dry run only reads the queue.
+    """
+    run_started = timezone.now()
+    worker_id = None
+    if dry_run:
+        dirty = dirty_part_numbers(limit)
+    else:
+        worker_id = make_worker_id()
+        dirty = claim_dirty_parts(worker_id, limit, lease_seconds)
+
+    try:
+        fingerprints, changed = changed_parts(dirty, processor)
+    except Exception:
+        if worker_id:
+            release_leases(worker_id, dirty)
+        raise
+    unchanged = len(dirty) - len(changed)
+
+    logger.info(f"{len(dirty)} dirty part numbers, {len(changed)} with changed inputs, {unchanged} unchanged")
+
+    result = {
+        'dirty_parts': len(dirty),
+        'changed_parts': changed,
+        'unchanged_parts': unchanged,
+        'processed': 0,
+        'conflicts': 0,
+        'failed': [],
+        'elapsed_seconds': 0,
+        'parts_per_second': 0.0,
+    }
+    if dry_run:
+        return result
+
+    try:
+        if changed:
+            heartbeat = LeaseHeartbeat(worker_id, dirty, lease_seconds)
+            totals = processor.process_part_numbers(changed, workers=workers, heartbeat=heartbeat.beat)
+            result.update({
+                key: totals[key] for key in ('processed', 'conflicts', 'failed', 'elapsed_seconds', 'parts_per_second')
+            })
+    except Exception:
+        release_leases(worker_id, dirty)
+        raise
+
+    if result['failed']:
+        logger.warning(f"{len(result['failed'])} part numbers failed and stay queued")
+    record_processed(dirty, changed, fingerprints, run_started, worker_id, failed=result['failed'])
+    return result
+
+
+def drain_queue(processor, claim_size: int = None, lease_seconds: int = LEASE_SECONDS,
+                max_parts: int = None, refresh_statistics: bool = True) -> Dict:
+    """Claim and process dirty parts claim_size at a time until the queue is empty.
+
+    Safe to run in any number of processes against one database: each claim
+    is leased to this worker, and kept alive between processing chunks; a
+    claim that raises is released for the others. Part numbers that fail
+    stay queued and leased until their lease expires (see record_processed).
+    max_parts caps the number of part numbers this worker claims.
+    """
+    worker_id = make_worker_id()
+    claim_size = claim_size or processor.batch_size
+    totals = {'claimed': 0, 'changed': 0, 'processed': 0, 'conflicts': 0, 'failed': 0}
+    started = time.monotonic()
+
+    while max_parts is None or totals['claimed'] < max_parts:
+        run_started = timezone.now()
+        size = claim_size if max_parts is None else min(claim_size, max_parts - totals['claimed'])
+        claimed = claim_dirty_parts(worker_id, size, lease_seconds)
+        if not claimed:
+            break
+
+        heartbeat = LeaseHeartbeat(worker_id, claimed, lease_seconds)
+        failed = []
+        try:
+            fingerprints, changed = changed_parts(claimed, processor)
+            heartbeat.beat()
+            for part_number, part_result in processor.iter_process_part_numbers(changed):
+                totals['processed'] += part_result.get('processed', 0)
+                if part_result.get('failed'):
+                    failed.append(part_number)
+                heartbeat.beat()
+            if changed:
+                totals['conflicts'] += processor.detect_conflicts(changed)['conflicts']
+        except Exception:
+            release_leases(worker_id, claimed)
+            raise
+
+        record_processed(claimed, changed, fingerprints, run_started, worker_id, failed=failed)
+        totals['claimed'] += len(claimed)
+        totals['failed'] += len(failed)
+        totals['changed'] += len(changed)
+        logger.info(f"Worker {worker_id}: {len(changed)} of {len(claimed)} claimed part numbers changed")
+
+    if refresh_statistics and totals['changed']:
+        processor.refresh_statistics()
+
+    elapsed = time.monotonic() - started
+    totals['elapsed_seconds'] = round(elapsed, 2)
+    totals['parts_per_second'] = round(totals['claimed'] / elapsed, 1) if elapsed > 0 else 0.0
+    return totals
+
+
+def _batches(items: List[str], size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
@@ -0,0 +1,103 @@
+"""Run consensus in a pool of worker processes: over part-number shards, or draining the leased dirty queue"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List
+import logging
+import math
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker():
+    """Make sure Django is configured; connections open lazily per worker"""
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()  # spawn start method (Windows) starts from a fresh interpreter
+
+
+def _process_shard(processor, part_numbers: List[str]) -> Dict:
+    """Process one shard and return its totals"""
+    totals = {'parts': 0, 'processed': 0, 'conflicts': 0, 'failed': []}
+    try:
+        for part_number, result in processor.iter_process_part_numbers(part_numbers):
+            totals['parts'] += 1
+            totals['processed'] += result.get('processed', 0)
+            totals['conflicts'] += result.get('conflicts', 0)
+            if result.get('failed'):
+                totals['failed'].append(part_number)
+    finally:
+        connections.close_all()
+    return totals
+
+
+def make_shards(part_numbers: List[str], workers: int, max_shard_size: int) -> List[List[str]]:
+    """Split part numbers into contiguous shards.
+
+    Several shards per worker keep the pool busy when a few hot part
+    numbers make one shard much slower than the rest.
+    """
+    if not part_numbers:
+        return []
+    shard_size = max(1, min(max_shard_size, math.ceil(len(part_numbers) / (workers * 4))))
+    return [part_numbers[i:i + shard_size] for i in range(0, len(part_numbers), shard_size)]
+
+
+def process_in_parallel(processor, part_numbers: List[str], workers: int,
+                        heartbeat: Callable[[], None] = None) -> Dict:
+    """Process part numbers across worker processes and merge their totals.
+
+    heartbeat is called in this process whenever a shard finishes.
+    """
+    shards = make_shards(sorted(part_numbers), workers, processor.batch_size)
+    totals = {'parts': 0, 'processed': 0, 'conflicts': 0, 'failed': []}
+
+    logger.info(f"Processing {len(part_numbers)} part numbers in {len(shards)} shards with {workers} workers")
+
+    # Close the parent's connections so no socket is inherited by the workers
+    connections.close_all()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(_process_shard, processor, shard) for shard in shards]
+        for future in as_completed(futures):
+            shard_totals = future.result()
+            for key in totals:
+                totals[key] += shard_totals[key]
+            if heartbeat:
+                heartbeat()
+
+    return totals
+
+
+def _drain_worker(processor, options: Dict) -> Dict:
+    """Drain the dirty queue under this process's own lease owner id"""
+    from .incremental import drain_queue
+
+    try:
+        return drain_queue(processor, refresh_statistics=False, **options)
+    finally:
+        connections.close_all()
+
+
+def drain_in_parallel(processor, workers: int, **options) -> Dict:
+    """Run drain_queue() in several local worker processes and merge their totals.
+
+    Workers coordinate only through their leases, exactly like workers
+    started on other hosts.
+    """
+    totals = {'claimed': 0, 'changed': 0, 'processed': 0, 'conflicts': 0, 'failed': 0}
+    connections.close_all()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(_drain_worker, processor, options) for _ in range(workers)]
+        for future in as_completed(futures):
+            worker_totals = future.result()
+            for key in totals:
+                totals[key] += worker_totals[key]
+
+    if totals['changed']:
+        processor.refresh_statistics()
+    return totals
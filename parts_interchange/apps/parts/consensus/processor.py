@@ -1,75 +1,300 @@
-from django.db import transaction, models
+from django.db import connection, models, transaction
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, Q, Value, When
+from django.db.models.functions import Least
+from django.db.models.lookups import GreaterThanOrEqual
 from django.utils import timezone
 from decimal import Decimal
-from collections import defaultdict
-from typing import Dict, List, Tuple
+from collections import Counter, defaultdict, namedtuple
+from typing import Callable, Dict, Iterator, List
 import logging
+import time
 
-from ..models import RawListingData, ConsensusFitment, ConflictingFitment
+from ..models import ArchivedListingGroup, RawListingData, ConsensusFitment
+from .scoring import (
+    FLAG_COUNT_FIELDS, STATUS_BY_CODE, confidence_centi, confidence_to_decimal, score_groups, status_codes,
+    weight_to_decimal
+)
+from .archive import add_archived_groups, add_archived_statistics, archived_groups, listing_group_annotations
+from .conflicts import ConflictDetector
+from .writer import MANUAL_STATUSES, ConsensusWriter
 
 logger = logging.getLogger(__name__)
 
 
+FITMENT_FIELDS = ('vehicle_year', 'vehicle_make', 'vehicle_model', 'vehicle_trim', 'vehicle_engine')
+
+ENGINE_PYTHON = 'python'
+ENGINE_SQL = 'sql'
+ENGINE_CHOICES = (ENGINE_PYTHON, ENGINE_SQL)
+
+# Only the columns consensus reads; listing_title/description stay in the database
+LISTING_RECORD_FIELDS = (
+    'id', 'fitment_hash', *FITMENT_FIELDS, 'seller_feedback_count', 'seller_is_business',
+    'is_verified_seller', 'has_oem_reference', 'has_detailed_description',
+)
+STREAM_CHUNK_SIZE = 2000
+
+
+class ListingRecord(namedtuple('ListingRecord', LISTING_RECORD_FIELDS)):
+    """Compact read-only row of RawListingData used by the python engine"""
+    __slots__ = ()
+    
+    @property
+    def pk(self):
+        return self.id
+    
+    def get_fitment_signature(self):
+        return f"{self.vehicle_year}|{self.vehicle_make}|{self.vehicle_model}|{self.vehicle_trim}|{self.vehicle_engine}"
+
+
 class FitmentConsensusProcessor:
-    """Convert raw listing data (quarks) into consensus fitments (atoms)"""
+    """Convert raw listing data (quarks) into consensus fitments (atoms)
+    
+    The 'python' engine streams compact ListingRecord rows, groups them in
+    Python and scores the groups with the NumPy batch scorer (see scoring.py).
+    The 'sql' engine computes the same groups, counts and weight sums with
+    a single GROUP BY, so no RawListingData instances are built.
+    """
     
-    def __init__(self):
+    def __init__(self, engine: str = ENGINE_PYTHON, batch_size: int = 500):
+        if engine not in ENGINE_CHOICES:
+            raise ValueError(f"Unknown consensus engine: {engine}")
+        self.engine = engine
+        self.batch_size = batch_size  # Part numbers per GROUP BY in the sql engine
         self.min_listings_required = 2
         self.base_confidence = 20  # Base confidence percentage
         self.max_weight_bonus = 40  # Maximum weight bonus percentage
+        self.status_thresholds = (40, 60, 80)  # Minimum confidence for LOW, MEDIUM, HIGH
     
-    def process_part_number(self, part_number: str) -> Dict:
-        """Process all raw listings for a specific part number"""
+    @property
+    def thresholds_centi(self):
+        return tuple(int(threshold * 100) for threshold in self.status_thresholds)
+    
+    def process_part_number(self, part_number: str, detect_conflicts: bool = True) -> Dict:
+        """Process all raw listings for a specific part number
+        
+        Batch runs pass detect_conflicts=False and run one conflict pass
+        over all of their part numbers afterwards (see process_part_numbers).
+        """
         logger.info(f"Processing consensus for part number: {part_number}")
         
-        raw_listings = RawListingData.objects.filter(part_number=part_number)
+        if self.engine == ENGINE_SQL:
+            groups = self.aggregate_fitment_groups([part_number]).get(part_number, {})
+            return self.process_aggregated_groups(part_number, groups, detect_conflicts=detect_conflicts)
         
-        if raw_listings.count() < self.min_listings_required:
-            logger.info(f"Insufficient data points for {part_number}: {raw_listings.count()} < {self.min_listings_required}")
+        # Group listings by fitment signature (single streaming pass over the rows)
+        fitment_groups = self.group_by_fitment_signature(self.iter_listing_records(part_number))
+        archived = archived_groups([part_number]).get(part_number, {})
+        total_listings = (
+            sum(len(listings) for listings in fitment_groups.values())
+            + sum(group['listing_count'] for group in archived.values())
+        )
+        
+        writer = ConsensusWriter()
+        writer.retain(part_number, {*fitment_groups, *archived})
+        
+        if total_listings < self.min_listings_required:
+            writer.flush()
+            logger.info(f"Insufficient data points for {part_number}: {total_listings} < {self.min_listings_required}")
             return {'processed': 0, 'skipped': 1, 'reason': 'insufficient_data'}
         
-        # Group listings by fitment signature
-        fitment_groups = self.group_by_fitment_signature(raw_listings)
+        # Score all groups in one vectorized pass
+        group_consensus = self.score_fitment_groups(fitment_groups, archived)
         
-        processed_count = 0
-        conflicts_created = 0
+        for signature, consensus_data in group_consensus.items():
+            writer.add(part_number, consensus_data, fitment_groups.get(signature, []))
         
-        # Calculate consensus for each group
-        for signature, listings in fitment_groups.items():
-            consensus_data = self.calculate_consensus(listings)
-            
-            with transaction.atomic():
-                created, updated = self.update_or_create_consensus_fitment(
-                    part_number, signature, consensus_data, listings
-                )
-                if created or updated:
-                    processed_count += 1
+        processed_count = writer.flush()
         
         # Identify conflicts
-        conflicts = self.identify_conflicts(part_number, fitment_groups)
-        conflicts_created = len(conflicts)
+        conflicts_created = self.detect_conflicts([part_number])['conflicts'] if detect_conflicts else 0
+        
+        logger.info(f"Processed {processed_count} consensus fitments for {part_number}, identified {conflicts_created} conflicts")
+        
+        return {
+            'processed': processed_count,
+            'conflicts': conflicts_created,
+            'total_groups': len(group_consensus),
+            'total_listings': total_listings
+        }
+    
+    def process_aggregated_groups(self, part_number: str, groups: Dict[int, Dict],
+                                  writer: ConsensusWriter = None, detect_conflicts: bool = True) -> Dict:
+        """Write consensus for pre-aggregated groups (see aggregate_fitment_groups)
+        
+        With a shared writer the consensus rows are only buffered; the caller
+        flushes them once for the whole batch. Consensus rows of groups that
+        are no longer in groups are deleted by that flush (see ConsensusWriter.retain).
+        """
+        total_listings = sum(group['supporting_listings_count'] for group in groups.values())
+        batch_writer = writer if writer is not None else ConsensusWriter()
+        batch_writer.retain(part_number, groups)
+        
+        if total_listings < self.min_listings_required:
+            if writer is None:
+                batch_writer.flush()
+            logger.info(f"Insufficient data points for {part_number}: {total_listings} < {self.min_listings_required}")
+            return {'processed': 0, 'skipped': 1, 'reason': 'insufficient_data'}
+        
+        for signature, group in groups.items():
+            consensus_data = {key: value for key, value in group.items() if key != 'listing_ids'}
+            batch_writer.add(part_number, consensus_data, group['listing_ids'])
+        
+        processed_count = len(groups) if writer is not None else batch_writer.flush()
+        
+        conflicts_created = self.detect_conflicts([part_number])['conflicts'] if detect_conflicts else 0
         
         logger.info(f"Processed {processed_count} consensus fitments for {part_number}, identified {conflicts_created} conflicts")
         
         return {
             'processed': processed_count,
             'conflicts': conflicts_created,
-            'total_groups': len(fitment_groups),
-            'total_listings': raw_listings.count()
+            'total_groups': len(groups),
+            'total_listings': total_listings
         }
     
-    def group_by_fitment_signature(self, raw_listings) -> Dict[str, List]:
-        """Group listings by unique vehicle fitment combination"""
+    def aggregate_fitment_groups(self, part_numbers: List[str]) -> Dict[str, Dict[int, Dict]]:
+        """Group, count and weight listings in the database.
+        
+        Returns {part_number: {fitment_hash: consensus_data}}, where consensus_data
+        matches calculate_consensus() plus a 'listing_ids' list (hot listings only;
+        archived statistics are added before scoring).
+        """
+        queryset = (
+            RawListingData.objects
+            .filter(part_number__in=part_numbers)
+            .order_by()
+            .values('part_number', 'fitment_hash', *FITMENT_FIELDS)
+        )
+        annotations = listing_group_annotations()
+        if connection.vendor == 'postgresql':
+            from django.contrib.postgres.aggregates import ArrayAgg
+            annotations['listing_ids'] = ArrayAgg('id')
+        
+        rows = add_archived_groups(list(queryset.annotate(**annotations)), part_numbers)
+        
+        results = defaultdict(dict)
+        for row, consensus_data in zip(rows, self.score_group_totals(rows)):
+            consensus_data['listing_ids'] = row.get('listing_ids', [])
+            results[row['part_number']][row['fitment_hash']] = consensus_data
+        
+        if connection.vendor != 'postgresql':
+            # No array aggregate available: collect ids with a narrow values_list pass
+            id_rows = (
+                RawListingData.objects
+                .filter(part_number__in=part_numbers)
+                .order_by()
+                .values_list('id', 'part_number', 'fitment_hash')
+            )
+            for listing_id, part_number, fitment_hash in id_rows.iterator():
+                results[part_number][fitment_hash]['listing_ids'].append(listing_id)
+        
+        return dict(results)
+    
+    def iter_listing_records(self, part_number: str) -> Iterator[ListingRecord]:
+        """Stream a part number's listings as ListingRecords with a chunked cursor"""
+        rows = (
+            RawListingData.objects
+            .filter(part_number=part_number)
+            .order_by()
+            .values_list(*LISTING_RECORD_FIELDS)
+        )
+        return map(ListingRecord._make, rows.iterator(chunk_size=STREAM_CHUNK_SIZE))
+    
+    def group_by_fitment_signature(self, raw_listings) -> Dict[int, List]:
+        """Group listings by unique vehicle fitment combination (keyed on the stored fitment_hash)"""
         fitment_groups = defaultdict(list)
         
         for listing in raw_listings:
-            signature = listing.get_fitment_signature()
-            fitment_groups[signature].append(listing)
+            fitment_groups[listing.fitment_hash].append(listing)
         
         return dict(fitment_groups)
     
+    def score_fitment_groups(self, fitment_groups: Dict[int, List], archived: Dict[int, Dict] = None) -> Dict[int, Dict]:
+        """calculate_consensus() for every group at once, using columnar NumPy scoring
+        
+        archived maps fitment_hash to the part's ArchivedListingGroup statistics
+        (see archive.archived_groups); they are added to the listings' groups
+        before confidence is computed.
+        """
+        signatures = list(fitment_groups)
+        columns = defaultdict(list)
+        
+        for index, signature in enumerate(signatures):
+            for listing in fitment_groups[signature]:
+                columns['group_ids'].append(index)
+                columns['feedback_counts'].append(listing.seller_feedback_count)
+                columns['seller_is_business'].append(listing.seller_is_business)
+                columns['is_verified_seller'].append(listing.is_verified_seller)
+                columns['has_oem_reference'].append(listing.has_oem_reference)
+                columns['has_detailed_description'].append(listing.has_detailed_description)
+        
+        if not signatures and not archived:
+            return {}
+        
+        results = {}
+        if signatures:
+            scores = score_groups(
+                base_confidence=self.base_confidence,
+                max_weight_bonus=self.max_weight_bonus,
+                thresholds_centi=self.thresholds_centi,
+                **columns
+            )
+            for index, count, weight, confidence, code, flag_counts in zip(*scores):
+                signature = signatures[index]
+                first_listing = fitment_groups[signature][0]
+                fitment = {field: getattr(first_listing, field) for field in FITMENT_FIELDS}
+                results[signature] = self.build_consensus_data(fitment, count, weight, confidence, code, flag_counts)
+        
+        if archived:
+            # Re-score with the archived statistics added to the listings' totals
+            rows = add_archived_statistics([
+                {
+                    'fitment_hash': signature, **{field: data[field] for field in FITMENT_FIELDS},
+                    'listing_count': data['supporting_listings_count'], 'weight_milli': data['weight_sum_milli'],
+                    **{field: data[field] for field in FLAG_COUNT_FIELDS},
+                }
+                for signature, data in results.items()
+            ], archived)
+            results = {row['fitment_hash']: data for row, data in zip(rows, self.score_group_totals(rows))}
+        
+        return results
+    
+    def score_group_totals(self, rows: List[Dict]) -> List[Dict]:
+        """consensus_data for grouped rows carrying FITMENT_FIELDS and archive.STATISTIC_KEYS totals"""
+        confidences = confidence_centi(
+            [row['listing_count'] for row in rows],
+            [row['weight_milli'] for row in rows],
+            self.base_confidence,
+            self.max_weight_bonus
+        )
+        return [
+            self.build_consensus_data(
+                row, row['listing_count'], row['weight_milli'], confidence, code,
+                [row[field] for field in FLAG_COUNT_FIELDS]
+            )
+            for row, confidence, code in zip(rows, confidences, status_codes(confidences, self.thresholds_centi))
+        ]
+    
+    def build_consensus_data(self, fitment: Dict, listing_count: int, weight_milli: int,
+                             confidence: int, status_code: int, flag_counts) -> Dict:
+        """consensus_data dict from batch scores (weight in thousandths, confidence in hundredths)
+        
+        flag_counts are the group's quality flag counts, ordered like FLAG_COUNT_FIELDS.
+        """
+        consensus_data = {field: fitment[field] for field in FITMENT_FIELDS}
+        consensus_data.update({
+            'confidence_score': confidence_to_decimal(confidence),
+            'supporting_listings_count': int(listing_count),
+            'total_weight_score': weight_to_decimal(weight_milli),
+            'weight_sum_milli': int(weight_milli),
+            'status': STATUS_BY_CODE[status_code],
+        })
+        consensus_data.update({field: int(count) for field, count in zip(FLAG_COUNT_FIELDS, flag_counts)})
+        return consensus_data
+    
     def calculate_consensus(self, listings: List[RawListingData]) -> Dict:
-        """Calculate consensus metrics for a group of listings"""
+        """Calculate consensus metrics for a group of listings (scalar reference path)"""
         if not listings:
             return {}
         
@@ -117,171 +342,210 @@ class FitmentConsensusProcessor:
     def determine_status(self, confidence: Decimal) -> str:
         """Determine fitment status based on confidence score"""
         confidence_float = float(confidence)
+        low, medium, high = self.status_thresholds
         
-        if confidence_float >= 80:
+        if confidence_float >= high:
             return 'HIGH_CONFIDENCE'
-        elif confidence_float >= 60:
+        elif confidence_float >= medium:
             return 'MEDIUM_CONFIDENCE'
-        elif confidence_float >= 40:
+        elif confidence_float >= low:
             return 'LOW_CONFIDENCE'
         else:
             return 'NEEDS_REVIEW'
     
-    def update_or_create_consensus_fitment(self, part_number: str, signature: str, 
-                                         consensus_data: Dict, listings: List) -> Tuple[bool, bool]:
-        """Update or create consensus fitment record"""
-        if not consensus_data:
-            return False, False
-        
-        try:
-            consensus_fitment, created = ConsensusFitment.objects.update_or_create(
-                part_number=part_number,
-                vehicle_year=consensus_data['vehicle_year'],
-                vehicle_make=consensus_data['vehicle_make'],
-                vehicle_model=consensus_data['vehicle_model'],
-                vehicle_trim=consensus_data['vehicle_trim'],
-                vehicle_engine=consensus_data['vehicle_engine'],
-                defaults={
-                    'confidence_score': consensus_data['confidence_score'],
-                    'supporting_listings_count': consensus_data['supporting_listings_count'],
-                    'total_weight_score': consensus_data['total_weight_score'],
-                    'status': consensus_data['status']
-                }
-            )
-            
-            # Update the many-to-many relationship
-            consensus_fitment.supporting_raw_listings.set(listings)
-            
-            return created, not created
-            
-        except Exception as e:
-            logger.error(f"Error creating/updating consensus fitment for {part_number}: {e}")
-            return False, False
-    
-    def identify_conflicts(self, part_number: str, fitment_groups: Dict) -> List[str]:
-        """Identify potential conflicts requiring manual review"""
-        conflicts = []
-        
-        if len(fitment_groups) <= 1:
-            return conflicts  # No conflicts possible
-        
-        # Check for suspicious patterns
-        year_conflicts = self.check_year_conflicts(fitment_groups)
-        platform_conflicts = self.check_platform_conflicts(fitment_groups)
+    def rescore_consensus(self) -> Dict:
+        """Recompute confidence_score and status for every ConsensusFitment in SQL.
+        
+        Uses the stored supporting_listings_count and weight_sum_milli, so
+        changes to base_confidence, max_weight_bonus or status_thresholds
+        apply without reading RawListingData. Manually VERIFIED or REJECTED
+        fitments get the new confidence but keep their status. Rows whose
+        confidence or status changes get a new last_updated (update() skips
+        auto_now), so incremental promotion picks them up.
+        """
+        started = time.monotonic()
+        confidence = Least(
+            Value(self.base_confidence * 100)
+            + Least(F('weight_sum_milli'), Value(self.max_weight_bonus * 100))
+            + Least((F('supporting_listings_count') - 1) * 15, Value(30)) * 100,
+            Value(10000),
+        )
+        confidence_score = ExpressionWrapper(
+            confidence * Value(Decimal('0.01')), output_field=DecimalField(max_digits=5, decimal_places=2)
+        )
+        low, medium, high = self.thresholds_centi
+        status = Case(
+            When(Q(status__in=MANUAL_STATUSES), then=F('status')),
+            *[
+                When(GreaterThanOrEqual(confidence, Value(threshold)), then=Value(name))
+                for threshold, name in ((high, 'HIGH_CONFIDENCE'), (medium, 'MEDIUM_CONFIDENCE'), (low, 'LOW_CONFIDENCE'))
+            ],
+            default=Value('NEEDS_REVIEW'),
+        )
         
-        all_conflicts = year_conflicts + platform_conflicts
+        last_updated = Case(
+            When(Q(confidence_score=confidence_score, status=status), then=F('last_updated')),
+            default=Value(timezone.now()),
+        )
         
-        if all_conflicts:
-            self.create_conflict_record(part_number, fitment_groups, all_conflicts)
-            conflicts.extend(all_conflicts)
+        with transaction.atomic():
+            updated = ConsensusFitment.objects.update(
+                confidence_score=confidence_score, status=status, last_updated=last_updated
+            )
         
-        return conflicts
+        elapsed = time.monotonic() - started
+        logger.info(f"Re-scored {updated} consensus fitments in {elapsed:.2f}s")
+        self.refresh_statistics()
+        return {'rescored': updated, 'elapsed_seconds': round(elapsed, 2)}
     
-    def check_year_conflicts(self, fitment_groups: Dict) -> List[str]:
-        """Check for conflicting year ranges"""
-        conflicts = []
-        years = []
-        
-        for signature, listings in fitment_groups.items():
-            year = listings[0].vehicle_year
-            years.append(year)
-        
-        # Flag if years span more than expected generation length
-        if len(years) > 1:
-            year_span = max(years) - min(years)
-            if year_span > 8:  # Most generations are 6-8 years
-                conflicts.append(f"Suspicious year range: {min(years)}-{max(years)} (span: {year_span} years)")
-        
-        return conflicts
+    def detect_conflicts(self, part_numbers: List[str] = None) -> Dict:
+        """Run the batch conflict rules (see conflicts.py); None checks every part number"""
+        return ConflictDetector(min_listings=self.min_listings_required).detect(part_numbers)
     
-    def check_platform_conflicts(self, fitment_groups: Dict) -> List[str]:
-        """Check for conflicting platforms/models"""
-        conflicts = []
-        makes = set()
-        models = set()
-        
-        for signature, listings in fitment_groups.items():
-            makes.add(listings[0].vehicle_make)
-            models.add(listings[0].vehicle_model)
-        
-        # Flag cross-manufacturer fitments (unusual but possible)
-        if len(makes) > 1:
-            conflicts.append(f"Cross-manufacturer fitment: {', '.join(makes)}")
-        
-        # Flag multiple models (may indicate part family)
-        if len(models) > 3:
-            conflicts.append(f"Multiple models: {', '.join(models)}")
-        
-        return conflicts
-    
-    def create_conflict_record(self, part_number: str, fitment_groups: Dict, conflicts: List[str]):
-        """Create a conflict record for manual review"""
-        conflict_description = "; ".join(conflicts)
-        
-        # Get all listings involved in the conflict
-        all_listings = []
-        for listings in fitment_groups.values():
-            all_listings.extend(listings)
-        
-        try:
-            with transaction.atomic():
-                conflict_record, created = ConflictingFitment.objects.get_or_create(
-                    part_number=part_number,
-                    conflict_description=conflict_description,
-                    defaults={'resolution_status': 'PENDING'}
-                )
-                
-                if created:
-                    conflict_record.conflicting_listings.set(all_listings)
-                    logger.info(f"Created conflict record for {part_number}: {conflict_description}")
-                
-        except Exception as e:
-            logger.error(f"Error creating conflict record for {part_number}: {e}")
-    
-    def process_all_new_data(self, min_listings: int = 2) -> Dict:
+    def process_all_new_data(self, min_listings: int = 2, workers: int = 1) -> Dict:
         """Process all part numbers with new raw data"""
         self.min_listings_required = min_listings
         
-        # Find part numbers with sufficient raw data
-        part_numbers_with_data = (
+        # Find part numbers with sufficient raw data, hot and archived listings together
+        listing_counts = Counter(dict(
             RawListingData.objects
+            .order_by()
             .values('part_number')
             .annotate(listing_count=models.Count('id'))
-            .filter(listing_count__gte=min_listings)
-            .values_list('part_number', flat=True)
+            .values_list('part_number', 'listing_count')
+        ))
+        listing_counts.update(dict(
+            ArchivedListingGroup.objects
+            .order_by()
+            .values('part_number')
+            .annotate(listing_count=models.Sum('listing_count'))
+            .values_list('part_number', 'listing_count')
+        ))
+        part_numbers_with_data = sorted(
+            part_number for part_number, count in listing_counts.items() if count >= min_listings
         )
         
-        total_processed = 0
-        total_conflicts = 0
         total_parts = len(part_numbers_with_data)
         
         logger.info(f"Processing {total_parts} part numbers with >= {min_listings} listings")
         
-        for part_number in part_numbers_with_data:
-            try:
-                result = self.process_part_number(part_number)
-                total_processed += result.get('processed', 0)
-                total_conflicts += result.get('conflicts', 0)
-            except Exception as e:
-                logger.error(f"Error processing part number {part_number}: {e}")
+        totals = self.process_part_numbers(part_numbers_with_data, workers=workers)
         
         return {
             'total_parts_processed': total_parts,
-            'total_fitments_processed': total_processed,
-            'total_conflicts_identified': total_conflicts
+            'total_fitments_processed': totals['processed'],
+            'total_conflicts_identified': totals['conflicts'],
+            'elapsed_seconds': totals['elapsed_seconds'],
+            'parts_per_second': totals['parts_per_second']
         }
     
-    def get_processing_stats(self) -> Dict:
-        """Get overall processing statistics"""
+    def process_part_numbers(self, part_numbers: List[str], workers: int = 1,
+                             heartbeat: Callable[[], None] = None) -> Dict:
+        """Process a list of part numbers, optionally across worker processes.
+        
+        Returns merged totals plus elapsed time and parts-per-second throughput;
+        totals['failed'] lists the part numbers whose consensus was not written.
+        heartbeat (e.g. LeaseHeartbeat.beat) is called after every part number
+        or finished shard.
+        """
+        started = time.monotonic()
+        heartbeat = heartbeat or (lambda: None)
+        
+        if workers > 1 and len(part_numbers) > 1:
+            from .parallel import process_in_parallel
+            totals = process_in_parallel(self, part_numbers, workers, heartbeat=heartbeat)
+        else:
+            totals = {'parts': 0, 'processed': 0, 'conflicts': 0, 'failed': []}
+            for part_number, result in self.iter_process_part_numbers(part_numbers):
+                totals['parts'] += 1
+                totals['processed'] += result.get('processed', 0)
+                if result.get('failed'):
+                    totals['failed'].append(part_number)
+                heartbeat()
+        
+        # One conflict pass for the whole run instead of one per part number
+        try:
+            totals['conflicts'] = self.detect_conflicts(part_numbers)['conflicts']
+        except Exception as e:
+            logger.error(f"Error detecting conflicts: {e}")
+        
+        elapsed = time.monotonic() - started
+        totals['elapsed_seconds'] = round(elapsed, 2)
+        totals['parts_per_second'] = round(len(part_numbers) / elapsed, 1) if elapsed > 0 else 0.0
+        
+        self.refresh_statistics()
+        return totals
+    
+    def refresh_statistics(self):
+        """Recompute the cached statistics snapshot after a run; failures only log"""
+        from ..stats import refresh_statistics
+        try:
+            refresh_statistics()
+        except Exception as e:
+            logger.error(f"Error refreshing statistics snapshot: {e}")
+    
+    def iter_process_part_numbers(self, part_numbers: List[str]):
+        """Process part numbers, yielding (part_number, result) pairs.
+        
+        The sql engine aggregates batch_size part numbers per query and
+        writes their consensus rows with one ConsensusWriter flush.
+        Errors are logged and yield a failed result (see failed_result) for
+        the part number, or for every part number of a batch whose flush failed.
+        """
+        if self.engine != ENGINE_SQL:
+            for part_number in part_numbers:
+                try:
+                    yield part_number, self.process_part_number(part_number, detect_conflicts=False)
+                except Exception as e:
+                    logger.error(f"Error processing part number {part_number}: {e}")
+                    yield part_number, self.failed_result(e)
+            return
+        
+        for start in range(0, len(part_numbers), self.batch_size):
+            batch = part_numbers[start:start + self.batch_size]
+            aggregated = self.aggregate_fitment_groups(batch)
+            writer = ConsensusWriter()
+            results = []
+            
+            for part_number in batch:
+                try:
+                    logger.info(f"Processing consensus for part number: {part_number}")
+                    results.append((part_number, self.process_aggregated_groups(
+                        part_number, aggregated.get(part_number, {}), writer=writer, detect_conflicts=False
+                    )))
+                except Exception as e:
+                    logger.error(f"Error processing part number {part_number}: {e}")
+                    results.append((part_number, self.failed_result(e)))
+            
+            try:
+                writer.flush()
+            except Exception as e:
+                logger.error(f"Error writing consensus fitments for batch starting at {batch[0]}: {e}")
+                results = [(part_number, self.failed_result(e)) for part_number in batch]
+            
+            yield from results
+    
+    @staticmethod
+    def failed_result(error: Exception) -> Dict:
+        """Result of a part number whose consensus could not be written"""
+        return {'processed': 0, 'failed': True, 'error': str(error)}
+    
+    def get_processing_stats(self, refresh: bool = False) -> Dict:
+        """Get overall processing statistics from the shared statistics snapshot"""
+        from ..stats import get_statistics
+        snapshot = get_statistics(refresh=refresh)
+        consensus = snapshot['consensus']
+        
         stats = {
-            'raw_listings_total': RawListingData.objects.count(),
-            'consensus_fitments_total': ConsensusFitment.objects.count(),
-            'high_confidence_count': ConsensusFitment.objects.filter(status='HIGH_CONFIDENCE').count(),
-            'medium_confidence_count': ConsensusFitment.objects.filter(status='MEDIUM_CONFIDENCE').count(),
-            'low_confidence_count': ConsensusFitment.objects.filter(status='LOW_CONFIDENCE').count(),
-            'needs_review_count': ConsensusFitment.objects.filter(status='NEEDS_REVIEW').count(),
-            'pending_conflicts': ConflictingFitment.objects.filter(resolution_status='PENDING').count(),
-            'unique_part_numbers': RawListingData.objects.values('part_number').distinct().count()
+            'raw_listings_total': snapshot['raw_listings']['total'],
+            'consensus_fitments_total': consensus['total'],
+            'high_confidence_count': consensus['high_confidence'],
+            'medium_confidence_count': consensus['medium_confidence'],
+            'low_confidence_count': consensus['low_confidence'],
+            'needs_review_count': consensus['needs_review'],
+            'pending_conflicts': snapshot['conflicts']['pending'],
+            'unique_part_numbers': snapshot['raw_listings']['part_numbers'],
+            'computed_at': snapshot['computed_at'],
         }
         
         # Calculate percentages
@@ -289,8 +553,7 @@ class FitmentConsensusProcessor:
         if total_consensus > 0:
             stats['high_confidence_percentage'] = round((stats['high_confidence_count'] / total_consensus) * 100, 2)
             stats['production_ready_percentage'] = round((
-                (stats['high_confidence_count'] + 
-                 ConsensusFitment.objects.filter(status='VERIFIED').count()) / total_consensus
+                (stats['high_confidence_count'] + consensus['verified']) / total_consensus
             ) * 100, 2)
         else:
             stats['high_confidence_percentage'] = 0
@@ -0,0 +1,254 @@
+"""Promote production-ready ConsensusFitment rows into catalog Fitment rows
+
+ConsensusFitment stores free-text year/make/model/trim/engine; Fitment links
+a Part to a Vehicle. NaturalKeyIndex loads every active Part and Vehicle
+once (one query each) and resolves consensus rows against normalized
+natural keys in memory, so a promotion run costs a handful of queries per
+batch no matter how many rows it resolves:
+
+- part number (whitespace removed, upper-cased) -> Part ids; a part number
+  shared by several manufacturers is ambiguous and is not promoted
+- year + make + model (+ trim, + engine; case-insensitive) -> Vehicle ids;
+  a blank trim or engine matches every trim or engine, as in import_csv, and
+  the row is promoted to every matching vehicle rather than flagged
+
+Resolved rows become Fitments through bulk_create(ignore_conflicts=True).
+Existing Fitments are never modified. Rows that cannot be resolved are
+recorded as ConsensusPromotionIssue for review and are retried on every run
+until they resolve.
+
+Each run is recorded as a FitmentBulkImport. Incremental runs only look at
+consensus rows updated since the last completed run started, plus rows with
+an open issue.
+"""
+
+from collections import Counter, defaultdict
+from datetime import datetime
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from itertools import product
+from typing import Dict, List, Optional
+import logging
+import time
+
+from apps.fitments.models import Fitment, FitmentBulkImport
+from apps.vehicles.models import Vehicle
+from ..models import ConsensusFitment, ConsensusPromotionIssue, Part
+from ..normalization import normalize_name, normalize_part_number
+
+logger = logging.getLogger(__name__)
+
+PROMOTABLE_STATUSES = ('HIGH_CONFIDENCE', 'VERIFIED')
+PROMOTION_IMPORT_NAME = 'Consensus promotion'
+PROMOTED_BY = 'consensus_promotion'
+
+CONSENSUS_COLUMNS = (
+    'id', 'part_number', 'vehicle_year', 'vehicle_make', 'vehicle_model', 'vehicle_trim', 'vehicle_engine',
+    'status', 'confidence_score', 'supporting_listings_count',
+)
+
+
+class NaturalKeyIndex:
+    """Active Part and Vehicle ids by normalized natural key.
+
+    Each vehicle is indexed under its exact key and under the keys with trim
+    and/or engine wildcarded (None), so a consensus row without a trim finds
+    every trim of its year/make/model with a single dict lookup.
+    """
+
+    def __init__(self):
+        self.parts = defaultdict(list)
+        self.vehicles = defaultdict(list)
+
+    @classmethod
+    def load(cls, chunk_size: int = 10000) -> 'NaturalKeyIndex':
+        index = cls()
+        parts = Part.objects.filter(is_active=True).order_by().values_list('id', 'part_number')
+        for part_id, part_number in parts.iterator(chunk_size=chunk_size):
+            index.parts[normalize_part_number(part_number)].append(part_id)
+
+        vehicles = Vehicle.objects.filter(is_active=True).order_by().values_list(
+            'id', 'year', 'make__name', 'model__name', 'trim__name', 'engine__name'
+        )
+        for vehicle_id, year, make, model, trim, engine in vehicles.iterator(chunk_size=chunk_size):
+            index.add_vehicle(vehicle_id, year, make, model, trim, engine)
+        return index
+
+    def add_vehicle(self, vehicle_id: int, year: int, make: str, model: str, trim: str = None, engine: str = None):
+        trim, engine = normalize_name(trim), normalize_name(engine)
+        base = (year, normalize_name(make), normalize_name(model))
+        for trim_key, engine_key in product({trim or None, None}, {engine or None, None}):
+            self.vehicles[(*base, trim_key, engine_key)].append(vehicle_id)
+
+    def resolve_part(self, part_number: str) -> List[int]:
+        return self.parts.get(normalize_part_number(part_number), [])
+
+    def resolve_vehicles(self, year: int, make: str, model: str, trim: str = '', engine: str = '') -> List[int]:
+        key = (year, normalize_name(make), normalize_name(model), normalize_name(trim) or None,
+               normalize_name(engine) or None)
+        return self.vehicles.get(key, [])
+
+
+def last_promotion_started() -> Optional[datetime]:
+    """Start time of the most recent completed promotion run"""
+    return (
+        FitmentBulkImport.objects
+        .filter(import_name=PROMOTION_IMPORT_NAME, status='COMPLETED')
+        .order_by('-created_at')
+        .values_list('created_at', flat=True)
+        .first()
+    )
+
+
+class ConsensusPromoter:
+    """Resolve promotable consensus rows in batches and bulk-insert their Fitments"""
+
+    def __init__(self, batch_size: int = 2000, dry_run: bool = False, index: NaturalKeyIndex = None):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.index = index
+
+    def promotable(self, since: datetime = None):
+        """Promotable rows, limited to those updated since `since` or with an open issue"""
+        queryset = ConsensusFitment.objects.filter(status__in=PROMOTABLE_STATUSES)
+        if since is not None:
+            queryset = queryset.filter(Q(last_updated__gte=since) | Q(promotion_issue__isnull=False))
+        return queryset
+
+    def run(self, full: bool = False) -> Dict:
+        """Promote everything (full) or only what changed since the last completed run"""
+        since = None if full else last_promotion_started()
+        if self.dry_run:
+            return self.promote(since)
+
+        record = FitmentBulkImport.objects.create(
+            import_name=PROMOTION_IMPORT_NAME,
+            description=f"{'Full' if since is None else 'Incremental'} promotion of {', '.join(PROMOTABLE_STATUSES)} "
+                        f"consensus fitments" + (f" updated since {since.isoformat()}" if since else ''),
+            status='PROCESSING',
+            created_by=PROMOTED_BY,
+        )
+        try:
+            stats = self.promote(since)
+        except Exception as e:
+            record.status = 'FAILED'
+            record.import_log = str(e)
+            record.completed_at = timezone.now()
+            record.save(update_fields=['status', 'import_log', 'completed_at'])
+            raise
+
+        record.status = 'COMPLETED'
+        record.total_records = stats['examined']
+        record.successful_imports = stats['matched']
+        record.failed_imports = stats['unmatched']
+        record.import_log = '\n'.join(f"{key}: {value}" for key, value in stats.items())
+        record.completed_at = timezone.now()
+        record.save(update_fields=[
+            'status', 'total_records', 'successful_imports', 'failed_imports', 'import_log', 'completed_at'
+        ])
+        return stats
+
+    def promote(self, since: datetime = None) -> Dict:
+        started = time.perf_counter()
+        if self.index is None:
+            self.index = NaturalKeyIndex.load()
+
+        stats = Counter(examined=0, matched=0, unmatched=0, fitments_created=0, fitments_existing=0)
+        rows = self.promotable(since).order_by('id').values_list(*CONSENSUS_COLUMNS)
+        last_id = 0
+        while True:
+            batch = list(rows.filter(id__gt=last_id)[:self.batch_size])
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            stats.update(self.promote_batch(batch))
+
+        stats['elapsed_seconds'] = round(time.perf_counter() - started, 2)
+        stats['since'] = since.isoformat() if since else None
+        logger.info(f"Consensus promotion: {dict(stats)}")
+        return dict(stats)
+
+    def promote_batch(self, rows: List[tuple]) -> Counter:
+        """Resolve one batch of CONSENSUS_COLUMNS tuples; one read, two or three writes"""
+        now = timezone.now()
+        counts = Counter(examined=len(rows))
+        fitments = {}  # (part_id, vehicle_id) -> Fitment
+        issues = []
+        matched_ids = []
+
+        for consensus_id, part_number, year, make, model, trim, engine, status, confidence, listings in rows:
+            part_ids = self.index.resolve_part(part_number)
+            vehicle_ids = self.index.resolve_vehicles(year, make, model, trim, engine)
+            if len(part_ids) == 1 and vehicle_ids:
+                matched_ids.append(consensus_id)
+                for vehicle_id in vehicle_ids:
+                    key = (part_ids[0], vehicle_id)
+                    # Several consensus rows can reach one vehicle (with and without a trim); VERIFIED wins
+                    if key not in fitments or status == 'VERIFIED':
+                        fitments[key] = self.build_fitment(part_ids[0], vehicle_id, status, confidence, listings, now)
+                continue
+
+            if not part_ids:
+                reason, candidates = 'PART_NOT_FOUND', 0
+            elif len(part_ids) > 1:
+                reason, candidates = 'PART_AMBIGUOUS', len(part_ids)
+            else:
+                reason, candidates = 'VEHICLE_NOT_FOUND', 0
+            counts[f'issues_{reason.lower()}'] += 1
+            issues.append(ConsensusPromotionIssue(
+                consensus_fitment_id=consensus_id,
+                part_number=part_number,
+                reason=reason,
+                candidates=candidates,
+                last_seen=now,
+            ))
+
+        counts['matched'] = len(matched_ids)
+        counts['unmatched'] = len(issues)
+
+        existing = set()
+        if fitments:
+            existing = set(
+                Fitment.objects
+                .filter(
+                    part_id__in={part_id for part_id, _ in fitments},
+                    vehicle_id__in={vehicle_id for _, vehicle_id in fitments},
+                    position='',
+                )
+                .values_list('part_id', 'vehicle_id')
+            ) & fitments.keys()
+        new_fitments = [fitment for key, fitment in fitments.items() if key not in existing]
+        counts['fitments_created'] = len(new_fitments)
+        counts['fitments_existing'] = len(existing)
+
+        if self.dry_run:
+            return counts
+
+        with transaction.atomic():
+            # ignore_conflicts covers Fitments inserted concurrently since the lookup above
+            Fitment.objects.bulk_create(new_fitments, batch_size=self.batch_size, ignore_conflicts=True)
+            if matched_ids:
+                ConsensusPromotionIssue.objects.filter(consensus_fitment_id__in=matched_ids).delete()
+            if issues:
+                ConsensusPromotionIssue.objects.bulk_create(
+                    issues,
+                    batch_size=self.batch_size,
+                    update_conflicts=True,
+                    unique_fields=['consensus_fitment'],
+                    update_fields=['part_number', 'reason', 'candidates', 'last_seen'],
+                )
+        return counts
+
+    @staticmethod
+    def build_fitment(part_id: int, vehicle_id: int, status: str, confidence, listings: int, now) -> Fitment:
+        verified = status == 'VERIFIED'
+        return Fitment(
+            part_id=part_id,
+            vehicle_id=vehicle_id,
+            notes=f"Consensus fitment: {confidence}% confidence from {listings} listings",
+            is_verified=verified,
+            verified_by='Consensus review' if verified else '',
+            verification_date=now.date() if verified else None,
+            created_by=PROMOTED_BY,
+        )
@@ -0,0 +1,195 @@
+"""Batched auto-resolution of ConflictingFitment records
+
+Conflicts are handled a page at a time. One query reads the listings of
+every conflict on the page, the heuristics run over NumPy columns, and the
+outcome is written with one bulk_update per page.
+"""
+
+from collections import namedtuple
+from decimal import Decimal
+from django.db import transaction
+from django.utils import timezone
+from typing import Callable, Dict, List, Optional
+import logging
+import numpy as np
+
+from ..models import ConflictingFitment, RawListingData, unpack_listing_ids
+from .scoring import quality_weights_milli
+
+logger = logging.getLogger(__name__)
+
+RESOLVE_PAGE_SIZE = 500
+RESOLVED_BY = 'auto-resolver'
+RESOLUTION_FIELDS = ['resolution_status', 'resolved_date', 'resolved_by', 'resolution_notes']
+
+# Listing columns the heuristics need, read through the conflict/listing link table
+LISTING_COLUMNS = (
+    'conflictingfitment_id', 'rawlistingdata__vehicle_year', 'rawlistingdata__vehicle_make',
+    'rawlistingdata__vehicle_model', 'rawlistingdata__vehicle_trim',
+    'rawlistingdata__seller_feedback_count', 'rawlistingdata__seller_is_business',
+    'rawlistingdata__is_verified_seller', 'rawlistingdata__has_oem_reference',
+    'rawlistingdata__has_detailed_description',
+)
+# The same columns read straight from RawListingData for packed conflicts
+PACKED_LISTING_COLUMNS = tuple(column.replace('rawlistingdata__', '') for column in LISTING_COLUMNS[1:])
+
+Resolution = namedtuple('Resolution', ['action', 'notes'])
+MANUAL = Resolution('manual', 'Requires manual review')
+
+
+class ConflictAutoResolver:
+    """Dismiss or resolve simple conflicts; everything else stays for manual review.
+
+    Heuristics, checked in order:
+    - year-range conflict from two listings one model year apart: dismiss
+    - one make and model with several trims: resolve as trim variations
+    - three or more listings where the weakest weighs under half the
+      average: resolve as a low quality outlier
+    """
+
+    def __init__(self, page_size: int = RESOLVE_PAGE_SIZE):
+        self.page_size = page_size
+
+    def resolve(self, conflicts, on_resolution: Optional[Callable] = None) -> Dict:
+        """Auto-resolve a ConflictingFitment queryset.
+
+        on_resolution(conflict, resolution) is called for each conflict that
+        was resolved or dismissed (e.g. for verbose output).
+        """
+        totals = {'resolved': 0, 'dismissed': 0, 'manual': 0}
+        conflict_ids = list(conflicts.values_list('id', flat=True))
+
+        for start in range(0, len(conflict_ids), self.page_size):
+            page = list(
+                ConflictingFitment.objects
+                .filter(id__in=conflict_ids[start:start + self.page_size])
+                .only('id', 'part_number', 'conflict_description', 'listing_ids_packed')
+            )
+            resolutions = self.analyze_page(page)
+            changed = self.apply(page, resolutions)
+
+            for conflict in page:
+                resolution = resolutions[conflict.id]
+                if resolution.action == 'manual':
+                    totals['manual'] += 1
+                    continue
+                totals['resolved' if resolution.action == 'resolve' else 'dismissed'] += 1
+                if on_resolution:
+                    on_resolution(conflict, resolution)
+
+            logger.info(f"Auto-resolver page at {start}: {changed} of {len(page)} conflicts closed")
+
+        return totals
+
+    def analyze_page(self, conflicts: List[ConflictingFitment]) -> Dict[int, Resolution]:
+        """Evaluate the heuristics for a page of conflicts with a single listing query
+        (plus one for conflicts whose listing ids are stored packed)"""
+        through = ConflictingFitment.conflicting_listings.through
+        linked = [conflict.id for conflict in conflicts if conflict.listing_ids_packed is None]
+        rows = list(
+            through.objects
+            .filter(conflictingfitment_id__in=linked)
+            .order_by('conflictingfitment_id', '-rawlistingdata__extraction_date')
+            .values_list(*LISTING_COLUMNS)
+        ) if linked else []
+        packed = [conflict for conflict in conflicts if conflict.listing_ids_packed is not None]
+        if packed:
+            rows = sorted(rows + self.packed_rows(packed), key=lambda row: row[0])
+        resolutions = {conflict.id: MANUAL for conflict in conflicts}
+        if not rows:
+            return resolutions
+
+        conflict_ids, years, makes, models, trims, *quality = zip(*rows)
+        groups, inverse = np.unique(np.asarray(conflict_ids, dtype=np.int64), return_inverse=True)
+        size = len(groups)
+
+        counts = np.bincount(inverse, minlength=size)
+        years = np.asarray(years, dtype=np.int64)
+        min_year = np.full(size, np.iinfo(np.int64).max)
+        max_year = np.full(size, np.iinfo(np.int64).min)
+        np.minimum.at(min_year, inverse, years)
+        np.maximum.at(max_year, inverse, years)
+
+        make_counts = self.distinct_counts(inverse, makes, size)
+        model_counts = self.distinct_counts(inverse, models, size)
+        trim_counts = np.bincount(inverse, weights=np.array([bool(trim) for trim in trims]), minlength=size)
+
+        weights = quality_weights_milli(*quality)
+        weight_sum = np.bincount(inverse, weights=weights, minlength=size).astype(np.int64)
+        weight_min = np.full(size, np.iinfo(np.int64).max)
+        np.minimum.at(weight_min, inverse, weights)
+
+        year_dismiss = (counts == 2) & (max_year - min_year <= 1)
+        trim_resolve = (make_counts == 1) & (model_counts == 1) & (trim_counts > 1)
+        # min < avg / 2, kept in integers: 2 * min * count < sum
+        outlier_resolve = (counts >= 3) & (2 * weight_min * counts < weight_sum)
+
+        descriptions = {conflict.id: conflict.conflict_description.lower() for conflict in conflicts}
+        trims_by_group = {index: [] for index in np.flatnonzero(trim_resolve).tolist()}
+        for row_group, trim in zip(inverse.tolist(), trims):
+            if trim and row_group in trims_by_group:
+                trims_by_group[row_group].append(trim)
+
+        for index, conflict_id in enumerate(groups.tolist()):
+            if year_dismiss[index] and 'year range' in descriptions[conflict_id]:
+                resolutions[conflict_id] = Resolution(
+                    'dismiss', f'Consecutive years {min_year[index]}-{max_year[index]} are likely same generation'
+                )
+            elif trim_resolve[index]:
+                resolutions[conflict_id] = Resolution(
+                    'resolve', f'Trim variations for same model: {", ".join(trims_by_group[index])}'
+                )
+            elif outlier_resolve[index]:
+                min_weight = Decimal(int(weight_min[index])) / 1000
+                avg_weight = Decimal(int(weight_sum[index])) / 1000 / int(counts[index])
+                resolutions[conflict_id] = Resolution(
+                    'resolve', f'Low quality outlier detected (weight: {min_weight:.2f} vs avg: {avg_weight:.2f})'
+                )
+
+        return resolutions
+
+    @staticmethod
+    def packed_rows(conflicts: List[ConflictingFitment]) -> List[tuple]:
+        """LISTING_COLUMNS rows for conflicts with packed listing ids, newest listing first"""
+        ids_by_conflict = {conflict.id: unpack_listing_ids(conflict.listing_ids_packed) for conflict in conflicts}
+        listings = {
+            listing_id: columns
+            for listing_id, *columns in (
+                RawListingData.objects
+                .filter(id__in={listing_id for ids in ids_by_conflict.values() for listing_id in ids})
+                .order_by('-extraction_date')
+                .values_list('id', *PACKED_LISTING_COLUMNS)
+            )
+        }
+        order = {listing_id: position for position, listing_id in enumerate(listings)}
+        return [
+            (conflict_id, *listings[listing_id])
+            for conflict_id, ids in ids_by_conflict.items()
+            for listing_id in sorted((i for i in ids if i in listings), key=order.__getitem__)
+        ]
+
+    @staticmethod
+    def distinct_counts(inverse: np.ndarray, values, size: int) -> np.ndarray:
+        """Number of distinct values per group"""
+        _, codes = np.unique(np.asarray(values, dtype=object), return_inverse=True)
+        pairs = np.unique(np.stack([inverse, codes]), axis=1)
+        return np.bincount(pairs[0], minlength=size)
+
+    def apply(self, conflicts: List[ConflictingFitment], resolutions: Dict[int, Resolution]) -> int:
+        """Write resolved and dismissed conflicts with one bulk update"""
+        now = timezone.now()
+        changed = []
+        for conflict in conflicts:
+            resolution = resolutions[conflict.id]
+            if resolution.action == 'manual':
+                continue
+            conflict.resolution_status = 'RESOLVED' if resolution.action == 'resolve' else 'DISMISSED'
+            conflict.resolved_date = now
+            conflict.resolved_by = RESOLVED_BY
+            conflict.resolution_notes = resolution.notes
+            changed.append(conflict)
+
+        if changed:
+            with transaction.atomic():
+                ConflictingFitment.objects.bulk_update(changed, RESOLUTION_FIELDS, batch_size=self.page_size)
+        return len(changed)
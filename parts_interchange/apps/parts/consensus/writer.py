@@ -0,0 +1,171 @@
+"""Batched writes of ConsensusFitment rows and their supporting-listing links"""
+
+from django.db import transaction
+from typing import Dict, Iterable, List
+import logging
+
+from ..models import FITMENT_SIGNATURE_FIELDS, ConsensusFitment, packed_listing_ids_enabled
+
+logger = logging.getLogger(__name__)
+
+UNIQUE_FIELDS = list(ConsensusFitment._meta.unique_together[0])  # part_number + fitment_hash
+STATISTIC_FIELDS = [
+    'supporting_listings_count', 'total_weight_score', 'weight_sum_milli',
+    'business_seller_count', 'verified_seller_count', 'oem_reference_count', 'detailed_description_count',
+]
+UPDATE_FIELDS = ['confidence_score', 'status', 'last_updated', *STATISTIC_FIELDS]
+
+# Statuses set by reviewers; re-scoring never overwrites them and stale-group cleanup keeps them
+MANUAL_STATUSES = ('VERIFIED', 'REJECTED')
+
+
+class ConsensusWriter:
+    """Collect consensus rows and write them with a constant number of queries.
+
+    flush() runs one upsert, one id lookup, one delete and one insert into the
+    supporting-listings through table, regardless of how many groups are buffered
+    (chunked by chunk_size for very large batches).
+
+    With packed=True (default: the PACKED_LISTING_IDS setting) the listing ids
+    are stored on the consensus row itself and no through rows are inserted.
+
+    Part numbers passed to retain() get their other consensus rows (groups
+    that no longer have any listings) deleted by the same flush, except rows
+    a reviewer verified or rejected.
+    """
+
+    def __init__(self, chunk_size: int = 1000, packed: bool = None):
+        self.chunk_size = chunk_size
+        self.packed = packed_listing_ids_enabled() if packed is None else packed
+        self.pending = {}  # (part_number, fitment_hash) -> (ConsensusFitment, listing ids)
+        self.retained = {}  # part_number -> fitment hashes of all its current groups
+
+    def __len__(self):
+        return len(self.pending)
+
+    def add(self, part_number: str, consensus_data: Dict, listings: List):
+        """Buffer one consensus group; listings may be instances or ids"""
+        fitment = ConsensusFitment(
+            part_number=part_number,
+            confidence_score=consensus_data['confidence_score'],
+            status=consensus_data['status'],
+            **{field: consensus_data[field] for field in STATISTIC_FIELDS},
+            **{field: consensus_data[field] for field in FITMENT_SIGNATURE_FIELDS}
+        )
+        fitment.fitment_hash = fitment.compute_fitment_hash()
+        listing_ids = [getattr(listing, 'pk', listing) for listing in listings]
+        if self.packed:
+            fitment.set_listing_ids(listing_ids)
+        self.pending[self._key(fitment)] = (fitment, listing_ids)
+
+    def retain(self, part_number: str, fitment_hashes: Iterable[int]):
+        """Declare every current group of part_number; flush() deletes its other groups"""
+        self.retained[part_number] = set(fitment_hashes)
+
+    def flush(self) -> int:
+        """Write all buffered rows; returns the number of consensus fitments written"""
+        if not self.pending and not self.retained:
+            return 0
+
+        pending, retained = self.pending, self.retained
+        self.pending, self.retained = {}, {}
+
+        # Read before the transaction, so it starts with a write (see ConflictDetector.write_conflicts)
+        self._keep_manual_statuses(pending)
+        stale = self._stale_ids(retained)
+        with transaction.atomic():
+            if pending:
+                self._write(pending)
+            if stale:
+                self._delete(stale)
+
+        return len(pending)
+
+    def _write(self, pending: Dict):
+        through = ConsensusFitment.supporting_raw_listings.through
+        part_numbers = sorted({key[0] for key in pending})
+
+        ConsensusFitment.objects.bulk_create(
+            [fitment for fitment, _ in pending.values()],
+            batch_size=self.chunk_size,
+            update_conflicts=True,
+            unique_fields=UNIQUE_FIELDS,
+            update_fields=[*UPDATE_FIELDS, 'listing_ids_packed'],
+        )
+
+        # bulk_create does not return ids for upserted rows; look them up
+        fitment_ids = {}
+        for chunk in self._chunks(part_numbers):
+            rows = (
+                ConsensusFitment.objects
+                .filter(part_number__in=chunk)
+                .order_by()
+                .values_list('id', *UNIQUE_FIELDS)
+            )
+            for fitment_id, *key in rows:
+                if tuple(key) in pending:
+                    fitment_ids[tuple(key)] = fitment_id
+
+        # Clear links written by the other storage mode too
+        ids = list(fitment_ids.values())
+        for chunk in self._chunks(ids):
+            through.objects.filter(consensusfitment_id__in=chunk).delete()
+
+        if not self.packed:
+            through.objects.bulk_create(
+                [
+                    through(consensusfitment_id=fitment_ids[key], rawlistingdata_id=listing_id)
+                    for key, (_, listing_ids) in pending.items()
+                    for listing_id in listing_ids
+                ],
+                batch_size=self.chunk_size,
+            )
+
+        logger.info(f"Wrote {len(pending)} consensus fitments for {len(part_numbers)} part numbers")
+
+    def _keep_manual_statuses(self, pending: Dict):
+        """Give buffered rows the status a reviewer set on the existing row, so the upsert keeps it"""
+        part_numbers = sorted({key[0] for key in pending})
+        for chunk in self._chunks(part_numbers):
+            rows = (
+                ConsensusFitment.objects
+                .filter(part_number__in=chunk, status__in=MANUAL_STATUSES)
+                .order_by()
+                .values_list('status', *UNIQUE_FIELDS)
+            )
+            for status, *key in rows:
+                if tuple(key) in pending:
+                    pending[tuple(key)][0].status = status
+
+    def _stale_ids(self, retained: Dict[str, set]) -> List[int]:
+        stale = []
+        for chunk in self._chunks(sorted(retained)):
+            rows = (
+                ConsensusFitment.objects
+                .filter(part_number__in=chunk)
+                .exclude(status__in=MANUAL_STATUSES)
+                .order_by()
+                .values_list('id', 'part_number', 'fitment_hash')
+            )
+            stale.extend(
+                fitment_id for fitment_id, part_number, fitment_hash in rows
+                if fitment_hash not in retained[part_number]
+            )
+        return stale
+
+    def _delete(self, fitment_ids: List[int]):
+        through = ConsensusFitment.supporting_raw_listings.through
+        for chunk in self._chunks(fitment_ids):
+            # The links go first with a plain DELETE; SQLite then already holds the
+            # write lock when delete() reads the rows it cascades to
+            through.objects.filter(consensusfitment_id__in=chunk).delete()
+            ConsensusFitment.objects.filter(id__in=chunk).delete()
+        logger.info(f"Deleted {len(fitment_ids)} consensus fitments whose groups no longer have listings")
+
+    def _chunks(self, items: List):
+        for start in range(0, len(items), self.chunk_size):
+            yield items[start:start + self.chunk_size]
+
+    @staticmethod
+    def _key(fitment: ConsensusFitment):
+        return tuple(getattr(fitment, field) for field in UNIQUE_FIELDS)
@@ -0,0 +1,212 @@
+"""Bulk ingestion of raw eBay listings into RawListingData
+
+ListingIngestor validates a batch of listing dicts without per-row ORM
+calls, drops duplicates of (source_ebay_item_id, fitment signature) first in
+memory and then against stored and archived listings (ArchivedListingKey),
+one lookup of each per 1000 item ids, inserts the rest with one
+statement (COPY into a temporary table on PostgreSQL, bulk_create elsewhere),
+and queues the touched part numbers for consensus. The partial unique
+constraint on (source_ebay_item_id, fitment_hash) is the final guard against
+concurrent ingestion of the same listing. The inserted part numbers are
+queued for the price index in the insert transaction; the queue is drained
+by the refresh_price_index command, never inside an ingest request.
+"""
+
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from django.db import connection, transaction
+from typing import Dict, Iterable, List
+import logging
+
+from .models import ArchivedListingKey, RawListingData
+from .consensus.incremental import mark_parts_dirty
+from .pricing import mark_prices_dirty
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_TEXT_FIELDS = ('part_number', 'vehicle_make', 'vehicle_model', 'source_ebay_item_id', 'listing_title')
+OPTIONAL_TEXT_FIELDS = ('vehicle_trim', 'vehicle_engine')
+FLAG_FIELDS = ('seller_is_business', 'is_verified_seller', 'has_oem_reference', 'has_detailed_description')
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'f', ''}
+
+MIN_VEHICLE_YEAR = 1900
+MAX_PRICE = Decimal('99999999.99')  # listing_price is DecimalField(max_digits=10, decimal_places=2)
+LOOKUP_BATCH_SIZE = 1000
+COPY_THRESHOLD = 500  # Below this many rows a plain bulk_create is cheaper than a temporary table
+MAX_REPORTED_ERRORS = 100
+
+
+class ListingValidationError(ValueError):
+    pass
+
+
+def _text(record: Dict, field: str, required: bool) -> str:
+    value = record.get(field)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise ListingValidationError(f"{field} is required")
+    max_length = RawListingData._meta.get_field(field).max_length
+    if max_length and len(value) > max_length:
+        raise ListingValidationError(f"{field} is longer than {max_length} characters")
+    return value
+
+
+def _flag(record: Dict, field: str) -> bool:
+    value = record.get(field, False)
+    if isinstance(value, bool) or value is None:
+        return bool(value)
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ListingValidationError(f"{field} must be a boolean")
+
+
+def _integer(record: Dict, field: str):
+    value = record.get(field)
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        raise ListingValidationError(f"{field} must be an integer")
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ListingValidationError(f"{field} must be an integer")
+    if number != value and str(number) != str(value).strip():
+        raise ListingValidationError(f"{field} must be an integer")
+    return number
+
+
+def _price(record: Dict):
+    value = record.get('listing_price')
+    if value is None or value == '':
+        return None
+    try:
+        price = Decimal(str(value)).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        raise ListingValidationError("listing_price must be a number")
+    if not price.is_finite() or price < 0 or price > MAX_PRICE:
+        raise ListingValidationError(f"listing_price must be between 0 and {MAX_PRICE}")
+    return price
+
+
+def clean_listing(record: Dict) -> RawListingData:
+    """Validate one listing dict and build an unsaved RawListingData (unknown keys are ignored)"""
+    if not isinstance(record, dict):
+        raise ListingValidationError("listing must be a JSON object")
+
+    year = _integer(record, 'vehicle_year')
+    max_year = datetime.now().year + 2
+    if year is None or not MIN_VEHICLE_YEAR <= year <= max_year:
+        raise ListingValidationError(f"vehicle_year must be between {MIN_VEHICLE_YEAR} and {max_year}")
+
+    listing = RawListingData(
+        vehicle_year=year,
+        seller_feedback_count=_integer(record, 'seller_feedback_count'),
+        listing_price=_price(record),
+        **{field: _text(record, field, required=True) for field in REQUIRED_TEXT_FIELDS},
+        **{field: _text(record, field, required=False) for field in OPTIONAL_TEXT_FIELDS},
+        **{field: _flag(record, field) for field in FLAG_FIELDS},
+    )
+    listing.fitment_hash = listing.compute_fitment_hash()
+    return listing
+
+
+class ListingIngestor:
+    """Validate, de-duplicate, insert and enqueue batches of raw listings"""
+
+    def __init__(self, copy_threshold: int = COPY_THRESHOLD):
+        self.copy_threshold = copy_threshold
+
+    def ingest(self, records: Iterable[Dict]) -> Dict:
+        """Ingest one batch; invalid records are reported and skipped, the rest are inserted.
+
+        Returns counts plus the first MAX_REPORTED_ERRORS errors as {'index', 'error'}.
+        """
+        listings = {}  # (source_ebay_item_id, fitment_hash) -> RawListingData
+        errors = []
+        received = duplicates = 0
+
+        for index, record in enumerate(records):
+            received += 1
+            try:
+                listing = clean_listing(record)
+            except ListingValidationError as e:
+                errors.append({'index': index, 'error': str(e)})
+                continue
+            key = (listing.source_ebay_item_id, listing.fitment_hash)
+            if key in listings:
+                duplicates += 1
+                continue
+            listings[key] = listing
+
+        existing = self.existing_keys(listings)
+        duplicates += len(existing)
+        new_listings = [listing for key, listing in listings.items() if key not in existing]
+
+        with transaction.atomic():
+            inserted_parts = self.insert(new_listings) if new_listings else []
+            queued = mark_parts_dirty(inserted_parts)
+            mark_prices_dirty(inserted_parts)
+        inserted = len(inserted_parts)
+        duplicates += len(new_listings) - inserted  # lost a race with a concurrent batch
+
+        logger.info(f"Ingested {inserted} of {received} raw listings ({duplicates} duplicates, {len(errors)} invalid)")
+        return {
+            'received': received,
+            'inserted': inserted,
+            'duplicates': duplicates,
+            'invalid': len(errors),
+            'part_numbers_queued': queued,
+            'errors': errors[:MAX_REPORTED_ERRORS],
+        }
+
+    def existing_keys(self, listings: Dict) -> set:
+        """Keys of listings already stored, hot or archived, two queries per LOOKUP_BATCH_SIZE item ids"""
+        item_ids = sorted({item_id for item_id, _ in listings})
+        existing = set()
+        for start in range(0, len(item_ids), LOOKUP_BATCH_SIZE):
+            batch = item_ids[start:start + LOOKUP_BATCH_SIZE]
+            for model in (RawListingData, ArchivedListingKey):
+                existing.update(
+                    model.objects
+                    .filter(source_ebay_item_id__in=batch)
+                    .order_by()
+                    .values_list('source_ebay_item_id', 'fitment_hash')
+                )
+        return existing & listings.keys()
+
+    def insert(self, listings: List[RawListingData]) -> List[str]:
+        """Insert listings, skipping unique conflicts; returns the part number of each inserted row"""
+        if connection.vendor == 'postgresql' and len(listings) >= self.copy_threshold:
+            return self.copy_insert(listings)
+
+        # bulk_create(ignore_conflicts=True) cannot report skipped rows, so a listing lost to a
+        # concurrent batch after the existing_keys() lookup is counted as inserted here
+        RawListingData.objects.bulk_create(listings, batch_size=LOOKUP_BATCH_SIZE, ignore_conflicts=True)
+        return [listing.part_number for listing in listings]
+
+    @transaction.atomic
+    def copy_insert(self, listings: List[RawListingData]) -> List[str]:
+        """COPY into a temporary table, then INSERT ... ON CONFLICT DO NOTHING RETURNING (PostgreSQL)"""
+        fields = [field for field in RawListingData._meta.concrete_fields if not field.primary_key]
+        quote = connection.ops.quote_name
+        table = quote(RawListingData._meta.db_table)
+        staging = quote('raw_listing_ingest')
+        columns = ', '.join(quote(field.column) for field in fields)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE {staging} ON COMMIT DROP AS SELECT {columns} FROM {table} WITH NO DATA"
+            )
+            with cursor.copy(f"COPY {staging} ({columns}) FROM STDIN") as copy:
+                for listing in listings:
+                    # pre_save fills auto_now_add extraction_date, as bulk_create would
+                    copy.write_row([field.pre_save(listing, True) for field in fields])
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging} "
+                f"ON CONFLICT DO NOTHING RETURNING {quote('part_number')}"
+            )
+            return [part_number for part_number, in cursor.fetchall()]
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.parts.models import raw_listing_hot_days
+from apps.parts.consensus.archive import archive_listings
+
+
+class Command(BaseCommand):
+    help = 'Fold raw listings older than the hot window into archived per-fitment statistics'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days',
+            type=int,
+            help=f'Archive listings extracted more than this many days ago '
+                 f'(default: RAW_LISTING_HOT_DAYS, currently {raw_listing_hot_days()})'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Part numbers archived per transaction (default: 500)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count the listings that would be archived without changing anything'
+        )
+
+    def handle(self, *args, **options):
+        days = options['older_than_days']
+        if days is not None and days < 1:
+            raise CommandError('--older-than-days must be at least 1')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('DRY RUN - no changes will be made'))
+
+        result = archive_listings(days, batch_size=options['batch_size'], dry_run=options['dry_run'])
+
+        self.stdout.write(f'  Cutoff: {result["cutoff"]}')
+        self.stdout.write(f'  Part numbers: {result["part_numbers"]:,}')
+        self.stdout.write(f'  Listings archived: {result["listings_archived"]:,}')
+        self.stdout.write(f'  Archive groups created: {result["groups_created"]:,}')
+        self.stdout.write(f'  Archive groups updated: {result["groups_updated"]:,}')
+        self.stdout.write(self.style.SUCCESS(f'Archive finished in {result["elapsed_seconds"]}s'))
@@ -0,0 +1,175 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from apps.parts.consensus.processor import FitmentConsensusProcessor, ENGINE_CHOICES
+from apps.parts.consensus.benchmark import (
+    ConsensusBenchmark, clear_dataset, clear_results, is_scratch_database, load_dataset
+)
+import json
+import subprocess
+import time
+
+SIZE_SUFFIXES = {'k': 1_000, 'm': 1_000_000}
+
+
+def parse_size(value):
+    """'10k' -> 10000, '1m' -> 1000000, '2500' -> 2500"""
+    value = value.strip().lower()
+    multiplier = SIZE_SUFFIXES.get(value[-1:], 1)
+    digits = value[:-1] if value[-1:] in SIZE_SUFFIXES else value
+    try:
+        return int(float(digits) * multiplier)
+    except ValueError:
+        raise CommandError(f'Invalid dataset size: {value}')
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the consensus pipeline phase by phase on synthetic raw listing datasets'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            nargs='+',
+            default=['10k'],
+            help='Dataset sizes to run, e.g. 10k 100k 1m (default: 10k)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed; the same seed always generates the same dataset (default: 0)'
+        )
+        parser.add_argument(
+            '--parts',
+            type=int,
+            help='Number of distinct part numbers (default: one per 20 listings)'
+        )
+        parser.add_argument(
+            '--conflict-rate',
+            type=float,
+            default=0.03,
+            help='Share of listings reporting a wrong vehicle (default: 0.03)'
+        )
+        parser.add_argument(
+            '--engine',
+            choices=[*ENGINE_CHOICES, 'both'],
+            default='both',
+            help='Consensus engine to benchmark (default: both)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Part numbers aggregated per query by the sql engine (default: 500)'
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the JSON results to this file instead of stdout'
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON results of an earlier run to compare listings/sec against'
+        )
+        parser.add_argument(
+            '--max-regression',
+            type=float,
+            default=10.0,
+            help='With --baseline: fail if throughput drops by more than this percentage (default: 10)'
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Leave the last benchmark dataset in the database'
+        )
+        parser.add_argument(
+            '--allow-live-db',
+            action='store_true',
+            help='Run even though the database is not named like a test or benchmark database'
+        )
+
+    def handle(self, *args, **options):
+        if not options['allow_live_db'] and not is_scratch_database():
+            raise CommandError(
+                'The benchmark inserts up to millions of BENCH- rows into RawListingData. '
+                'Point DATABASES at a test or benchmark database (name containing "test" or "bench"), '
+                'or pass --allow-live-db.'
+            )
+
+        engines = ENGINE_CHOICES if options['engine'] == 'both' else (options['engine'],)
+        sizes = [parse_size(size) for size in options['rows']]
+
+        results = {
+            'commit': current_commit(),
+            'started_at': timezone.now().isoformat(),
+            'seed': options['seed'],
+            'conflict_rate': options['conflict_rate'],
+            'batch_size': options['batch_size'],
+            'runs': [],
+        }
+
+        try:
+            for rows in sizes:
+                self.stderr.write(f'Generating {rows:,} listings (seed {options["seed"]})...')
+                clear_dataset()
+                started = time.perf_counter()
+                load_dataset(rows, options['seed'], options['parts'], options['conflict_rate'])
+                generate_seconds = round(time.perf_counter() - started, 4)
+
+                for engine in engines:
+                    clear_results()
+                    processor = FitmentConsensusProcessor(engine=engine, batch_size=options['batch_size'])
+                    run = ConsensusBenchmark(processor).run()
+                    run.update({'rows': rows, 'generate_seconds': generate_seconds})
+                    results['runs'].append(run)
+                    self.stderr.write(
+                        f'  {engine}: {run["elapsed_seconds"]}s, {run["listings_per_second"]:,} listings/sec '
+                        f'{run["phases"]}'
+                    )
+        finally:
+            if not options['keep']:
+                clear_dataset()
+
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                handle.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
+        else:
+            self.stdout.write(output)
+
+        if options['baseline']:
+            self.compare(results, options['baseline'], options['max_regression'])
+
+    def compare(self, results, baseline_path, max_regression):
+        """Compare listings/sec per (rows, engine) with a baseline run"""
+        with open(baseline_path, encoding='utf-8') as handle:
+            baseline = json.load(handle)
+        previous = {(run['rows'], run['engine']): run for run in baseline.get('runs', [])}
+
+        regressions = []
+        for run in results['runs']:
+            before = previous.get((run['rows'], run['engine']))
+            if not before or not before['listings_per_second']:
+                continue
+            change = (run['listings_per_second'] / before['listings_per_second'] - 1) * 100
+            self.stderr.write(
+                f'  {run["engine"]} {run["rows"]:,} rows: {before["listings_per_second"]:,} -> '
+                f'{run["listings_per_second"]:,} listings/sec ({change:+.1f}%)'
+            )
+            if change < -max_regression:
+                regressions.append(f'{run["engine"]} at {run["rows"]:,} rows ({change:+.1f}%)')
+
+        if regressions:
+            raise CommandError(
+                f'Throughput regressed by more than {max_regression}% against '
+                f'{baseline.get("commit") or baseline_path}: {", ".join(regressions)}'
+            )
+        self.stderr.write(self.style.SUCCESS('No throughput regression against the baseline'))
@@ -1,12 +1,12 @@
 from django.core.management.base import BaseCommand, CommandError
-from django.db import models
 from django.utils import timezone
-from apps.parts.models import RawListingData, ConsensusFitment, ConflictingFitment
-from decimal import Decimal
+from apps.parts.consensus.analysis import (
+    consensus_summary, conflict_summary, daily_trends, iter_part_distribution, percentage, raw_data_summary
+)
 import csv
 import json
 import os
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
@@ -82,6 +82,8 @@ class Command(BaseCommand):
             # Export data
             if options['export_csv']:
                 self.export_to_csv(analysis_data, options['output_dir'])
+                if options['part_coverage']:
+                    self.export_part_distribution(options['output_dir'])
             
             if options['export_json']:
                 self.export_to_json(analysis_data, options['output_dir'])
@@ -102,274 +104,61 @@ class Command(BaseCommand):
             }
         }
         
-        # Basic counts
+        # One aggregate query per section (see apps.parts.consensus.analysis)
         analysis['raw_data'] = self.analyze_raw_data(options)
         analysis['consensus_data'] = self.analyze_consensus_data(options)
         analysis['conflicts'] = self.analyze_conflicts(options)
-        analysis['coverage'] = self.analyze_coverage(options)
-        analysis['quality_metrics'] = self.calculate_quality_metrics(options)
+        analysis['coverage'] = self.analyze_coverage(analysis['raw_data'], analysis['consensus_data'])
+        analysis['quality_metrics'] = self.calculate_quality_metrics(analysis['raw_data'], analysis['consensus_data'])
         analysis['trends'] = self.analyze_trends(options['days_back'])
         
         return analysis
     
     def analyze_raw_data(self, options):
         """Analyze raw listing data"""
-        total_raw = RawListingData.objects.count()
-        
-        # Data quality indicators
-        verified_sellers = RawListingData.objects.filter(is_verified_seller=True).count()
-        business_sellers = RawListingData.objects.filter(seller_is_business=True).count()
-        has_oem_ref = RawListingData.objects.filter(has_oem_reference=True).count()
-        detailed_desc = RawListingData.objects.filter(has_detailed_description=True).count()
-        
-        # Recent data (last 30 days)
-        recent_cutoff = timezone.now() - timedelta(days=30)
-        recent_raw = RawListingData.objects.filter(extraction_date__gte=recent_cutoff).count()
-        
-        # Part number distribution
-        part_distribution = (
-            RawListingData.objects
-            .values('part_number')
-            .annotate(listing_count=models.Count('id'))
-            .order_by('-listing_count')
-        )
-        
-        # Calculate distribution stats
-        listing_counts = [item['listing_count'] for item in part_distribution]
-        
-        return {
-            'total_listings': total_raw,
-            'unique_part_numbers': part_distribution.count(),
-            'recent_listings_30_days': recent_raw,
-            'quality_indicators': {
-                'verified_sellers': verified_sellers,
-                'verified_sellers_percentage': (verified_sellers / total_raw * 100) if total_raw > 0 else 0,
-                'business_sellers': business_sellers,
-                'business_sellers_percentage': (business_sellers / total_raw * 100) if total_raw > 0 else 0,
-                'has_oem_reference': has_oem_ref,
-                'oem_reference_percentage': (has_oem_ref / total_raw * 100) if total_raw > 0 else 0,
-                'detailed_description': detailed_desc,
-                'detailed_desc_percentage': (detailed_desc / total_raw * 100) if total_raw > 0 else 0
-            },
-            'listing_distribution': {
-                'max_listings_per_part': max(listing_counts) if listing_counts else 0,
-                'min_listings_per_part': min(listing_counts) if listing_counts else 0,
-                'avg_listings_per_part': sum(listing_counts) / len(listing_counts) if listing_counts else 0,
-                'parts_with_single_listing': sum(1 for count in listing_counts if count == 1),
-                'parts_with_multiple_listings': sum(1 for count in listing_counts if count > 1)
-            }
-        }
+        return raw_data_summary(options['min_listings'])
     
     def analyze_consensus_data(self, options):
         """Analyze consensus fitment data"""
-        total_consensus = ConsensusFitment.objects.count()
-        
-        # Status distribution
-        status_counts = {}
-        for status_choice in ConsensusFitment.STATUS_CHOICES:
-            status = status_choice[0]
-            count = ConsensusFitment.objects.filter(status=status).count()
-            status_counts[status] = {
-                'count': count,
-                'percentage': (count / total_consensus * 100) if total_consensus > 0 else 0,
-                'description': status_choice[1]
-            }
-        
-        # Confidence score distribution
-        confidence_ranges = [
-            ('90-100', 90, 100),
-            ('80-89', 80, 89),
-            ('70-79', 70, 79),
-            ('60-69', 60, 69),
-            ('50-59', 50, 59),
-            ('40-49', 40, 49),
-            ('30-39', 30, 39),
-            ('20-29', 20, 29),
-            ('0-19', 0, 19)
-        ]
-        
-        confidence_distribution = {}
-        for range_name, min_conf, max_conf in confidence_ranges:
-            count = ConsensusFitment.objects.filter(
-                confidence_score__gte=min_conf,
-                confidence_score__lte=max_conf
-            ).count()
-            confidence_distribution[range_name] = {
-                'count': count,
-                'percentage': (count / total_consensus * 100) if total_consensus > 0 else 0
-            }
-        
-        # Supporting listings analysis
-        support_stats = ConsensusFitment.objects.aggregate(
-            avg_supporting_listings=models.Avg('supporting_listings_count'),
-            max_supporting_listings=models.Max('supporting_listings_count'),
-            min_supporting_listings=models.Min('supporting_listings_count')
-        )
-        
-        # Production readiness
-        production_ready = ConsensusFitment.objects.filter(
-            models.Q(status='HIGH_CONFIDENCE') | models.Q(status='VERIFIED'),
-            confidence_score__gte=80
-        ).count()
-        
-        return {
-            'total_consensus_fitments': total_consensus,
-            'status_distribution': status_counts,
-            'confidence_distribution': confidence_distribution,
-            'supporting_listings_stats': support_stats,
-            'production_ready': {
-                'count': production_ready,
-                'percentage': (production_ready / total_consensus * 100) if total_consensus > 0 else 0
-            }
-        }
+        return consensus_summary()
     
     def analyze_conflicts(self, options):
         """Analyze conflict data"""
-        total_conflicts = ConflictingFitment.objects.count()
-        pending_conflicts = ConflictingFitment.objects.filter(resolution_status='PENDING').count()
-        resolved_conflicts = ConflictingFitment.objects.filter(resolution_status='RESOLVED').count()
-        dismissed_conflicts = ConflictingFitment.objects.filter(resolution_status='DISMISSED').count()
-        
-        # Age analysis
-        current_time = timezone.now()
-        age_ranges = [
-            ('0-7 days', 0, 7),
-            ('8-30 days', 8, 30),
-            ('31-90 days', 31, 90),
-            ('90+ days', 91, 999999)
-        ]
-        
-        age_distribution = {}
-        for range_name, min_days, max_days in age_ranges:
-            min_date = current_time - timedelta(days=max_days)
-            max_date = current_time - timedelta(days=min_days)
-            
-            count = ConflictingFitment.objects.filter(
-                created_date__gte=min_date,
-                created_date__lte=max_date,
-                resolution_status='PENDING'
-            ).count()
-            
-            age_distribution[range_name] = count
-        
-        # Resolution rate
-        total_resolved = resolved_conflicts + dismissed_conflicts
-        resolution_rate = (total_resolved / total_conflicts * 100) if total_conflicts > 0 else 0
-        
-        return {
-            'total_conflicts': total_conflicts,
-            'pending_conflicts': pending_conflicts,
-            'resolved_conflicts': resolved_conflicts,
-            'dismissed_conflicts': dismissed_conflicts,
-            'resolution_rate_percentage': resolution_rate,
-            'pending_age_distribution': age_distribution
-        }
+        return conflict_summary()
     
-    def analyze_coverage(self, options):
+    def analyze_coverage(self, raw, consensus):
         """Analyze data coverage and processing rates"""
-        total_raw_parts = RawListingData.objects.values('part_number').distinct().count()
-        consensus_parts = ConsensusFitment.objects.values('part_number').distinct().count()
-        
-        # Parts with sufficient data for processing
-        eligible_parts = (
-            RawListingData.objects
-            .values('part_number')
-            .annotate(listing_count=models.Count('id'))
-            .filter(listing_count__gte=options['min_listings'])
-            .count()
-        )
-        
-        # Processing coverage
-        processing_rate = (consensus_parts / eligible_parts * 100) if eligible_parts > 0 else 0
-        overall_coverage = (consensus_parts / total_raw_parts * 100) if total_raw_parts > 0 else 0
+        total_raw_parts = raw['unique_part_numbers']
+        consensus_parts = consensus['processed_part_numbers']
+        eligible_parts = raw['eligible_part_numbers']
         
         return {
             'total_raw_part_numbers': total_raw_parts,
             'processed_part_numbers': consensus_parts,
             'eligible_for_processing': eligible_parts,
-            'processing_rate_percentage': processing_rate,
-            'overall_coverage_percentage': overall_coverage,
+            'processing_rate_percentage': percentage(consensus_parts, eligible_parts),
+            'overall_coverage_percentage': percentage(consensus_parts, total_raw_parts),
             'unprocessed_parts': eligible_parts - consensus_parts
         }
     
-    def calculate_quality_metrics(self, options):
+    def calculate_quality_metrics(self, raw, consensus):
         """Calculate overall quality metrics"""
-        total_raw = RawListingData.objects.count()
-        total_consensus = ConsensusFitment.objects.count()
-        
-        # Data efficiency
-        data_efficiency = (total_consensus / total_raw * 100) if total_raw > 0 else 0
-        
-        # Average confidence score
-        avg_confidence = ConsensusFitment.objects.aggregate(
-            avg_confidence=models.Avg('confidence_score')
-        )['avg_confidence'] or 0
-        
-        # High quality percentage
-        high_quality = ConsensusFitment.objects.filter(confidence_score__gte=80).count()
-        high_quality_percentage = (high_quality / total_consensus * 100) if total_consensus > 0 else 0
-        
-        # Average weight per listing
-        total_weight = sum(listing.calculate_quality_weight() for listing in RawListingData.objects.all())
-        avg_weight = total_weight / total_raw if total_raw > 0 else 0
-        
         return {
-            'data_efficiency_percentage': data_efficiency,
-            'average_confidence_score': float(avg_confidence),
-            'high_quality_percentage': high_quality_percentage,
-            'average_listing_weight': float(avg_weight)
+            'data_efficiency_percentage': percentage(consensus['total_consensus_fitments'], raw['total_listings']),
+            'average_confidence_score': consensus['average_confidence_score'],
+            'high_quality_percentage': consensus['high_quality_percentage'],
+            'average_listing_weight': raw['average_listing_weight']
         }
     
     def analyze_trends(self, days_back):
-        """Analyze quality trends over time"""
-        try:
-            end_date = timezone.now()
-            start_date = end_date - timedelta(days=days_back)
-            
-            # Daily trends
-            daily_trends = []
-            for i in range(days_back):
-                day_start = start_date + timedelta(days=i)
-                day_end = day_start + timedelta(days=1)
-                
-                try:
-                    raw_count = RawListingData.objects.filter(
-                        extraction_date__gte=day_start,
-                        extraction_date__lt=day_end
-                    ).count()
-                    
-                    consensus_count = ConsensusFitment.objects.filter(
-                        last_updated__gte=day_start,
-                        last_updated__lt=day_end
-                    ).count()
-                    
-                    daily_trends.append({
-                        'date': day_start.strftime('%Y-%m-%d'),
-                        'raw_listings': raw_count,
-                        'consensus_fitments': consensus_count
-                    })
-                except Exception as e:
-                    # Skip days with invalid dates
-                    daily_trends.append({
-                        'date': day_start.strftime('%Y-%m-%d'),
-                        'raw_listings': 0,
-                        'consensus_fitments': 0
-                    })
-            
-            return {
-                'daily_trends': daily_trends,
-                'trend_period_days': days_back,
-                'total_raw_in_period': sum(day['raw_listings'] for day in daily_trends),
-                'total_consensus_in_period': sum(day['consensus_fitments'] for day in daily_trends)
-            }
-        except Exception as e:
-            # Return empty trends if there's an error
-            return {
-                'daily_trends': [],
-                'trend_period_days': days_back,
-                'total_raw_in_period': 0,
-                'total_consensus_in_period': 0
-            }
+        """Analyze quality trends over time (one day-bucketed query per table)"""
+        trends = daily_trends(days_back)
+        return {
+            'daily_trends': trends,
+            'trend_period_days': days_back,
+            'total_raw_in_period': sum(day['raw_listings'] for day in trends),
+            'total_consensus_in_period': sum(day['consensus_fitments'] for day in trends)
+        }
     
     def display_analysis_summary(self, analysis):
         """Display summary analysis to console"""
@@ -447,6 +236,14 @@ class Command(BaseCommand):
         self.stdout.write(f'  Parts with Multiple Listings: {raw["listing_distribution"]["parts_with_multiple_listings"]:,}')
         self.stdout.write(f'  Average Listings per Part: {raw["listing_distribution"]["avg_listings_per_part"]:.1f}')
         self.stdout.write(f'  Max Listings for One Part: {raw["listing_distribution"]["max_listings_per_part"]:,}')
+        
+        percentiles = raw['listing_distribution']['percentiles']
+        self.stdout.write('  Listings per Part Percentiles: ' + ', '.join(
+            f'{name}={value}' for name, value in percentiles.items() if value is not None
+        ))
+        self.stdout.write('  Listings per Part Histogram:')
+        for bucket, part_count in raw['listing_distribution']['histogram'].items():
+            self.stdout.write(f'    {bucket}: {part_count:,}')
     
     def display_quality_trends(self, analysis, days_back):
         """Display quality trends"""
@@ -512,6 +309,20 @@ class Command(BaseCommand):
             self.style.SUCCESS(f'CSV reports exported to {output_dir}/')
         )
     
+    def export_part_distribution(self, output_dir):
+        """Stream listings per part number straight from the database cursor to CSV"""
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        distribution_file = os.path.join(output_dir, f'part_distribution_{timestamp}.csv')
+        
+        with open(distribution_file, 'w', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(['Part Number', 'Listings'])
+            writer.writerows(iter_part_distribution())
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'Part distribution exported: {distribution_file}')
+        )
+    
     def export_to_json(self, analysis, output_dir):
         """Export analysis to JSON file"""
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -0,0 +1,112 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from apps.parts.models import ConsensusFitment, ConflictingFitment, RawListingData
+from collections import defaultdict
+import logging
+
+logger = logging.getLogger(__name__)
+
+MODELS = {
+    'consensus': ConsensusFitment,
+    'conflicts': ConflictingFitment,
+}
+
+
+class Command(BaseCommand):
+    help = 'Convert listing links between M2M through rows and packed id storage'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--unpack',
+            action='store_true',
+            help='Move packed listing ids back into through rows'
+        )
+        parser.add_argument(
+            '--model',
+            choices=sorted(MODELS),
+            help='Only convert one model (default: both)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows converted per transaction (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        names = [options['model']] if options['model'] else sorted(MODELS)
+        for name in names:
+            model = MODELS[name]
+            if options['unpack']:
+                converted = self.unpack(model, options['batch_size'])
+            else:
+                converted = self.pack(model, options['batch_size'])
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{'Unpacked' if options['unpack'] else 'Packed'} {converted} {model.__name__} rows"
+                )
+            )
+
+    def link_columns(self, model):
+        field = model._meta.get_field(model.listing_relation)
+        through = field.remote_field.through
+        return through, field.m2m_column_name(), field.m2m_reverse_name()
+
+    def pack(self, model, batch_size):
+        """Store each row's through-row listing ids on the row and drop the through rows"""
+        through, owner_column, listing_column = self.link_columns(model)
+        ids = list(model.objects.filter(listing_ids_packed__isnull=True).order_by('id').values_list('id', flat=True))
+
+        for start in range(0, len(ids), batch_size):
+            chunk = ids[start:start + batch_size]
+            listing_ids = defaultdict(list)
+            links = through.objects.filter(**{f'{owner_column}__in': chunk}).values_list(owner_column, listing_column)
+            for owner_id, listing_id in links:
+                listing_ids[owner_id].append(listing_id)
+
+            rows = [model(id=owner_id) for owner_id in chunk]
+            for row in rows:
+                row.set_listing_ids(listing_ids[row.id])
+
+            with transaction.atomic():
+                model.objects.bulk_update(rows, ['listing_ids_packed'])
+                through.objects.filter(**{f'{owner_column}__in': chunk}).delete()
+            logger.info(f"Packed {start + len(chunk)} of {len(ids)} {model.__name__} rows")
+
+        return len(ids)
+
+    def unpack(self, model, batch_size):
+        """Recreate through rows from packed listing ids and clear the packed column.
+
+        Ids of listings that no longer exist (e.g. archived) are dropped
+        instead of becoming dangling through rows.
+        """
+        through, owner_column, listing_column = self.link_columns(model)
+        ids = list(model.objects.filter(listing_ids_packed__isnull=False).order_by('id').values_list('id', flat=True))
+
+        for start in range(0, len(ids), batch_size):
+            rows = list(model.objects.filter(id__in=ids[start:start + batch_size]).only('id', 'listing_ids_packed'))
+            listing_ids = {row.id: row.get_listing_ids() for row in rows}
+            linked = sorted({listing_id for row_ids in listing_ids.values() for listing_id in row_ids})
+            existing = set()
+            for offset in range(0, len(linked), batch_size):
+                existing.update(
+                    RawListingData.objects
+                    .filter(id__in=linked[offset:offset + batch_size])
+                    .values_list('id', flat=True)
+                )
+            links = [
+                through(**{owner_column: row.id, listing_column: listing_id})
+                for row in rows
+                for listing_id in listing_ids[row.id]
+                if listing_id in existing
+            ]
+            for row in rows:
+                row.listing_ids_packed = None
+
+            with transaction.atomic():
+                through.objects.bulk_create(links, batch_size=batch_size, ignore_conflicts=True)
+                model.objects.bulk_update(rows, ['listing_ids_packed'])
+            logger.info(f"Unpacked {start + len(rows)} of {len(ids)} {model.__name__} rows")
+
+        return len(ids)
@@ -1,7 +1,8 @@
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 from apps.parts.models import RawListingData, ConsensusFitment, ConflictingFitment
-from apps.parts.consensus.processor import FitmentConsensusProcessor
+from apps.parts.consensus.processor import FitmentConsensusProcessor, ENGINE_CHOICES, ENGINE_PYTHON
+from apps.parts.consensus.incremental import LEASE_SECONDS, drain_queue, enqueue_all_parts, process_dirty_parts
 import logging
 
 logger = logging.getLogger(__name__)
@@ -23,7 +24,23 @@ class Command(BaseCommand):
         parser.add_argument(
             '--new-data-only',
             action='store_true',
-            help='Process only parts with new raw data since last update'
+            help='Process only queued parts whose raw listing inputs changed since the last run'
+        )
+        parser.add_argument(
+            '--drain-queue',
+            action='store_true',
+            help='Lease queued parts in small claims until the queue is empty; safe to run on several hosts at once'
+        )
+        parser.add_argument(
+            '--claim-size',
+            type=int,
+            help='With --drain-queue: part numbers leased per claim (default: --batch-size)'
+        )
+        parser.add_argument(
+            '--lease-seconds',
+            type=int,
+            default=LEASE_SECONDS,
+            help=f'Seconds before an unreleased lease can be claimed by another worker (default: {LEASE_SECONDS})'
         )
         parser.add_argument(
             '--min-listings', 
@@ -46,16 +63,76 @@ class Command(BaseCommand):
             action='store_true', 
             help='Only show current processing statistics'
         )
+        parser.add_argument(
+            '--engine',
+            choices=ENGINE_CHOICES,
+            default=ENGINE_PYTHON,
+            help='Consensus engine: python (per-listing) or sql (GROUP BY aggregation) (default: python)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Part numbers aggregated per query by the sql engine (default: 500)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Worker processes for --all/--new-data-only/--drain-queue, each with its own DB connection (default: 1)'
+        )
+        parser.add_argument(
+            '--enqueue-all',
+            action='store_true',
+            help='With --new-data-only/--drain-queue: queue every part number first (full incremental refresh)'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='With --new-data-only: process at most N queued part numbers, oldest first '
+                 '(with --drain-queue: per worker)'
+        )
+        parser.add_argument(
+            '--rescore',
+            action='store_true',
+            help='Recompute confidence and status of all consensus fitments from their stored statistics'
+        )
+        parser.add_argument(
+            '--base-confidence',
+            type=int,
+            help='Override the base confidence percentage (default: 20)'
+        )
+        parser.add_argument(
+            '--max-weight-bonus',
+            type=int,
+            help='Override the maximum weight bonus percentage (default: 40)'
+        )
+        parser.add_argument(
+            '--status-thresholds',
+            type=int,
+            nargs=3,
+            metavar=('LOW', 'MEDIUM', 'HIGH'),
+            help='Override the minimum confidence for LOW, MEDIUM and HIGH status (default: 40 60 80)'
+        )
     
     def handle(self, *args, **options):
         if options['verbose']:
             logging.basicConfig(level=logging.INFO)
         
-        processor = FitmentConsensusProcessor()
+        processor = FitmentConsensusProcessor(
+            engine=options['engine'],
+            batch_size=options['batch_size']
+        )
+        if options['base_confidence'] is not None:
+            processor.base_confidence = options['base_confidence']
+        if options['max_weight_bonus'] is not None:
+            processor.max_weight_bonus = options['max_weight_bonus']
+        if options['status_thresholds']:
+            processor.status_thresholds = tuple(options['status_thresholds'])
         
         # Show stats only
         if options['stats_only']:
-            self.show_stats(processor)
+            self.show_stats(processor, refresh=True)
             return
         
         # Dry run information
@@ -65,15 +142,19 @@ class Command(BaseCommand):
             )
         
         try:
-            if options['part_number']:
+            if options['rescore']:
+                self.rescore(processor, options)
+            elif options['part_number']:
                 self.process_single_part(processor, options['part_number'], options)
             elif options['all']:
                 self.process_all_parts(processor, options)
+            elif options['drain_queue']:
+                self.drain_queue(processor, options)
             elif options['new_data_only']:
                 self.process_new_data_only(processor, options)
             else:
                 self.stdout.write(
-                    self.style.ERROR('Must specify --part-number, --all, or --new-data-only')
+                    self.style.ERROR('Must specify --part-number, --all, --new-data-only, --drain-queue or --rescore')
                 )
                 return
                 
@@ -87,6 +168,26 @@ class Command(BaseCommand):
             )
             raise CommandError(f'Processing failed: {e}')
     
+    def rescore(self, processor, options):
+        """Apply the current scoring parameters to every consensus fitment in SQL"""
+        self.stdout.write(
+            f'Re-scoring with base confidence {processor.base_confidence}%, '
+            f'max weight bonus {processor.max_weight_bonus}%, '
+            f'thresholds {"/".join(str(t) for t in processor.status_thresholds)}'
+        )
+        
+        if options['dry_run']:
+            self.stdout.write(f'Would re-score {ConsensusFitment.objects.count():,} consensus fitments')
+            return
+        
+        result = processor.rescore_consensus()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Re-scored {result["rescored"]:,} consensus fitments in {result["elapsed_seconds"]}s'
+            )
+        )
+        self.show_stats(processor)
+    
     def process_single_part(self, processor, part_number, options):
         """Process a single part number"""
         self.stdout.write(f'Processing part number: {part_number}')
@@ -152,7 +253,7 @@ class Command(BaseCommand):
         # Process all candidates
         self.stdout.write('Starting batch processing...')
         
-        result = processor.process_all_new_data(min_listings)
+        result = processor.process_all_new_data(min_listings, workers=options['workers'])
         
         # Show summary
         self.stdout.write(
@@ -160,7 +261,9 @@ class Command(BaseCommand):
                 f'Batch processing complete:\n'
                 f'  Parts processed: {result["total_parts_processed"]}\n'
                 f'  Fitments created/updated: {result["total_fitments_processed"]}\n'
-                f'  Conflicts identified: {result["total_conflicts_identified"]}'
+                f'  Conflicts identified: {result["total_conflicts_identified"]}\n'
+                f'  Throughput: {result["parts_per_second"]} parts/sec '
+                f'({result["elapsed_seconds"]}s, {options["workers"]} worker(s))'
             )
         )
         
@@ -169,86 +272,100 @@ class Command(BaseCommand):
     
     def process_new_data_only(self, processor, options):
         """Process only parts with new raw data since last consensus update"""
-        min_listings = options['min_listings']
-        
-        # Find parts with raw data newer than their last consensus update
-        from django.db import models
-        from django.db.models import Max, Count
-        
-        # Get parts with recent raw data
-        recent_raw_parts = (
-            RawListingData.objects
-            .values('part_number')
-            .annotate(
-                listing_count=Count('id'),
-                latest_raw=Max('extraction_date')
-            )
-            .filter(listing_count__gte=min_listings)
+        processor.min_listings_required = options['min_listings']
+        
+        if options['enqueue_all']:
+            queued = enqueue_all_parts()
+            self.stdout.write(f'Queued {queued} part numbers for processing')
+        
+        # Dirty parts are queued by raw listing writes; unchanged inputs are skipped
+        result = process_dirty_parts(
+            processor,
+            workers=options['workers'],
+            limit=options['limit'],
+            dry_run=options['dry_run'],
+            lease_seconds=options['lease_seconds']
         )
+        changed = result['changed_parts']
         
-        # Find which parts need updating
-        candidates = []
-        for part_data in recent_raw_parts:
-            part_number = part_data['part_number']
-            latest_raw = part_data['latest_raw']
-            
-            # Check if consensus data exists and when it was last updated
-            latest_consensus = (
-                ConsensusFitment.objects
-                .filter(part_number=part_number)
-                .aggregate(latest_update=Max('last_updated'))
-            )['latest_update']
-            
-            # Include if no consensus exists or raw data is newer
-            if not latest_consensus or latest_raw > latest_consensus:
-                candidates.append(part_number)
-        
-        total_candidates = len(candidates)
-        self.stdout.write(f'Found {total_candidates} part numbers with new data to process')
-        
-        if total_candidates == 0:
-            self.stdout.write(
-                self.style.WARNING('No parts found with new data requiring processing')
-            )
-            return
+        self.stdout.write(
+            f'Found {result["dirty_parts"]} queued part numbers: '
+            f'{len(changed)} with changed inputs, {result["unchanged_parts"]} unchanged'
+        )
         
         if options['dry_run']:
             self.stdout.write('\nParts that would be processed:')
-            for part_number in candidates[:10]:  # Show first 10
+            for part_number in changed[:10]:  # Show first 10
                 self.stdout.write(f'  {part_number}')
-            if total_candidates > 10:
-                self.stdout.write(f'  ... and {total_candidates - 10} more')
+            if len(changed) > 10:
+                self.stdout.write(f'  ... and {len(changed) - 10} more')
             return
         
-        # Process candidates
-        self.stdout.write('Starting new data processing...')
-        
-        processed = 0
-        total_conflicts = 0
-        
-        for part_number in candidates:
-            try:
-                result = processor.process_part_number(part_number)
-                processed += result.get('processed', 0)
-                total_conflicts += result.get('conflicts', 0)
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(f'Error processing {part_number}: {e}')
-                )
+        if not changed:
+            self.stdout.write(
+                self.style.WARNING('No parts found with new data requiring processing')
+            )
+            return
         
         # Show summary
         self.stdout.write(
             self.style.SUCCESS(
                 f'New data processing complete:\n'
-                f'  Parts with new data: {total_candidates}\n'
-                f'  Fitments processed: {processed}\n'
-                f'  Conflicts identified: {total_conflicts}'
+                f'  Parts with new data: {len(changed)}\n'
+                f'  Fitments processed: {result["processed"]}\n'
+                f'  Conflicts identified: {result["conflicts"]}\n'
+                f'  Throughput: {result["parts_per_second"]} parts/sec '
+                f'({result["elapsed_seconds"]}s, {options["workers"]} worker(s))'
             )
         )
+        if result['failed']:
+            self.stdout.write(
+                self.style.WARNING(f'{len(result["failed"])} part numbers failed and stay queued for the next run')
+            )
         
         # Show updated stats
         self.show_stats(processor)
     
+    def drain_queue(self, processor, options):
+        """Process queued parts under row leases until the queue is empty"""
+        processor.min_listings_required = options['min_listings']
+        
+        if options['enqueue_all']:
+            queued = enqueue_all_parts()
+            self.stdout.write(f'Queued {queued} part numbers for processing')
+        
+        if options['dry_run']:
+            self.stdout.write('Dry run: use --new-data-only --dry-run to list queued part numbers')
+            return
+        
+        drain_options = {
+            'claim_size': options['claim_size'],
+            'lease_seconds': options['lease_seconds'],
+            'max_parts': options['limit'],
+        }
+        if options['workers'] > 1:
+            from apps.parts.consensus.parallel import drain_in_parallel
+            result = drain_in_parallel(processor, options['workers'], **drain_options)
+        else:
+            result = drain_queue(processor, **drain_options)
+        
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Queue drained:\n'
+                f'  Parts claimed: {result["claimed"]} ({result["changed"]} with changed inputs)\n'
+                f'  Fitments processed: {result["processed"]}\n'
+                f'  Conflicts identified: {result["conflicts"]}\n'
+                f'  Worker(s): {options["workers"]}'
+            )
+        )
+        if result['failed']:
+            self.stdout.write(
+                self.style.WARNING(f'{result["failed"]} part numbers failed and stay queued until their lease expires')
+            )
+        
+        if result['changed']:
+            self.show_stats(processor)
+    
     def show_dry_run_info(self, part_number, raw_count, min_listings):
         """Show what would happen for a single part in dry run mode"""
         from collections import defaultdict
@@ -258,8 +375,7 @@ class Command(BaseCommand):
         # Group by fitment signature
         fitment_groups = defaultdict(list)
         for listing in raw_listings:
-            signature = listing.get_fitment_signature()
-            fitment_groups[signature].append(listing)
+            fitment_groups[listing.fitment_hash].append(listing)
         
         self.stdout.write(f'\nDry run analysis for {part_number}:')
         self.stdout.write(f'  Raw listings: {raw_count}')
@@ -271,8 +387,8 @@ class Command(BaseCommand):
             )
             return
         
-        for signature, listings in fitment_groups.items():
-            year, make, model, trim, engine = signature.split('|')
+        for listings in fitment_groups.values():
+            year, make, model = listings[0].vehicle_year, listings[0].vehicle_make, listings[0].vehicle_model
             listing_count = len(listings)
             total_weight = sum(listing.calculate_quality_weight() for listing in listings)
             
@@ -297,13 +413,14 @@ class Command(BaseCommand):
         for range_key, part_count in sorted(distribution.items()):
             self.stdout.write(f'    {range_key} listings: {part_count} parts')
     
-    def show_stats(self, processor):
+    def show_stats(self, processor, refresh=False):
         """Show current processing statistics"""
-        stats = processor.get_processing_stats()
+        stats = processor.get_processing_stats(refresh=refresh)
         
         self.stdout.write('\n' + '='*50)
         self.stdout.write('CONSENSUS PROCESSING STATISTICS')
         self.stdout.write('='*50)
+        self.stdout.write(f'Snapshot computed at: {stats["computed_at"]}')
         
         # Raw data stats
         self.stdout.write(f'Raw Listings: {stats["raw_listings_total"]:,}')
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from apps.parts.consensus.promotion import ConsensusPromoter, PROMOTABLE_STATUSES, last_promotion_started
+
+
+class Command(BaseCommand):
+    help = 'Promote HIGH_CONFIDENCE and VERIFIED consensus fitments into catalog Fitment rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Examine every promotable consensus fitment, not only those updated since the last run'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Consensus fitments resolved and inserted per batch (default: 2000)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Resolve and count without creating fitments, issues or a run record'
+        )
+
+    def handle(self, *args, **options):
+        since = None if options['full'] else last_promotion_started()
+        scope = f'updated since {since:%Y-%m-%d %H:%M:%S}' if since else 'all'
+        self.stdout.write(f'Promoting {scope} {"/".join(PROMOTABLE_STATUSES)} consensus fitments...')
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('DRY RUN - no changes will be made'))
+
+        promoter = ConsensusPromoter(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        stats = promoter.run(full=options['full'])
+
+        self.stdout.write(f'  Examined: {stats["examined"]:,}')
+        self.stdout.write(f'  Matched: {stats["matched"]:,}')
+        self.stdout.write(f'  Fitments created: {stats["fitments_created"]:,}')
+        self.stdout.write(f'  Fitments already present: {stats["fitments_existing"]:,}')
+        self.stdout.write(f'  Unmatched (recorded for review): {stats["unmatched"]:,}')
+        for key, value in sorted(stats.items()):
+            if key.startswith('issues_'):
+                self.stdout.write(f'    {key[len("issues_"):].upper()}: {value:,}')
+
+        self.stdout.write(self.style.SUCCESS(f'Promotion finished in {stats["elapsed_seconds"]}s'))
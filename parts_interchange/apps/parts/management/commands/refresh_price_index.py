@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from apps.parts.pricing import refresh_price_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-part price index for part numbers with queued listing changes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recompute every part number (archived listing prices are kept)'
+        )
+        parser.add_argument(
+            '--no-wait',
+            action='store_true',
+            help='Exit instead of waiting when another refresh is running'
+        )
+
+    def handle(self, *args, **options):
+        result = refresh_price_rollups(rebuild=options['rebuild'], wait=not options['no_wait'])
+
+        if result['skipped']:
+            self.stdout.write(self.style.WARNING('Another price index refresh is running; queued parts left for it'))
+        self.stdout.write(f'  Part numbers recomputed: {result["part_numbers"]:,}')
+        self.stdout.write(f'  Listings indexed: {result["listings_indexed"]:,}')
+        self.stdout.write(f'  Rollups written: {result["rollups_written"]:,}')
+        self.stdout.write(f'  Rollups deleted: {result["rollups_deleted"]:,}')
+        self.stdout.write(self.style.SUCCESS(f'Price index refreshed in {result["elapsed_seconds"]}s'))
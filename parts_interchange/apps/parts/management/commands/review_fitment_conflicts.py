@@ -1,5 +1,4 @@
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction
 from django.utils import timezone
 from django.db.models import Count, Q
 from apps.parts.models import ConflictingFitment, RawListingData, ConsensusFitment
@@ -31,6 +30,17 @@ class Command(BaseCommand):
             action='store_true',
             help='Attempt automatic resolution of simple conflicts'
         )
+        parser.add_argument(
+            '--detect',
+            action='store_true',
+            help='Run batch conflict detection over all part numbers (or --part-number)'
+        )
+        parser.add_argument(
+            '--min-listings',
+            type=int,
+            default=2,
+            help='Minimum listings for a part number to be checked by --detect (default: 2)'
+        )
         parser.add_argument(
             '--part-number',
             help='Review conflicts for specific part number'
@@ -46,6 +56,12 @@ class Command(BaseCommand):
             default=50,
             help='Limit number of conflicts to review (default: 50)'
         )
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=500,
+            help='Conflicts analyzed per batch by --auto-resolve (default: 500)'
+        )
         parser.add_argument(
             '--verbose',
             action='store_true',
@@ -57,7 +73,9 @@ class Command(BaseCommand):
             logging.basicConfig(level=logging.INFO)
         
         try:
-            if options['generate_report']:
+            if options['detect']:
+                self.detect_conflicts(options)
+            elif options['generate_report']:
                 self.generate_conflict_report(options)
             elif options['auto_resolve']:
                 self.auto_resolve_conflicts(options)
@@ -74,6 +92,21 @@ class Command(BaseCommand):
             )
             raise CommandError(f'Conflict review failed: {e}')
     
+    def detect_conflicts(self, options):
+        """Flag conflicting part numbers with the batch conflict rules"""
+        from apps.parts.consensus.conflicts import ConflictDetector
+        
+        part_numbers = [options['part_number']] if options['part_number'] else None
+        detector = ConflictDetector(min_listings=options['min_listings'])
+        result = detector.detect(part_numbers)
+        
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Flagged {result['parts_flagged']} part numbers "
+                f"({result['conflicts']} conflicts), created {result['records_created']} new conflict records"
+            )
+        )
+    
     def review_conflicts(self, options):
         """Review conflicts based on filters"""
         conflicts = self.get_filtered_conflicts(options)
@@ -151,14 +184,14 @@ class Command(BaseCommand):
         self.stdout.write(f'Conflict: {conflict.conflict_description}')
         self.stdout.write(f'Created: {conflict.created_date.strftime("%Y-%m-%d %H:%M")}')
         self.stdout.write(f'Status: {conflict.resolution_status}')
-        self.stdout.write(f'Conflicting Listings: {conflict.conflicting_listings.count()}')
+        self.stdout.write(f'Conflicting Listings: {conflict.get_listing_count()}')
         
         if conflict.resolution_notes:
             self.stdout.write(f'Notes: {conflict.resolution_notes}')
     
     def display_conflicting_listings(self, conflict):
         """Display details of conflicting listings"""
-        listings = conflict.conflicting_listings.all()
+        listings = conflict.get_listings()
         
         self.stdout.write('\nConflicting Listings:')
         for listing in listings:
@@ -170,84 +203,25 @@ class Command(BaseCommand):
     
     def auto_resolve_conflicts(self, options):
         """Attempt automatic resolution of simple conflicts"""
-        conflicts = self.get_filtered_conflicts(options)
+        from apps.parts.consensus.resolution import ConflictAutoResolver
         
-        resolved_count = 0
-        dismissed_count = 0
+        conflicts = self.get_filtered_conflicts(options)
         
         self.stdout.write('Attempting automatic conflict resolution...')
         
-        for conflict in conflicts:
-            resolution = self.analyze_conflict_for_auto_resolution(conflict)
-            
-            if resolution['action'] == 'resolve':
-                with transaction.atomic():
-                    conflict.resolution_status = 'RESOLVED'
-                    conflict.resolved_date = timezone.now()
-                    conflict.resolved_by = 'auto-resolver'
-                    conflict.resolution_notes = resolution['notes']
-                    conflict.save()
-                    resolved_count += 1
-                    
-                    if options['verbose']:
-                        self.stdout.write(f'  RESOLVED: {conflict.part_number} - {resolution["notes"]}')
-            
-            elif resolution['action'] == 'dismiss':
-                with transaction.atomic():
-                    conflict.resolution_status = 'DISMISSED'
-                    conflict.resolved_date = timezone.now()
-                    conflict.resolved_by = 'auto-resolver'
-                    conflict.resolution_notes = resolution['notes']
-                    conflict.save()
-                    dismissed_count += 1
-                    
-                    if options['verbose']:
-                        self.stdout.write(f'  DISMISSED: {conflict.part_number} - {resolution["notes"]}')
+        def report(conflict, resolution):
+            label = 'RESOLVED' if resolution.action == 'resolve' else 'DISMISSED'
+            self.stdout.write(f'  {label}: {conflict.part_number} - {resolution.notes}')
+        
+        resolver = ConflictAutoResolver(page_size=options['page_size'])
+        totals = resolver.resolve(conflicts, on_resolution=report if options['verbose'] else None)
         
         self.stdout.write(
             self.style.SUCCESS(
-                f'Auto-resolution complete: {resolved_count} resolved, {dismissed_count} dismissed'
+                f'Auto-resolution complete: {totals["resolved"]} resolved, {totals["dismissed"]} dismissed'
             )
         )
     
-    def analyze_conflict_for_auto_resolution(self, conflict):
-        """Analyze conflict to determine if it can be auto-resolved"""
-        listings = conflict.conflicting_listings.all()
-        
-        # Check for false positive year conflicts (consecutive years)
-        if 'year range' in conflict.conflict_description.lower():
-            years = sorted([listing.vehicle_year for listing in listings])
-            if len(years) == 2 and abs(years[1] - years[0]) <= 1:
-                return {
-                    'action': 'dismiss',
-                    'notes': f'Consecutive years {years[0]}-{years[1]} are likely same generation'
-                }
-        
-        # Check for trim variations (same base model)
-        if len(set(listing.vehicle_make for listing in listings)) == 1:
-            models = set(listing.vehicle_model for listing in listings)
-            if len(models) == 1:
-                trims = [listing.vehicle_trim for listing in listings if listing.vehicle_trim]
-                if len(trims) > 1:
-                    return {
-                        'action': 'resolve',
-                        'notes': f'Trim variations for same model: {", ".join(trims)}'
-                    }
-        
-        # Check for single outlier with low weight
-        if len(listings) >= 3:
-            weights = [listing.calculate_quality_weight() for listing in listings]
-            min_weight = min(weights)
-            avg_weight = sum(weights) / len(weights)
-            
-            if min_weight < avg_weight * 0.5:  # Outlier is less than half average weight
-                return {
-                    'action': 'resolve',
-                    'notes': f'Low quality outlier detected (weight: {min_weight:.2f} vs avg: {avg_weight:.2f})'
-                }
-        
-        return {'action': 'manual', 'notes': 'Requires manual review'}
-    
     def generate_conflict_report(self, options):
         """Generate CSV report of conflicts"""
         conflicts = self.get_filtered_conflicts(options)
@@ -273,7 +247,7 @@ class Command(BaseCommand):
             
             for conflict in conflicts:
                 # Get listing details
-                listings = conflict.conflicting_listings.all()
+                listings = conflict.get_listings()
                 listing_details = '; '.join([
                     f'{l.vehicle_year} {l.vehicle_make} {l.vehicle_model} '
                     f'(Weight: {l.calculate_quality_weight():.2f})'
@@ -288,7 +262,7 @@ class Command(BaseCommand):
                     'conflict_description': conflict.conflict_description,
                     'created_date': conflict.created_date.strftime('%Y-%m-%d %H:%M:%S'),
                     'resolution_status': conflict.resolution_status,
-                    'conflicting_listings_count': conflict.conflicting_listings.count(),
+                    'conflicting_listings_count': conflict.get_listing_count(),
                     'listing_details': listing_details,
                     'age_days': age_days
                 })
@@ -4,6 +4,7 @@ from django.db.models import Count
 from apps.parts.models import Part, Manufacturer, PartCategory
 from apps.vehicles.models import Vehicle, Make, Model
 from apps.fitments.models import Fitment
+from apps.parts.stats import refresh_statistics
 import time
 
 class Command(BaseCommand):
@@ -25,27 +26,7 @@ class Command(BaseCommand):
         # 1. Warm database stats (most expensive query)
         self.stdout.write('📊 Warming database stats...')
         try:
-            stats = {
-                'parts': {
-                    'total': Part.objects.count(),
-                    'active': Part.objects.filter(is_active=True).count(),
-                    'by_manufacturer': dict(
-                        Part.objects.values_list('manufacturer__name').annotate(count=Count('id')).order_by('-count')[:10]
-                    )
-                },
-                'vehicles': {
-                    'total': Vehicle.objects.count(),
-                    'active': Vehicle.objects.filter(is_active=True).count(),
-                    'by_make': dict(
-                        Vehicle.objects.values_list('make__name').annotate(count=Count('id')).order_by('-count')[:10]
-                    )
-                },
-                'fitments': {
-                    'total': Fitment.objects.count(),
-                    'verified': Fitment.objects.filter(is_verified=True).count(),
-                }
-            }
-            cache.set('database_stats', stats, 900)  # 15 minutes
+            refresh_statistics()
             self.stdout.write(self.style.SUCCESS('✅ Database stats cached'))
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'❌ Failed to cache database stats: {e}'))
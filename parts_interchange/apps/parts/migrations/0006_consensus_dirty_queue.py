@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-16 20:54
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def queue_existing_parts(apps, schema_editor):
+    """Queue every existing part number so the first incremental run covers them"""
+    RawListingData = apps.get_model('parts', 'RawListingData')
+    PartConsensusState = apps.get_model('parts', 'PartConsensusState')
+
+    now = timezone.now()
+    part_numbers = RawListingData.objects.order_by().values_list('part_number', flat=True).distinct()
+    PartConsensusState.objects.bulk_create(
+        [PartConsensusState(part_number=part_number, needs_processing=True, queued_at=now)
+         for part_number in part_numbers.iterator()],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0005_add_consensus_fitment_models'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PartConsensusState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('part_number', models.CharField(max_length=50, unique=True)),
+                ('needs_processing', models.BooleanField(default=True)),
+                ('queued_at', models.DateTimeField(blank=True, null=True)),
+                ('input_fingerprint', models.CharField(blank=True, max_length=64)),
+                ('last_processed', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['part_number'],
+                'indexes': [models.Index(condition=models.Q(('needs_processing', True)), fields=['queued_at'], name='parts_consensus_dirty_idx')],
+            },
+        ),
+        migrations.RunPython(queue_existing_parts, migrations.RunPython.noop),
+    ]
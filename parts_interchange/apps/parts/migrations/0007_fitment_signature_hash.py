@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-16 21:01
+
+from django.db import migrations, models
+import hashlib
+
+FITMENT_FIELDS = ('vehicle_year', 'vehicle_make', 'vehicle_model', 'vehicle_trim', 'vehicle_engine')
+
+
+def fitment_signature_hash(year, make, model, trim, engine):
+    signature = f"{year}|{make}|{model}|{trim}|{engine}"
+    return int.from_bytes(hashlib.blake2b(signature.encode(), digest_size=8).digest(), 'big', signed=True)
+
+
+def backfill_fitment_hashes(apps, schema_editor):
+    """Hash the fitment signature of existing listings and consensus fitments"""
+    for model_name in ('RawListingData', 'ConsensusFitment'):
+        model = apps.get_model('parts', model_name)
+        batch = []
+        for row_id, *fitment in model.objects.order_by().values_list('id', *FITMENT_FIELDS).iterator(chunk_size=2000):
+            batch.append(model(id=row_id, fitment_hash=fitment_signature_hash(*fitment)))
+            if len(batch) >= 2000:
+                model.objects.bulk_update(batch, ['fitment_hash'])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ['fitment_hash'])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0006_consensus_dirty_queue'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='consensusfitment',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='consensusfitment',
+            name='fitment_hash',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='rawlistingdata',
+            name='fitment_hash',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_fitment_hashes, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='consensusfitment',
+            unique_together={('part_number', 'fitment_hash')},
+        ),
+        migrations.AddIndex(
+            model_name='rawlistingdata',
+            index=models.Index(fields=['part_number', 'fitment_hash'], name='parts_rawli_part_nu_89ec61_idx'),
+        ),
+    ]
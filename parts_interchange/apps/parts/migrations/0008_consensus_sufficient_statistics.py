@@ -0,0 +1,94 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:22
+
+from django.db import migrations, models
+from django.db.models import Case, Count, Q, Sum, Value, When
+from django.db.models.functions import Least
+
+BATCH_SIZE = 2000
+STATISTIC_FIELDS = (
+    'weight_sum_milli', 'business_seller_count', 'verified_seller_count',
+    'oem_reference_count', 'detailed_description_count',
+)
+
+
+def listing_weight_milli(prefix):
+    """RawListingData.quality_weight_expression() through a relation prefix"""
+    def bonus(flag, milli):
+        return Case(When(Q(**{f'{prefix}{flag}': True}), then=Value(milli)), default=Value(0))
+
+    feedback = f'{prefix}seller_feedback_count'
+    return (
+        Value(1000)
+        + bonus('seller_is_business', 300)
+        + Case(
+            When(Q(**{f'{feedback}__isnull': False}) & ~Q(**{feedback: 0}), then=Least(feedback, Value(500))),
+            default=Value(0),
+        )
+        + bonus('has_oem_reference', 200)
+        + bonus('has_detailed_description', 100)
+        + bonus('is_verified_seller', 200)
+    )
+
+
+def backfill_statistics(apps, schema_editor):
+    """Aggregate each consensus fitment's supporting listings into its new statistics columns"""
+    ConsensusFitment = apps.get_model('parts', 'ConsensusFitment')
+    through = ConsensusFitment.supporting_raw_listings.through
+    prefix = 'rawlistingdata__'
+
+    rows = (
+        through.objects
+        .order_by()
+        .values('consensusfitment_id')
+        .annotate(
+            weight_sum_milli=Sum(listing_weight_milli(prefix)),
+            business_seller_count=Count('id', filter=Q(**{f'{prefix}seller_is_business': True})),
+            verified_seller_count=Count('id', filter=Q(**{f'{prefix}is_verified_seller': True})),
+            oem_reference_count=Count('id', filter=Q(**{f'{prefix}has_oem_reference': True})),
+            detailed_description_count=Count('id', filter=Q(**{f'{prefix}has_detailed_description': True})),
+        )
+    )
+    batch = []
+    for row in rows.iterator(chunk_size=BATCH_SIZE):
+        batch.append(ConsensusFitment(id=row['consensusfitment_id'], **{field: row[field] for field in STATISTIC_FIELDS}))
+        if len(batch) >= BATCH_SIZE:
+            ConsensusFitment.objects.bulk_update(batch, STATISTIC_FIELDS)
+            batch = []
+    if batch:
+        ConsensusFitment.objects.bulk_update(batch, STATISTIC_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0007_fitment_signature_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consensusfitment',
+            name='business_seller_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='consensusfitment',
+            name='detailed_description_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='consensusfitment',
+            name='oem_reference_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='consensusfitment',
+            name='verified_seller_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='consensusfitment',
+            name='weight_sum_milli',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_statistics, migrations.RunPython.noop),
+    ]
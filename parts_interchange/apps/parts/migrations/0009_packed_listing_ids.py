@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0008_consensus_sufficient_statistics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conflictingfitment',
+            name='listing_ids_packed',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='consensusfitment',
+            name='listing_ids_packed',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0009_packed_listing_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='partconsensusstate',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='partconsensusstate',
+            name='leased_by',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0010_consensus_leases'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsensusPromotionIssue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('part_number', models.CharField(db_index=True, max_length=50)),
+                ('reason', models.CharField(choices=[('PART_NOT_FOUND', 'No active part with this part number'), ('PART_AMBIGUOUS', 'Part number matches parts from several manufacturers'), ('VEHICLE_NOT_FOUND', 'No active vehicle matches the year/make/model/trim/engine'), ('VEHICLE_AMBIGUOUS', 'Several vehicles match the year/make/model/trim/engine')], max_length=20)),
+                ('candidates', models.PositiveIntegerField(default=0)),
+                ('first_seen', models.DateTimeField(auto_now_add=True)),
+                ('last_seen', models.DateTimeField()),
+                ('consensus_fitment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='promotion_issue', to='parts.consensusfitment')),
+            ],
+            options={
+                'ordering': ['reason', 'part_number'],
+            },
+        ),
+    ]
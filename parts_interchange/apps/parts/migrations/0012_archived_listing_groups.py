@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:40
+
+import apps.parts.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0011_consensus_promotion_issues'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedListingGroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('part_number', models.CharField(max_length=50)),
+                ('vehicle_year', models.IntegerField()),
+                ('vehicle_make', models.CharField(max_length=50)),
+                ('vehicle_model', models.CharField(max_length=50)),
+                ('vehicle_trim', models.CharField(blank=True, max_length=50)),
+                ('vehicle_engine', models.CharField(blank=True, max_length=50)),
+                ('fitment_hash', models.BigIntegerField(default=0, editable=False)),
+                ('listing_count', models.IntegerField(default=0)),
+                ('weight_sum_milli', models.BigIntegerField(default=0)),
+                ('business_seller_count', models.IntegerField(default=0)),
+                ('verified_seller_count', models.IntegerField(default=0)),
+                ('oem_reference_count', models.IntegerField(default=0)),
+                ('detailed_description_count', models.IntegerField(default=0)),
+                ('first_extraction_date', models.DateTimeField()),
+                ('last_extraction_date', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['part_number', '-listing_count'],
+            },
+            bases=(apps.parts.models.FitmentSignatureMixin, models.Model),
+        ),
+        migrations.AddIndex(
+            model_name='rawlistingdata',
+            index=models.Index(fields=['extraction_date'], name='parts_rawli_extract_71ac63_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='archivedlistinggroup',
+            unique_together={('part_number', 'fitment_hash')},
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:42
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+from django.utils import timezone
+
+
+def remove_duplicate_listings(apps, schema_editor):
+    """Keep the oldest row per (source_ebay_item_id, fitment_hash) and queue the affected parts"""
+    RawListingData = apps.get_model('parts', 'RawListingData')
+    PartConsensusState = apps.get_model('parts', 'PartConsensusState')
+
+    duplicates = (
+        RawListingData.objects
+        .exclude(source_ebay_item_id='')
+        .order_by()
+        .values('source_ebay_item_id', 'fitment_hash')
+        .annotate(keep_id=Min('id'), rows=Count('id'))
+        .filter(rows__gt=1)
+    )
+    part_numbers = set()
+    for group in duplicates.iterator():
+        rows = RawListingData.objects.filter(
+            source_ebay_item_id=group['source_ebay_item_id'], fitment_hash=group['fitment_hash']
+        ).exclude(id=group['keep_id'])
+        part_numbers.update(rows.values_list('part_number', flat=True))
+        rows.delete()
+
+    now = timezone.now()
+    PartConsensusState.objects.bulk_create(
+        [PartConsensusState(part_number=part_number, needs_processing=True, queued_at=now)
+         for part_number in part_numbers],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['part_number'],
+        update_fields=['needs_processing', 'queued_at'],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0012_archived_listing_groups'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_listings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='rawlistingdata',
+            constraint=models.UniqueConstraint(condition=models.Q(('source_ebay_item_id', ''), _negated=True), fields=('source_ebay_item_id', 'fitment_hash'), name='parts_rawlisting_item_fitment_uniq'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0013_raw_listing_item_fitment_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PartPriceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('part_number', models.CharField(max_length=50)),
+                ('vehicle_make', models.CharField(blank=True, max_length=50)),
+                ('vehicle_model', models.CharField(blank=True, max_length=50)),
+                ('listing_count', models.IntegerField(default=0)),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('max_price', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('price_sum', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('median_price', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('price_histogram', models.JSONField(default=dict)),
+                ('last_listing_id', models.BigIntegerField(db_index=True, default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['part_number', 'vehicle_make', 'vehicle_model'],
+                'unique_together': {('part_number', 'vehicle_make', 'vehicle_model')},
+            },
+        ),
+    ]
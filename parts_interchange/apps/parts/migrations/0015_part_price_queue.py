@@ -0,0 +1,114 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:58
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Upper
+from django.utils import timezone
+import math
+
+
+def price_bucket(price):
+    # Frozen copy of apps.parts.pricing.price_bucket
+    if price <= 0:
+        return -1
+    return math.floor(math.log(float(price) * 100) / math.log(1.05))
+
+
+def split_archived_prices(apps, schema_editor):
+    """Whatever the watermarked totals hold beyond the hot listings they folded in came from archived listings"""
+    PartPriceRollup = apps.get_model('parts', 'PartPriceRollup')
+    RawListingData = apps.get_model('parts', 'RawListingData')
+
+    for rollup in PartPriceRollup.objects.iterator():
+        hot = RawListingData.objects.filter(
+            part_number=rollup.part_number, id__lte=rollup.last_listing_id, listing_price__isnull=False
+        )
+        if rollup.vehicle_make or rollup.vehicle_model:
+            hot = hot.annotate(make=Upper('vehicle_make'), model=Upper('vehicle_model')).filter(
+                make=rollup.vehicle_make, model=rollup.vehicle_model
+            )
+        histogram = dict(rollup.price_histogram)
+        count, price_sum = rollup.listing_count, rollup.price_sum
+        for price, listings in hot.order_by().values_list('listing_price').annotate(listings=Count('id')):
+            bucket = str(price_bucket(price))
+            histogram[bucket] = histogram.get(bucket, 0) - listings
+            count -= listings
+            price_sum -= price * listings
+        if count <= 0:
+            continue
+
+        # The exact archived extremes are unknown; the overall ones bound them
+        rollup.archived_count = count
+        rollup.archived_price_sum = max(price_sum, Decimal('0'))
+        rollup.archived_min_price, rollup.archived_max_price = rollup.min_price, rollup.max_price
+        rollup.archived_histogram = {bucket: listings for bucket, listings in histogram.items() if listings > 0}
+        rollup.save(update_fields=[
+            'archived_count', 'archived_price_sum', 'archived_min_price', 'archived_max_price', 'archived_histogram'
+        ])
+
+
+def queue_all_parts(apps, schema_editor):
+    PartPriceQueue = apps.get_model('parts', 'PartPriceQueue')
+    PartPriceRollup = apps.get_model('parts', 'PartPriceRollup')
+    RawListingData = apps.get_model('parts', 'RawListingData')
+
+    now = timezone.now()
+    part_numbers = set(RawListingData.objects.order_by().values_list('part_number', flat=True).distinct())
+    part_numbers.update(PartPriceRollup.objects.order_by().values_list('part_number', flat=True).distinct())
+    PartPriceQueue.objects.bulk_create(
+        [PartPriceQueue(part_number=part_number, queued_at=now) for part_number in part_numbers if part_number],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0014_part_price_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='partpricerollup',
+            name='archived_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='partpricerollup',
+            name='archived_min_price',
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='partpricerollup',
+            name='archived_max_price',
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='partpricerollup',
+            name='archived_price_sum',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=16),
+        ),
+        migrations.AddField(
+            model_name='partpricerollup',
+            name='archived_histogram',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.RunPython(split_archived_prices, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='partpricerollup',
+            name='last_listing_id',
+        ),
+        migrations.CreateModel(
+            name='PartPriceQueue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('part_number', models.CharField(max_length=50, unique=True)),
+                ('queued_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'ordering': ['queued_at'],
+            },
+        ),
+        migrations.RunPython(queue_all_parts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0015_part_price_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedListingKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_ebay_item_id', models.CharField(max_length=20)),
+                ('fitment_hash', models.BigIntegerField()),
+            ],
+            options={
+                'unique_together': {('source_ebay_item_id', 'fitment_hash')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0016_archived_listing_keys'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='consensuspromotionissue',
+            name='reason',
+            field=models.CharField(choices=[('PART_NOT_FOUND', 'No active part with this part number'), ('PART_AMBIGUOUS', 'Part number matches parts from several manufacturers'), ('VEHICLE_NOT_FOUND', 'No active vehicle matches the year/make/model/trim/engine')], max_length=20),
+        ),
+    ]
@@ -1,6 +1,10 @@
-from django.db import models
+from django.db import connections, models
+from django.db.models import Case, Q, Value, When
+from django.db.models.functions import Least
 from django.core.validators import RegexValidator
+from django.conf import settings
 from decimal import Decimal
+import hashlib
 
 
 class Manufacturer(models.Model):
@@ -261,7 +265,132 @@ class PartGroupMembership(models.Model):
 
 # ===== CONSENSUS-BASED FITMENT MODELS (Phase 1) =====
 
-class RawListingData(models.Model):
+FITMENT_SIGNATURE_FIELDS = ('vehicle_year', 'vehicle_make', 'vehicle_model', 'vehicle_trim', 'vehicle_engine')
+
+# Part numbers of synthetic benchmark listings (see consensus.benchmark); kept out of the price index
+BENCHMARK_PART_PREFIX = 'BENCH-'
+
+
+def fitment_signature_hash(year, make, model, trim, engine):
+    """Signed 64-bit hash of a fitment signature (fits a BigIntegerField)"""
+    signature = f"{year}|{make}|{model}|{trim}|{engine}"
+    return int.from_bytes(hashlib.blake2b(signature.encode(), digest_size=8).digest(), 'big', signed=True)
+
+
+class FitmentHashQuerySet(models.QuerySet):
+    """Fill fitment_hash on bulk_create, which bypasses save()"""
+    
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.fitment_hash = obj.compute_fitment_hash()
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+class RawListingQuerySet(FitmentHashQuerySet):
+    def delete_rows(self) -> int:
+        """Delete the matching listings with one DELETE statement; returns the row count.
+        
+        Unlike delete(), no listing is loaded and no post_delete signal is
+        sent (so nothing is re-queued): for bulk removals such as archiving,
+        whose caller has already deleted the M2M links to these listings.
+        """
+        database = connections[self.db]
+        ids_sql, params = self.order_by().values('pk').query.get_compiler(self.db).as_sql()
+        table = database.ops.quote_name(self.model._meta.db_table)
+        column = database.ops.quote_name(self.model._meta.pk.column)
+        with database.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({ids_sql})", params)
+            return cursor.rowcount
+
+
+class FitmentSignatureMixin:
+    """Keeps the stored fitment_hash in step with the vehicle fitment columns.
+    
+    Maintained by save() and bulk_create(); queryset.update() of the vehicle
+    columns must set fitment_hash itself.
+    """
+    
+    def get_fitment_signature(self):
+        """Get unique fitment signature for grouping"""
+        return f"{self.vehicle_year}|{self.vehicle_make}|{self.vehicle_model}|{self.vehicle_trim}|{self.vehicle_engine}"
+    
+    def compute_fitment_hash(self):
+        return fitment_signature_hash(*(getattr(self, field) for field in FITMENT_SIGNATURE_FIELDS))
+    
+    def save(self, *args, **kwargs):
+        self.fitment_hash = self.compute_fitment_hash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(FITMENT_SIGNATURE_FIELDS):
+            kwargs['update_fields'] = {*update_fields, 'fitment_hash'}
+        super().save(*args, **kwargs)
+
+
+def packed_listing_ids_enabled():
+    """Store listing links as packed id blobs instead of M2M through rows"""
+    return getattr(settings, 'PARTS_INTERCHANGE', {}).get('PACKED_LISTING_IDS', False)
+
+
+def pack_listing_ids(listing_ids):
+    """Sorted, de-duplicated ids as delta-encoded unsigned varints"""
+    packed = bytearray()
+    previous = 0
+    for listing_id in sorted(set(listing_ids)):
+        delta = listing_id - previous
+        previous = listing_id
+        while delta >= 0x80:
+            packed.append((delta & 0x7F) | 0x80)
+            delta >>= 7
+        packed.append(delta)
+    return bytes(packed)
+
+
+def unpack_listing_ids(packed):
+    """Inverse of pack_listing_ids(); returns ids in ascending order"""
+    listing_ids = []
+    value = shift = previous = 0
+    for byte in packed:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        previous += value
+        listing_ids.append(previous)
+        value = shift = 0
+    return listing_ids
+
+
+class PackedListingsMixin:
+    """Read a model's RawListingData links from either storage.
+    
+    listing_ids_packed holds the ids when packed storage was used for the
+    row (see packed_listing_ids_enabled); NULL means the links live in the
+    M2M field named by listing_relation.
+    """
+    listing_relation = None
+    
+    def get_listing_ids(self):
+        if self.listing_ids_packed is not None:
+            return unpack_listing_ids(self.listing_ids_packed)
+        return list(getattr(self, self.listing_relation).order_by('id').values_list('id', flat=True))
+    
+    def get_listings(self):
+        """RawListingData queryset of the linked listings"""
+        if self.listing_ids_packed is not None:
+            return RawListingData.objects.filter(id__in=unpack_listing_ids(self.listing_ids_packed))
+        return getattr(self, self.listing_relation).all()
+    
+    def get_listing_count(self):
+        if self.listing_ids_packed is not None:
+            return len(unpack_listing_ids(self.listing_ids_packed))
+        return getattr(self, self.listing_relation).count()
+    
+    def set_listing_ids(self, listing_ids):
+        """Store the links packed on this row (the caller saves it)"""
+        self.listing_ids_packed = pack_listing_ids(listing_ids)
+
+
+class RawListingData(FitmentSignatureMixin, models.Model):
     """Store individual marketplace listing data ('quarks')"""
     part_number = models.CharField(max_length=50, db_index=True)
     
@@ -271,6 +400,7 @@ class RawListingData(models.Model):
     vehicle_model = models.CharField(max_length=50)
     vehicle_trim = models.CharField(max_length=50, blank=True)
     vehicle_engine = models.CharField(max_length=50, blank=True)
+    fitment_hash = models.BigIntegerField(default=0, editable=False)
     
     # Source tracking for quality weighting
     source_ebay_item_id = models.CharField(max_length=20, blank=True)
@@ -285,20 +415,28 @@ class RawListingData(models.Model):
     has_oem_reference = models.BooleanField(default=False)
     has_detailed_description = models.BooleanField(default=False)
     
+    objects = RawListingQuerySet.as_manager()
+    
     class Meta:
         indexes = [
             models.Index(fields=['part_number', 'extraction_date']),
             models.Index(fields=['vehicle_year', 'vehicle_make', 'vehicle_model']),
+            models.Index(fields=['part_number', 'fitment_hash']),
+            models.Index(fields=['extraction_date']),
+        ]
+        constraints = [
+            # One row per eBay item and vehicle; listings without an item id are not de-duplicated
+            models.UniqueConstraint(
+                fields=['source_ebay_item_id', 'fitment_hash'],
+                condition=~Q(source_ebay_item_id=''),
+                name='parts_rawlisting_item_fitment_uniq',
+            ),
         ]
         ordering = ['-extraction_date']
     
     def __str__(self):
         return f"{self.part_number} → {self.vehicle_year} {self.vehicle_make} {self.vehicle_model}"
     
-    def get_fitment_signature(self):
-        """Get unique fitment signature for grouping"""
-        return f"{self.vehicle_year}|{self.vehicle_make}|{self.vehicle_model}|{self.vehicle_trim}|{self.vehicle_engine}"
-    
     def calculate_quality_weight(self):
         """Calculate quality weight for consensus processing"""
         weight = Decimal('1.0')  # Base weight
@@ -321,9 +459,94 @@ class RawListingData(models.Model):
             weight += Decimal('0.2')
         
         return weight
+    
+    @classmethod
+    def quality_weight_expression(cls):
+        """Database expression equivalent of calculate_quality_weight(), in thousandths.
+        
+        Integer arithmetic keeps SUM() exact on every backend; divide by 1000
+        to get the Decimal weight.
+        """
+        def bonus(condition, milli):
+            return Case(When(condition, then=Value(milli)), default=Value(0))
+        
+        return (
+            Value(1000)
+            + bonus(Q(seller_is_business=True), 300)
+            + Case(
+                When(
+                    Q(seller_feedback_count__isnull=False) & ~Q(seller_feedback_count=0),
+                    then=Least('seller_feedback_count', Value(500)),
+                ),
+                default=Value(0),
+            )
+            + bonus(Q(has_oem_reference=True), 200)
+            + bonus(Q(has_detailed_description=True), 100)
+            + bonus(Q(is_verified_seller=True), 200)
+        )
+
+
+def raw_listing_hot_days():
+    """Listings older than this many days are archived into ArchivedListingGroup"""
+    return getattr(settings, 'PARTS_INTERCHANGE', {}).get('RAW_LISTING_HOT_DAYS', 180)
+
+
+class ArchivedListingGroup(FitmentSignatureMixin, models.Model):
+    """Sufficient statistics of archived RawListingData, one row per part number and fitment.
+    
+    archive_raw_listings folds listings older than the hot window into these
+    rows and deletes them; consensus adds the archived counts and weights to
+    the hot listings' groups, so archived data still counts when scoring.
+    """
+    part_number = models.CharField(max_length=50)
+    
+    vehicle_year = models.IntegerField()
+    vehicle_make = models.CharField(max_length=50)
+    vehicle_model = models.CharField(max_length=50)
+    vehicle_trim = models.CharField(max_length=50, blank=True)
+    vehicle_engine = models.CharField(max_length=50, blank=True)
+    fitment_hash = models.BigIntegerField(default=0, editable=False)
+    
+    # Same statistics ConsensusFitment stores, over the archived listings only
+    listing_count = models.IntegerField(default=0)
+    weight_sum_milli = models.BigIntegerField(default=0)
+    business_seller_count = models.IntegerField(default=0)
+    verified_seller_count = models.IntegerField(default=0)
+    oem_reference_count = models.IntegerField(default=0)
+    detailed_description_count = models.IntegerField(default=0)
+    
+    first_extraction_date = models.DateTimeField()
+    last_extraction_date = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now=True)
+    
+    objects = FitmentHashQuerySet.as_manager()
+    
+    class Meta:
+        unique_together = ('part_number', 'fitment_hash')
+        ordering = ['part_number', '-listing_count']
+    
+    def __str__(self):
+        return f"{self.part_number} → {self.vehicle_year} {self.vehicle_make} {self.vehicle_model} ({self.listing_count} archived)"
 
 
-class ConsensusFitment(models.Model):
+class ArchivedListingKey(models.Model):
+    """(source_ebay_item_id, fitment_hash) of every archived listing with an item id.
+
+    The raw rows are gone once archived, so ingestion checks these keys too;
+    otherwise a re-crawled listing would count both in ArchivedListingGroup
+    and as a hot listing.
+    """
+    source_ebay_item_id = models.CharField(max_length=20)
+    fitment_hash = models.BigIntegerField()
+
+    class Meta:
+        unique_together = ('source_ebay_item_id', 'fitment_hash')
+
+    def __str__(self):
+        return f"{self.source_ebay_item_id} ({self.fitment_hash})"
+
+
+class ConsensusFitment(FitmentSignatureMixin, PackedListingsMixin, models.Model):
     """Processed consensus fitment data ('atoms')"""
     STATUS_CHOICES = [
         ('HIGH_CONFIDENCE', '80%+ confidence - Ready for production'),
@@ -342,6 +565,7 @@ class ConsensusFitment(models.Model):
     vehicle_model = models.CharField(max_length=50)
     vehicle_trim = models.CharField(max_length=50, blank=True)
     vehicle_engine = models.CharField(max_length=50, blank=True)
+    fitment_hash = models.BigIntegerField(default=0, editable=False)
     
     # Consensus metrics
     confidence_score = models.DecimalField(max_digits=5, decimal_places=2)  # 0-100
@@ -349,14 +573,25 @@ class ConsensusFitment(models.Model):
     total_weight_score = models.DecimalField(max_digits=8, decimal_places=2)
     last_updated = models.DateTimeField(auto_now=True)
     
+    # Sufficient statistics for re-scoring without reading raw listings
+    weight_sum_milli = models.BigIntegerField(default=0)  # Exact weight sum in thousandths
+    business_seller_count = models.IntegerField(default=0)
+    verified_seller_count = models.IntegerField(default=0)
+    oem_reference_count = models.IntegerField(default=0)
+    detailed_description_count = models.IntegerField(default=0)
+    
     # Status tracking
     status = models.CharField(max_length=20, choices=STATUS_CHOICES)
     
     # Linking to source data
     supporting_raw_listings = models.ManyToManyField(RawListingData, related_name='consensus_fitments')
+    listing_ids_packed = models.BinaryField(null=True, blank=True)
+    
+    objects = FitmentHashQuerySet.as_manager()
+    listing_relation = 'supporting_raw_listings'
     
     class Meta:
-        unique_together = ('part_number', 'vehicle_year', 'vehicle_make', 'vehicle_model', 'vehicle_trim', 'vehicle_engine')
+        unique_together = ('part_number', 'fitment_hash')
         indexes = [
             models.Index(fields=['part_number', 'confidence_score']),
             models.Index(fields=['vehicle_year', 'vehicle_make', 'vehicle_model']),
@@ -367,16 +602,12 @@ class ConsensusFitment(models.Model):
     def __str__(self):
         return f"{self.part_number} → {self.vehicle_year} {self.vehicle_make} {self.vehicle_model} ({self.confidence_score}%)"
     
-    def get_fitment_signature(self):
-        """Get unique fitment signature"""
-        return f"{self.vehicle_year}|{self.vehicle_make}|{self.vehicle_model}|{self.vehicle_trim}|{self.vehicle_engine}"
-    
     def is_production_ready(self):
         """Check if fitment is ready for production use"""
         return self.status in ['HIGH_CONFIDENCE', 'VERIFIED'] and self.confidence_score >= 80
 
 
-class ConflictingFitment(models.Model):
+class ConflictingFitment(PackedListingsMixin, models.Model):
     """Track fitments that need manual review"""
     RESOLUTION_STATUS_CHOICES = [
         ('PENDING', 'Awaiting review'),
@@ -387,14 +618,134 @@ class ConflictingFitment(models.Model):
     part_number = models.CharField(max_length=50)
     conflict_description = models.TextField()
     conflicting_listings = models.ManyToManyField(RawListingData)
+    listing_ids_packed = models.BinaryField(null=True, blank=True)
     resolution_status = models.CharField(max_length=20, choices=RESOLUTION_STATUS_CHOICES, default='PENDING')
     created_date = models.DateTimeField(auto_now_add=True)
     resolved_date = models.DateTimeField(null=True, blank=True)
     resolved_by = models.CharField(max_length=100, blank=True)
     resolution_notes = models.TextField(blank=True)
     
+    listing_relation = 'conflicting_listings'
+    
     class Meta:
         ordering = ['-created_date']
     
     def __str__(self):
         return f"{self.part_number} - {self.conflict_description[:50]}..."
+
+
+class PartConsensusState(models.Model):
+    """Per-part consensus bookkeeping: dirty-queue flag and input fingerprint"""
+    part_number = models.CharField(max_length=50, unique=True)
+    
+    # Dirty queue - set whenever a raw listing for this part is inserted/changed
+    needs_processing = models.BooleanField(default=True)
+    queued_at = models.DateTimeField(null=True, blank=True)
+    
+    # Fingerprint of the listing inputs (and processor parameters) last processed
+    input_fingerprint = models.CharField(max_length=64, blank=True)
+    last_processed = models.DateTimeField(null=True, blank=True)
+    
+    # Lease held by the worker currently processing this part (see consensus.incremental)
+    leased_by = models.CharField(max_length=100, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['queued_at'],
+                condition=Q(needs_processing=True),
+                name='parts_consensus_dirty_idx',
+            ),
+        ]
+        ordering = ['part_number']
+    
+    def __str__(self):
+        state = 'dirty' if self.needs_processing else 'clean'
+        return f"{self.part_number} ({state})"
+
+
+class ConsensusPromotionIssue(models.Model):
+    """Production-ready consensus fitment that could not be promoted to a Fitment.
+    
+    Several matching vehicles are not an issue: a blank trim or engine matches
+    every trim or engine of the year/make/model, and the row is promoted to all of them.
+    """
+    REASON_CHOICES = [
+        ('PART_NOT_FOUND', 'No active part with this part number'),
+        ('PART_AMBIGUOUS', 'Part number matches parts from several manufacturers'),
+        ('VEHICLE_NOT_FOUND', 'No active vehicle matches the year/make/model/trim/engine'),
+    ]
+    
+    consensus_fitment = models.OneToOneField(
+        ConsensusFitment,
+        on_delete=models.CASCADE,
+        related_name='promotion_issue'
+    )
+    part_number = models.CharField(max_length=50, db_index=True)
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    candidates = models.PositiveIntegerField(default=0)  # Matching parts for PART_AMBIGUOUS
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['reason', 'part_number']
+    
+    def __str__(self):
+        return f"{self.consensus_fitment} ({self.reason})"
+
+
+class PartPriceRollup(models.Model):
+    """Listing price statistics for one part number, optionally narrowed to a make/model.
+    
+    The part-level row has blank vehicle_make and vehicle_model. Make/model are
+    upper-cased. Recomputed by apps.parts.pricing for the part numbers in
+    PartPriceQueue; the archived_* fields keep the prices of listings that
+    were archived (and deleted), and are included in the totals.
+    """
+    part_number = models.CharField(max_length=50)
+    vehicle_make = models.CharField(max_length=50, blank=True)
+    vehicle_model = models.CharField(max_length=50, blank=True)
+    
+    # Over listings with a price
+    listing_count = models.IntegerField(default=0)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    price_sum = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    median_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)  # Approximate, from the histogram
+    price_histogram = models.JSONField(default=dict)  # {log-scale bucket: listings}, see pricing.price_bucket()
+    
+    # The share of the above that comes from archived listings
+    archived_count = models.IntegerField(default=0)
+    archived_min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    archived_max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    archived_price_sum = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    archived_histogram = models.JSONField(default=dict)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('part_number', 'vehicle_make', 'vehicle_model')
+        ordering = ['part_number', 'vehicle_make', 'vehicle_model']
+    
+    def __str__(self):
+        scope = f" {self.vehicle_make} {self.vehicle_model}" if self.vehicle_make else ''
+        return f"{self.part_number}{scope}: {self.listing_count} prices"
+    
+    @property
+    def mean_price(self):
+        if not self.listing_count:
+            return None
+        return (self.price_sum / self.listing_count).quantize(Decimal('0.01'))
+
+
+class PartPriceQueue(models.Model):
+    """Part numbers whose PartPriceRollup rows need recomputing (see apps.parts.pricing)"""
+    part_number = models.CharField(max_length=50, unique=True)
+    queued_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        ordering = ['queued_at']
+    
+    def __str__(self):
+        return f"{self.part_number} (queued {self.queued_at:%Y-%m-%d %H:%M})"
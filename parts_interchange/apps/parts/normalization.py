@@ -0,0 +1,14 @@
+"""
+Natural-key normalization shared by consensus promotion and the eBay importer.
+
+Part numbers match with whitespace removed and upper-cased; make, model,
+trim and engine names match with whitespace collapsed and case-folded.
+"""
+
+
+def normalize_part_number(value: str) -> str:
+    return ''.join((value or '').split()).upper()
+
+
+def normalize_name(value: str) -> str:
+    return ' '.join((value or '').split()).casefold()
@@ -0,0 +1,272 @@
+"""Listing price index: PartPriceRollup rows maintained from RawListingData.listing_price
+
+Each part number has a part-level rollup (blank make/model) and one rollup
+per upper-cased make/model, so a quote is a single indexed row read.
+
+Listing writes queue their part number in PartPriceQueue (ingestion in the
+insert transaction, single saves and deletes through signals).
+refresh_price_rollups() recomputes the queued part numbers batch by batch:
+one GROUP BY over their hot listings (by part number, make, model and price)
+added to the archived statistics of their rollups, written back with one
+upsert. Recomputing from the rows themselves picks up late-committing
+inserts, price updates and deletes alike; a part re-queued while it was being
+recomputed stays queued for the next refresh.
+
+Min, max, count and sum are exact. The median is approximate: prices are
+counted in log-scale buckets PRICE_BUCKET_RATIO apart, and the median is the
+midpoint of the bucket holding the middle listing, clamped to [min, max],
+so it is within about 2.5% of the true median.
+
+archive_part_numbers() moves the prices of the listings it deletes into the
+rollups' archived_* statistics (fold_archived_prices), so the index keeps
+covering archived listings, across rebuilds too. Synthetic benchmark
+listings (BENCHMARK_PART_PREFIX) are never indexed.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.db.models.functions import Upper
+from django.utils import timezone
+from itertools import chain
+from typing import Dict, Iterable, List, Optional
+import logging
+import math
+import time
+
+from .models import BENCHMARK_PART_PREFIX, PartPriceQueue, PartPriceRollup, RawListingData
+
+logger = logging.getLogger(__name__)
+
+PRICE_BUCKET_RATIO = 1.05
+ZERO_PRICE_BUCKET = -1
+PRICE_INDEX_LOCK_ID = 0x70726963  # pg_advisory_xact_lock key serializing refreshes
+UPSERT_BATCH_SIZE = 1000
+REFRESH_BATCH_SIZE = 500  # Part numbers recomputed per transaction
+CENT = Decimal('0.01')
+
+ROLLUP_FIELDS = ('listing_count', 'min_price', 'max_price', 'price_sum', 'price_histogram')
+ARCHIVED_FIELDS = ('archived_count', 'archived_min_price', 'archived_max_price', 'archived_price_sum',
+                   'archived_histogram')
+
+
+def price_bucket(price: Decimal) -> int:
+    """Histogram bucket of a price: floor(log base PRICE_BUCKET_RATIO of the price in cents)"""
+    if price <= 0:
+        return ZERO_PRICE_BUCKET
+    return math.floor(math.log(float(price) * 100) / math.log(PRICE_BUCKET_RATIO))
+
+
+def bucket_price(bucket: int) -> Decimal:
+    """Geometric midpoint of a bucket, in dollars"""
+    if bucket == ZERO_PRICE_BUCKET:
+        return Decimal('0.00')
+    return Decimal(PRICE_BUCKET_RATIO ** (bucket + 0.5) / 100).quantize(CENT)
+
+
+def histogram_median(histogram: Dict[str, int], count: int, min_price: Decimal, max_price: Decimal) -> Optional[Decimal]:
+    if not count:
+        return None
+    middle = (count + 1) / 2
+    seen = 0
+    for bucket in sorted(histogram, key=int):
+        seen += histogram[bucket]
+        if seen >= middle:
+            return min(max(bucket_price(int(bucket)), min_price), max_price)
+    return max_price
+
+
+def rollup_keys(part_number: str, make: str, model: str) -> Iterable[tuple]:
+    return (part_number, '', ''), (part_number, make, model)
+
+
+def grouped_prices(listings):
+    """(part_number, MAKE, MODEL, listing_price, listings) rows of the priced, non-benchmark listings"""
+    return (
+        listings
+        .filter(listing_price__isnull=False)
+        .exclude(part_number__startswith=BENCHMARK_PART_PREFIX)
+        .annotate(make=Upper('vehicle_make'), model=Upper('vehicle_model'))
+        .order_by()
+        .values_list('part_number', 'make', 'model', 'listing_price')
+        .annotate(listings=Count('id'))
+    )
+
+
+def add_price(rollup: PartPriceRollup, price: Decimal, listings: int, archived: bool = False):
+    """Add listings at one price to the totals (archived=True: to the archived_* statistics)"""
+    count, min_price, max_price, price_sum, histogram = ARCHIVED_FIELDS if archived else ROLLUP_FIELDS
+    bucket = str(price_bucket(price))
+    setattr(rollup, count, getattr(rollup, count) + listings)
+    setattr(rollup, price_sum, getattr(rollup, price_sum) + price * listings)
+    current = getattr(rollup, min_price)
+    setattr(rollup, min_price, price if current is None else min(current, price))
+    current = getattr(rollup, max_price)
+    setattr(rollup, max_price, price if current is None else max(current, price))
+    buckets = getattr(rollup, histogram)
+    buckets[bucket] = buckets.get(bucket, 0) + listings
+
+
+def mark_prices_dirty(part_numbers: Iterable[str]) -> int:
+    """Queue part numbers for the next price index refresh"""
+    unique_parts = {
+        part_number for part_number in part_numbers
+        if part_number and not part_number.startswith(BENCHMARK_PART_PREFIX)
+    }
+    if not unique_parts:
+        return 0
+
+    now = timezone.now()
+    PartPriceQueue.objects.bulk_create(
+        [PartPriceQueue(part_number=part_number, queued_at=now) for part_number in unique_parts],
+        batch_size=UPSERT_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['part_number'],
+        update_fields=['queued_at'],
+    )
+    return len(unique_parts)
+
+
+def _acquire_lock(wait: bool) -> bool:
+    """Serialize refreshes on PostgreSQL; with wait=False, False when another refresh holds the lock"""
+    if connection.vendor != 'postgresql':
+        return True
+    with connection.cursor() as cursor:
+        if wait:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [PRICE_INDEX_LOCK_ID])
+            return True
+        cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", [PRICE_INDEX_LOCK_ID])
+        return cursor.fetchone()[0]
+
+
+def refresh_price_rollups(rebuild: bool = False, wait: bool = True, batch_size: int = REFRESH_BATCH_SIZE) -> Dict:
+    """Recompute the rollups of queued part numbers (rebuild: of every part number).
+
+    wait=False returns straight away (skipped=True) instead of waiting for a
+    refresh that is already running; the part numbers stay queued for it or
+    the next one.
+    """
+    started = time.perf_counter()
+    if rebuild:
+        mark_prices_dirty(chain(
+            RawListingData.objects.order_by().values_list('part_number', flat=True).distinct().iterator(),
+            PartPriceRollup.objects.order_by().values_list('part_number', flat=True).distinct().iterator(),
+        ))
+
+    totals = {'part_numbers': 0, 'listings_indexed': 0, 'rollups_written': 0, 'rollups_deleted': 0,
+              'skipped': False}
+    while True:
+        with transaction.atomic():
+            if not _acquire_lock(wait):
+                totals['skipped'] = True
+                break
+            queued = list(PartPriceQueue.objects.order_by('queued_at').values_list('part_number', 'queued_at')[:batch_size])
+            if not queued:
+                break
+            for key, value in recompute_rollups([part_number for part_number, _ in queued]).items():
+                totals[key] += value
+            dequeue(queued)
+        totals['part_numbers'] += len(queued)
+
+    totals['elapsed_seconds'] = round(time.perf_counter() - started, 2)
+    logger.info(f"Price index refresh: {totals}")
+    return totals
+
+
+def dequeue(queued: List[tuple]):
+    """Delete queue rows unless they were re-queued (new queued_at) after being read"""
+    parts_by_time = defaultdict(list)
+    for part_number, queued_at in queued:
+        parts_by_time[queued_at].append(part_number)
+    condition = Q()
+    for queued_at, part_numbers in parts_by_time.items():
+        condition |= Q(part_number__in=part_numbers, queued_at=queued_at)
+    PartPriceQueue.objects.filter(condition).delete()
+
+
+def recompute_rollups(part_numbers: List[str]) -> Dict:
+    """Rebuild the part numbers' rollups from their hot listings plus their archived statistics"""
+    existing = {
+        (rollup.part_number, rollup.vehicle_make, rollup.vehicle_model): rollup
+        for rollup in PartPriceRollup.objects.filter(part_number__in=part_numbers)
+    }
+    rollups = {}
+    for key, rollup in existing.items():
+        for field, default in zip(ROLLUP_FIELDS, (0, None, None, Decimal('0'), None)):
+            setattr(rollup, field, default)
+        rollup.price_histogram = {}
+        if rollup.archived_count:
+            # Archived statistics are part of the totals
+            rollup.listing_count = rollup.archived_count
+            rollup.min_price, rollup.max_price = rollup.archived_min_price, rollup.archived_max_price
+            rollup.price_sum = rollup.archived_price_sum
+            rollup.price_histogram = dict(rollup.archived_histogram)
+            rollups[key] = rollup
+
+    indexed = 0
+    prices = grouped_prices(RawListingData.objects.filter(part_number__in=part_numbers))
+    for part_number, make, model, price, listings in prices.iterator(chunk_size=UPSERT_BATCH_SIZE):
+        indexed += listings
+        for key in rollup_keys(part_number, make, model):
+            rollup = rollups.get(key)
+            if rollup is None:
+                rollup = rollups[key] = existing.get(key) or PartPriceRollup(
+                    part_number=key[0], vehicle_make=key[1], vehicle_model=key[2],
+                    price_histogram={}, archived_histogram={},
+                )
+            add_price(rollup, price, listings)
+
+    for rollup in rollups.values():
+        rollup.median_price = histogram_median(
+            rollup.price_histogram, rollup.listing_count, rollup.min_price, rollup.max_price
+        )
+    write_rollups(rollups.values())
+
+    # No priced listings left, hot or archived
+    stale = [rollup.id for key, rollup in existing.items() if key not in rollups]
+    PartPriceRollup.objects.filter(id__in=stale).delete()
+    return {'listings_indexed': indexed, 'rollups_written': len(rollups), 'rollups_deleted': len(stale)}
+
+
+def fold_archived_prices(listings) -> int:
+    """Move the prices of listings about to be archived into their rollups' archived_* statistics.
+
+    Call inside the transaction that deletes the listings. Their part
+    numbers are queued as well, so their totals are recomputed from the
+    remaining hot listings plus the new archived statistics.
+    """
+    rows = list(grouped_prices(listings))
+    if not rows:
+        return 0
+
+    part_numbers = sorted({row[0] for row in rows})
+    rollups = {
+        (rollup.part_number, rollup.vehicle_make, rollup.vehicle_model): rollup
+        for rollup in PartPriceRollup.objects.filter(part_number__in=part_numbers)
+    }
+    folded = 0
+    for part_number, make, model, price, listings in rows:
+        folded += listings
+        for key in rollup_keys(part_number, make, model):
+            rollup = rollups.get(key)
+            if rollup is None:
+                rollup = rollups[key] = PartPriceRollup(
+                    part_number=key[0], vehicle_make=key[1], vehicle_model=key[2],
+                    price_histogram={}, archived_histogram={},
+                )
+            add_price(rollup, price, listings, archived=True)
+
+    write_rollups(rollups.values())
+    mark_prices_dirty(part_numbers)
+    return folded
+
+
+def write_rollups(rollups: Iterable[PartPriceRollup]):
+    PartPriceRollup.objects.bulk_create(
+        rollups,
+        batch_size=UPSERT_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['part_number', 'vehicle_make', 'vehicle_model'],
+        update_fields=['median_price', *ROLLUP_FIELDS, *ARCHIVED_FIELDS, 'updated_at'],
+    )
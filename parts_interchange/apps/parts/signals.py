@@ -0,0 +1,31 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .models import RawListingData
+
+
+@receiver(post_init, sender=RawListingData)
+def remember_part_number(sender, instance, **kwargs):
+    """Snapshot the loaded part number, so a save that changes it re-queues the old one too"""
+    # Deferred (e.g. .only()) part numbers are not fetched just for the snapshot
+    instance._loaded_part_number = instance.__dict__.get('part_number')
+
+
+@receiver(post_save, sender=RawListingData)
+def queue_consensus_on_save(sender, instance, **kwargs):
+    """Queue the listing's part number, and the one it was moved away from, for incremental consensus and pricing"""
+    from .consensus.incremental import mark_parts_dirty
+    from .pricing import mark_prices_dirty
+    part_numbers = [instance.part_number, getattr(instance, '_loaded_part_number', None)]
+    mark_parts_dirty(part_numbers)
+    mark_prices_dirty(part_numbers)
+    instance._loaded_part_number = instance.part_number
+
+
+@receiver(post_delete, sender=RawListingData)
+def queue_consensus_on_delete(sender, instance, **kwargs):
+    """A removed listing changes the consensus input and the prices of its part number"""
+    from .consensus.incremental import mark_parts_dirty
+    from .pricing import mark_prices_dirty
+    mark_parts_dirty([instance.part_number])
+    mark_prices_dirty([instance.part_number])
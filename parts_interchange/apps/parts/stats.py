@@ -0,0 +1,84 @@
+"""
+Statistics snapshot shared by the dashboards, the stats API and consensus reports.
+
+Every table is counted with a single conditional-aggregate query, and the
+combined snapshot is cached so page loads never run full-table counts.
+`manage.py warm_cache` refreshes it on its schedule and consensus runs
+refresh it when they finish.
+"""
+
+from django.db.models import Count, Max, Min, Q
+from django.utils import timezone
+from typing import Dict
+import logging
+
+from apps.fitments.models import Fitment
+from apps.vehicles.models import Vehicle
+from .cache import PartsCacheManager
+from .models import (
+    Part, InterchangeGroup, PartGroup, RawListingData, ConsensusFitment, ConflictingFitment
+)
+
+logger = logging.getLogger(__name__)
+
+
+def compute_statistics() -> Dict:
+    """Count every dashboard table with one aggregate query per table"""
+    started = timezone.now()
+
+    parts = Part.objects.order_by().aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
+        manufacturers=Count('manufacturer', distinct=True),
+    )
+    vehicles = Vehicle.objects.order_by().aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
+        min_year=Min('year'),
+        max_year=Max('year'),
+    )
+    fitments = Fitment.objects.order_by().aggregate(
+        total=Count('id'),
+        verified=Count('id', filter=Q(is_verified=True)),
+    )
+    raw_listings = RawListingData.objects.order_by().aggregate(
+        total=Count('id'),
+        part_numbers=Count('part_number', distinct=True),
+    )
+    consensus = ConsensusFitment.objects.order_by().aggregate(
+        total=Count('id'),
+        **{status.lower(): Count('id', filter=Q(status=status)) for status, _ in ConsensusFitment.STATUS_CHOICES}
+    )
+    conflicts = ConflictingFitment.objects.order_by().aggregate(
+        total=Count('id'),
+        pending=Count('id', filter=Q(resolution_status='PENDING')),
+    )
+
+    return {
+        'parts': parts,
+        'vehicles': vehicles,
+        'fitments': fitments,
+        'interchange_groups': InterchangeGroup.objects.count(),
+        'part_groups': PartGroup.objects.count(),
+        'raw_listings': raw_listings,
+        'consensus': consensus,
+        'conflicts': conflicts,
+        'computed_at': started.isoformat(),
+    }
+
+
+def refresh_statistics() -> Dict:
+    """Recompute the snapshot and store it in the cache"""
+    stats = compute_statistics()
+    PartsCacheManager.cache_statistics_snapshot(stats)
+    logger.info(f"Refreshed statistics snapshot computed at {stats['computed_at']}")
+    return stats
+
+
+def get_statistics(refresh: bool = False) -> Dict:
+    """Cached statistics snapshot, computed on a cache miss"""
+    if not refresh:
+        stats = PartsCacheManager.get_statistics_snapshot()
+        if stats is not None:
+            return stats
+    return refresh_statistics()
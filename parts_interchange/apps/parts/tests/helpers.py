@@ -0,0 +1,22 @@
+"""Shared fixtures for the parts app tests"""
+
+from ..models import RawListingData
+
+LISTING_DEFAULTS = {
+    'vehicle_year': 2006,
+    'vehicle_make': 'Acura',
+    'vehicle_model': 'TL',
+    'listing_title': '2004-2008 Acura TL AC Compressor',
+}
+
+
+def make_listing(part_number: str, **fields) -> RawListingData:
+    """Unsaved RawListingData with valid defaults; fields override them"""
+    return RawListingData(part_number=part_number, **{**LISTING_DEFAULTS, **fields})
+
+
+def create_listing(part_number: str, **fields) -> RawListingData:
+    """Saved RawListingData (its part number is queued by the post_save signal)"""
+    listing = make_listing(part_number, **fields)
+    listing.save()
+    return listing
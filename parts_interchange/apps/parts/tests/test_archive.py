@@ -0,0 +1,112 @@
+"""Archiving old listings leaves consensus output unchanged and drops every link to them"""
+
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..consensus.archive import archive_listings
+from ..consensus.incremental import dirty_part_numbers, enqueue_all_parts, process_dirty_parts
+from ..consensus.processor import ENGINE_PYTHON, ENGINE_SQL, FitmentConsensusProcessor
+from ..models import ArchivedListingGroup, ConflictingFitment, ConsensusFitment, PartConsensusState, RawListingData
+from .helpers import create_listing
+
+CONSENSUS_FIELDS = (
+    'part_number', 'fitment_hash', 'confidence_score', 'status', 'supporting_listings_count',
+    'weight_sum_milli', 'business_seller_count', 'verified_seller_count', 'oem_reference_count',
+    'detailed_description_count',
+)
+
+
+class ArchiveRoundTripTests(TestCase):
+    def setUp(self):
+        old = timezone.now() - timedelta(days=400)
+        # 39500-A: old and new listings; 39500-OLD: only old listings, one of them a conflict
+        create_listing('39500-A', seller_is_business=True)
+        create_listing('39500-A', has_oem_reference=True)
+        create_listing('39500-A', vehicle_year=2007)
+        create_listing('39500-A', vehicle_year=2007, seller_feedback_count=800)
+        for year in (2006, 2006, 2007):
+            create_listing('39500-OLD', vehicle_year=year)
+        create_listing('39500-OLD', vehicle_make='Honda', vehicle_model='Accord')
+        RawListingData.objects.filter(part_number='39500-A', vehicle_year=2006).update(extraction_date=old)
+        RawListingData.objects.filter(part_number='39500-OLD').update(extraction_date=old)
+
+    def consensus(self):
+        return sorted(ConsensusFitment.objects.values_list(*CONSENSUS_FIELDS))
+
+    def archive(self):
+        result = archive_listings(older_than_days=180)
+        self.assertEqual(result['listings_archived'], 6)
+        return result
+
+    def test_consensus_is_unchanged_by_archiving(self):
+        for engine in (ENGINE_SQL, ENGINE_PYTHON):
+            with self.subTest(engine=engine):
+                processor = FitmentConsensusProcessor(engine=engine)
+                PartConsensusState.objects.all().delete()
+                enqueue_all_parts()
+                process_dirty_parts(processor)
+                before = self.consensus()
+
+                if not ArchivedListingGroup.objects.exists():
+                    self.archive()
+                self.assertEqual(RawListingData.objects.count(), 2)
+                # No per-listing delete signals
+                self.assertEqual(dirty_part_numbers(), [])
+
+                PartConsensusState.objects.all().delete()
+                self.assertEqual(enqueue_all_parts(), 2)
+                process_dirty_parts(processor)
+                self.assertEqual(self.consensus(), before)
+
+    def test_archived_links_are_removed(self):
+        processor = FitmentConsensusProcessor(engine=ENGINE_SQL)
+        process_dirty_parts(processor)
+        self.archive()
+
+        hot_ids = set(RawListingData.objects.values_list('id', flat=True))
+        through = ConsensusFitment.supporting_raw_listings.through
+        self.assertEqual(set(through.objects.values_list('rawlistingdata_id', flat=True)), hot_ids)
+        self.assertFalse(ConflictingFitment.conflicting_listings.through.objects.exists())
+
+    @override_settings(PARTS_INTERCHANGE={'PACKED_LISTING_IDS': True})
+    def test_archived_ids_are_removed_from_packed_links(self):
+        processor = FitmentConsensusProcessor(engine=ENGINE_SQL)
+        process_dirty_parts(processor)
+        self.assertEqual(ConflictingFitment.objects.get().get_listing_count(), 4)
+        self.archive()
+
+        hot_ids = set(RawListingData.objects.values_list('id', flat=True))
+        packed_ids = {
+            listing_id for fitment in ConsensusFitment.objects.all() for listing_id in fitment.get_listing_ids()
+        }
+        self.assertEqual(packed_ids, hot_ids)
+        self.assertEqual(ConflictingFitment.objects.get().get_listing_ids(), [])
+
+    @override_settings(PARTS_INTERCHANGE={'PACKED_LISTING_IDS': True})
+    def test_unpack_skips_missing_listings(self):
+        process_dirty_parts(FitmentConsensusProcessor(engine=ENGINE_SQL))
+        fitment = ConsensusFitment.objects.get(part_number='39500-A', vehicle_year=2007)
+        listing_ids = fitment.get_listing_ids()
+        fitment.set_listing_ids([*listing_ids, max(listing_ids) + 1000])
+        fitment.save()
+
+        call_command('pack_listing_links', '--unpack', stdout=StringIO())
+
+        through = ConsensusFitment.supporting_raw_listings.through
+        self.assertEqual(
+            sorted(through.objects.filter(consensusfitment=fitment).values_list('rawlistingdata_id', flat=True)),
+            listing_ids,
+        )
+
+    def test_archived_listings_count_towards_candidates(self):
+        self.archive()
+        processor = FitmentConsensusProcessor(engine=ENGINE_SQL)
+
+        result = processor.process_all_new_data(min_listings=4)
+
+        self.assertEqual(result['total_parts_processed'], 2)
+        self.assertTrue(ConsensusFitment.objects.filter(part_number='39500-OLD').exists())
@@ -0,0 +1,96 @@
+"""eBay JSONL importer: bulk natural-key resolution and the per-record fallback"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.db import DatabaseError
+from django.test import TestCase
+
+from apps.fitments.models import Fitment
+from apps.vehicles.models import Make, Model, Trim, Vehicle
+from ..models import Manufacturer, Part, PartCategory
+
+# The importer is a script in ebay_api/, next to the Django project
+sys.path.insert(0, str(Path(__file__).resolve().parents[4] / 'ebay_api'))
+from django_importer import EbayDjangoImporter  # noqa: E402
+
+
+def ebay_record(item_id, **fields):
+    return {
+        'ebay_item_id': item_id,
+        'title': '2005-2008 Acura TL AC Compressor',
+        'part_name': 'AC Compressor',
+        'part_number': '38810-RDA-A01',
+        'manufacturer': 'Acura',
+        'price': 189.99,
+        'condition': 'Used',
+        'fitments': [{'year': 2006, 'make': 'ACURA', 'model': ' tl ', 'trim': 'Base'}],
+        **fields,
+    }
+
+
+class EbayImporterTests(TestCase):
+    def setUp(self):
+        acura = Make.objects.create(name='Acura')
+        self.vehicle = Vehicle.objects.create(
+            year=2006, make=acura, model=Model.objects.create(make=acura, name='TL'),
+            trim=Trim.objects.create(name='Base'),
+        )
+        manufacturer = Manufacturer.objects.create(name='Acura', abbreviation='ACUR')
+        category = PartCategory.objects.create(name='HVAC & Climate Control')
+        self.existing = Part.objects.create(
+            manufacturer=manufacturer, category=category, part_number='EBAY-v1|1|0-38810-RDA-A01', name='Old name'
+        )
+
+        self.records = [
+            ebay_record('v1|1|0', part_name='AC Compressor Assembly'),  # Updates the existing part
+            ebay_record('v1|2|0'),
+            ebay_record('v1|3|0', manufacturer='Denso', fitments=[{'year': 2006, 'make': 'Acura', 'model': 'RL'}]),
+            ebay_record('v1|4|0', part_name=None),  # Skipped
+            ebay_record('v1|5|0', price='not a price'),  # Error
+        ]
+
+    def import_records(self, importer):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'parts.jsonl')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.writelines(json.dumps(record) + '\n' for record in self.records)
+            return importer.import_from_json(path)
+
+    def assert_imported(self, importer, summary):
+        self.assertEqual(
+            (summary['created_parts'], summary['updated_parts'], summary['skipped_parts'], summary['errors']),
+            (2, 1, 1, 1),
+        )
+        self.assertIn('v1|5|0', importer.errors[0])
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, 'AC Compressor Assembly')
+        self.assertEqual(Part.objects.get(part_number='EBAY-v1|3|0-38810-RDA-A01').manufacturer.name, 'Denso')
+        # Make/model/trim match case- and whitespace-insensitively; the RL is not in the vehicle table
+        self.assertEqual(
+            sorted(Fitment.objects.filter(vehicle=self.vehicle).values_list('part__part_number', flat=True)),
+            ['EBAY-v1|1|0-38810-RDA-A01', 'EBAY-v1|2|0-38810-RDA-A01'],
+        )
+        self.assertEqual(Fitment.objects.count(), 2)
+
+    def test_bulk_import_resolves_natural_keys(self):
+        importer = EbayDjangoImporter(batch_size=10)
+
+        # Lookups, the new manufacturer, then one transaction for the batch
+        with self.assertNumQueries(14):
+            summary = self.import_records(importer)
+
+        self.assert_imported(importer, summary)
+
+    def test_failed_batch_is_imported_record_by_record(self):
+        importer = EbayDjangoImporter(batch_size=10)
+
+        with mock.patch.object(Fitment.objects, 'bulk_create', side_effect=DatabaseError('deadlock detected')):
+            summary = self.import_records(importer)
+
+        self.assert_imported(importer, summary)
+        self.assertEqual(len(importer.part_ids), 3)
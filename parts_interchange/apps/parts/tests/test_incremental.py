@@ -0,0 +1,196 @@
+"""Dirty-part queue: fingerprints, leases and failed part numbers"""
+
+from unittest import mock
+import itertools
+
+from django.db import DatabaseError
+from django.test import TestCase
+
+from ..consensus import incremental
+from ..consensus.incremental import claim_dirty_parts, dirty_part_numbers, drain_queue, process_dirty_parts
+from ..consensus.processor import ENGINE_PYTHON, ENGINE_SQL, FitmentConsensusProcessor
+from ..consensus.writer import ConsensusWriter
+from ..models import ConsensusFitment, PartConsensusState, RawListingData
+from .helpers import create_listing
+
+
+class DirtyQueueTests(TestCase):
+    def setUp(self):
+        for part_number in ('39500-A', '39500-B'):
+            create_listing(part_number, seller_is_business=True)
+            create_listing(part_number, vehicle_year=2007)
+
+    def state(self, part_number):
+        return PartConsensusState.objects.get(part_number=part_number)
+
+    def test_listing_writes_queue_their_part_number(self):
+        self.assertEqual(sorted(dirty_part_numbers()), ['39500-A', '39500-B'])
+
+    def test_processing_clears_queue_and_records_fingerprint(self):
+        result = process_dirty_parts(FitmentConsensusProcessor(engine=ENGINE_SQL))
+
+        self.assertEqual(sorted(result['changed_parts']), ['39500-A', '39500-B'])
+        self.assertEqual(result['failed'], [])
+        self.assertEqual(dirty_part_numbers(), [])
+        state = self.state('39500-A')
+        self.assertTrue(state.input_fingerprint)
+        self.assertEqual(state.leased_by, '')
+        self.assertEqual(ConsensusFitment.objects.filter(part_number='39500-A').count(), 2)
+
+    def test_unchanged_inputs_are_skipped(self):
+        processor = FitmentConsensusProcessor(engine=ENGINE_SQL)
+        process_dirty_parts(processor)
+        create_listing('39500-A', vehicle_year=2008)
+        PartConsensusState.objects.filter(part_number='39500-B').update(needs_processing=True)
+
+        result = process_dirty_parts(processor)
+
+        self.assertEqual(result['changed_parts'], ['39500-A'])
+        self.assertEqual(result['unchanged_parts'], 1)
+
+    def test_failed_flush_keeps_whole_batch_queued(self):
+        processor = FitmentConsensusProcessor(engine=ENGINE_SQL)
+        with mock.patch.object(ConsensusWriter, 'flush', side_effect=DatabaseError('disk full')):
+            result = process_dirty_parts(processor)
+
+        self.assertEqual(sorted(result['failed']), ['39500-A', '39500-B'])
+        self.assertEqual(sorted(dirty_part_numbers()), ['39500-A', '39500-B'])
+        self.assertEqual(self.state('39500-A').input_fingerprint, '')
+
+        # Still leased, so an immediate retry does not pick them up again
+        self.assertEqual(claim_dirty_parts('other-worker'), [])
+
+    def test_failed_part_stays_queued_with_old_fingerprint(self):
+        processor = FitmentConsensusProcessor(engine=ENGINE_PYTHON)
+        process_dirty_parts(processor)
+        old_fingerprint = self.state('39500-A').input_fingerprint
+        create_listing('39500-A', vehicle_year=2008)
+        create_listing('39500-B', vehicle_year=2008)
+
+        process_part_number = processor.process_part_number
+
+        def fail_part_a(part_number, **kwargs):
+            if part_number == '39500-A':
+                raise DatabaseError('deadlock detected')
+            return process_part_number(part_number, **kwargs)
+
+        with mock.patch.object(processor, 'process_part_number', side_effect=fail_part_a):
+            result = process_dirty_parts(processor)
+
+        self.assertEqual(result['failed'], ['39500-A'])
+        self.assertEqual(dirty_part_numbers(), ['39500-A'])
+        self.assertEqual(self.state('39500-A').input_fingerprint, old_fingerprint)
+        self.assertNotEqual(self.state('39500-B').input_fingerprint, old_fingerprint)
+
+        # Once the lease has run out the part is processed again
+        PartConsensusState.objects.update(lease_expires_at=None)
+        result = process_dirty_parts(processor)
+        self.assertEqual(result['changed_parts'], ['39500-A'])
+        self.assertEqual(dirty_part_numbers(), [])
+
+    def test_scoring_parameters_change_fingerprint(self):
+        processor = FitmentConsensusProcessor(engine=ENGINE_SQL)
+        process_dirty_parts(processor)
+        PartConsensusState.objects.update(needs_processing=True)
+
+        processor.status_thresholds = (30, 50, 70)
+        result = process_dirty_parts(processor)
+
+        self.assertEqual(sorted(result['changed_parts']), ['39500-A', '39500-B'])
+
+
+class MovedListingTests(TestCase):
+    def test_changing_part_number_queues_both_and_drops_stale_groups(self):
+        for engine in (ENGINE_SQL, ENGINE_PYTHON):
+            with self.subTest(engine=engine):
+                ConsensusFitment.objects.all().delete()
+                create_listing('39500-A')
+                create_listing('39500-A')
+                moved = create_listing('39500-A', vehicle_year=2007)
+                create_listing('39500-A', vehicle_year=2007)
+                processor = FitmentConsensusProcessor(engine=engine)
+                process_dirty_parts(processor)
+                self.assertEqual(ConsensusFitment.objects.filter(part_number='39500-A').count(), 2)
+
+                RawListingData.objects.filter(part_number='39500-A', vehicle_year=2007).exclude(pk=moved.pk).delete()
+                moved = RawListingData.objects.get(pk=moved.pk)
+                moved.part_number = '39500-B'
+                moved.save()
+                self.assertEqual(sorted(dirty_part_numbers()), ['39500-A', '39500-B'])
+
+                process_dirty_parts(processor)
+                self.assertEqual(
+                    list(ConsensusFitment.objects.filter(part_number='39500-A').values_list('vehicle_year', flat=True)),
+                    [2006],
+                )
+                RawListingData.objects.all().delete()
+
+    def test_reviewed_groups_are_kept(self):
+        create_listing('39500-A')
+        create_listing('39500-A', vehicle_year=2007)
+        processor = FitmentConsensusProcessor(engine=ENGINE_SQL)
+        process_dirty_parts(processor)
+        ConsensusFitment.objects.filter(vehicle_year=2007).update(status='VERIFIED')
+
+        RawListingData.objects.filter(vehicle_year=2007).delete()
+        process_dirty_parts(processor)
+
+        self.assertEqual(
+            sorted(ConsensusFitment.objects.values_list('vehicle_year', 'status')),
+            [(2006, 'NEEDS_REVIEW'), (2007, 'VERIFIED')],
+        )
+
+    def test_reprocessing_keeps_reviewed_statuses(self):
+        for engine in (ENGINE_SQL, ENGINE_PYTHON):
+            with self.subTest(engine=engine):
+                ConsensusFitment.objects.all().delete()
+                create_listing('39500-A')
+                create_listing('39500-A', vehicle_year=2007)
+                processor = FitmentConsensusProcessor(engine=engine)
+                process_dirty_parts(processor)
+                ConsensusFitment.objects.filter(vehicle_year=2006).update(status='VERIFIED')
+                ConsensusFitment.objects.filter(vehicle_year=2007).update(status='REJECTED')
+
+                create_listing('39500-A')
+                create_listing('39500-A', vehicle_year=2007)
+                process_dirty_parts(processor)
+
+                self.assertEqual(
+                    sorted(ConsensusFitment.objects.values_list(
+                        'vehicle_year', 'status', 'supporting_listings_count')),
+                    [(2006, 'VERIFIED', 2), (2007, 'REJECTED', 2)],
+                )
+                RawListingData.objects.all().delete()
+
+
+class DrainQueueTests(TestCase):
+    def setUp(self):
+        for part_number in ('39500-A', '39500-B', '39500-C'):
+            create_listing(part_number)
+            create_listing(part_number, vehicle_year=2007)
+
+    def test_drains_in_claims(self):
+        result = drain_queue(FitmentConsensusProcessor(engine=ENGINE_SQL), claim_size=2)
+
+        self.assertEqual((result['claimed'], result['changed'], result['failed']), (3, 3, 0))
+        self.assertEqual(dirty_part_numbers(), [])
+        self.assertFalse(PartConsensusState.objects.exclude(leased_by='').exists())
+
+    def test_failed_parts_stay_queued(self):
+        processor = FitmentConsensusProcessor(engine=ENGINE_SQL)
+        with mock.patch.object(ConsensusWriter, 'flush', side_effect=DatabaseError('disk full')):
+            result = drain_queue(processor, claim_size=2)
+
+        self.assertEqual(result['failed'], 3)
+        self.assertEqual(sorted(dirty_part_numbers()), ['39500-A', '39500-B', '39500-C'])
+        self.assertFalse(PartConsensusState.objects.exclude(input_fingerprint='').exists())
+
+    def test_leases_are_extended_while_processing(self):
+        processor = FitmentConsensusProcessor(engine=ENGINE_PYTHON)
+        with mock.patch.object(incremental, 'extend_leases', wraps=incremental.extend_leases) as extend, \
+                mock.patch.object(incremental.time, 'monotonic', side_effect=itertools.count(step=100)):
+            drain_queue(processor, claim_size=3, lease_seconds=90)
+
+        # After fingerprinting and after each of the three part numbers
+        self.assertEqual(extend.call_count, 4)
+        self.assertEqual(dirty_part_numbers(), [])
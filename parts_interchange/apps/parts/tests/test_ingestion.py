@@ -0,0 +1,89 @@
+"""Bulk listing ingestion: validation and de-duplication"""
+
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from ..consensus.archive import archive_listings
+from ..consensus.incremental import dirty_part_numbers
+from ..ingestion import ListingIngestor
+from ..models import ArchivedListingGroup, PartPriceQueue, PartPriceRollup, RawListingData
+
+
+def listing_record(item_id='110001', **fields):
+    return {
+        'part_number': '38810-RCA-A01',
+        'vehicle_year': 2006,
+        'vehicle_make': 'Acura',
+        'vehicle_model': 'TL',
+        'source_ebay_item_id': item_id,
+        'listing_title': '04-08 Acura TL AC Compressor',
+        'listing_price': '189.99',
+        **fields,
+    }
+
+
+class ListingIngestorTests(TestCase):
+    def test_duplicates_within_a_batch_are_dropped(self):
+        result = ListingIngestor().ingest([
+            listing_record(),
+            listing_record(listing_title='same item and vehicle, new title'),
+            listing_record(vehicle_year=2007),  # Same item, other vehicle
+            listing_record('110002'),
+        ])
+
+        self.assertEqual((result['received'], result['inserted'], result['duplicates']), (4, 3, 1))
+        self.assertEqual(RawListingData.objects.count(), 3)
+
+    def test_stored_listings_are_not_inserted_again(self):
+        ListingIngestor().ingest([listing_record(), listing_record('110002')])
+
+        result = ListingIngestor().ingest([listing_record(), listing_record('110002'), listing_record('110003')])
+
+        self.assertEqual((result['inserted'], result['duplicates']), (1, 2))
+        self.assertEqual(RawListingData.objects.count(), 3)
+
+    def test_archived_listings_are_not_inserted_again(self):
+        ListingIngestor().ingest([listing_record(), listing_record('110002')])
+        RawListingData.objects.update(extraction_date=timezone.now() - timedelta(days=400))
+        archive_listings(older_than_days=180)
+
+        result = ListingIngestor().ingest([listing_record(), listing_record(vehicle_year=2007)])
+
+        self.assertEqual((result['inserted'], result['duplicates']), (1, 1))
+        self.assertEqual(RawListingData.objects.get().vehicle_year, 2007)
+        self.assertEqual(ArchivedListingGroup.objects.get().listing_count, 2)
+
+    def test_listings_without_item_id_are_rejected(self):
+        result = ListingIngestor().ingest([listing_record(''), listing_record(None)])
+
+        self.assertEqual((result['inserted'], result['invalid']), (0, 2))
+        self.assertEqual(result['errors'][0], {'index': 0, 'error': 'source_ebay_item_id is required'})
+
+    def test_invalid_records_are_reported_and_skipped(self):
+        result = ListingIngestor().ingest([
+            listing_record('110001', vehicle_year='abc'),
+            listing_record('110002', listing_price='-5'),
+            'not a listing',
+            listing_record('110004', seller_is_business='maybe'),
+            listing_record('110005', seller_is_business='yes', seller_feedback_count='250'),
+        ])
+
+        self.assertEqual((result['inserted'], result['invalid']), (1, 4))
+        self.assertEqual([error['index'] for error in result['errors']], [0, 1, 2, 3])
+        listing = RawListingData.objects.get()
+        self.assertTrue(listing.seller_is_business)
+        self.assertEqual(listing.seller_feedback_count, 250)
+        self.assertEqual(listing.fitment_hash, listing.compute_fitment_hash())
+
+    def test_inserted_part_numbers_are_queued(self):
+        result = ListingIngestor().ingest([listing_record(), listing_record('110002', part_number='38810-RDA-A01')])
+
+        self.assertEqual(result['part_numbers_queued'], 2)
+        self.assertEqual(sorted(dirty_part_numbers()), ['38810-RCA-A01', '38810-RDA-A01'])
+        # Prices are only queued; refresh_price_index recomputes them outside the request
+        self.assertEqual(
+            sorted(PartPriceQueue.objects.values_list('part_number', flat=True)), ['38810-RCA-A01', '38810-RDA-A01']
+        )
+        self.assertFalse(PartPriceRollup.objects.exists())
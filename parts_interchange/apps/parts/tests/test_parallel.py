@@ -0,0 +1,59 @@
+"""Several worker processes draining one dirty queue"""
+
+import multiprocessing
+import unittest
+
+from django.db import connection
+from django.test import TransactionTestCase
+
+from ..consensus.incremental import dirty_part_numbers
+from ..consensus.parallel import drain_in_parallel
+from ..consensus.processor import ENGINE_SQL, FitmentConsensusProcessor
+from ..models import ConflictingFitment, ConsensusFitment, PartConsensusState, RawListingData
+from .helpers import make_listing
+
+PART_COUNT = 40
+
+
+def shared_database():
+    """Worker processes see the test database: PostgreSQL, or SQLite in a file"""
+    if connection.vendor == 'sqlite':
+        return not connection.is_in_memory_db()
+    return True
+
+
+@unittest.skipUnless(shared_database(), "needs a test database worker processes can open")
+@unittest.skipUnless('fork' in multiprocessing.get_all_start_methods(), "workers inherit the test settings by fork")
+class DrainInParallelTests(TransactionTestCase):
+    def setUp(self):
+        self.start_method = multiprocessing.get_start_method(allow_none=True)
+        multiprocessing.set_start_method('fork', force=True)
+
+        listings = []
+        for index in range(PART_COUNT):
+            part_number = f'PAR-{index:03d}'
+            listings += [make_listing(part_number), make_listing(part_number, vehicle_year=2007)]
+            if index % 2:
+                # Cross-manufacturer conflict, so workers write conflicts concurrently
+                listings.append(make_listing(part_number, vehicle_make='Honda', vehicle_model='Accord'))
+        RawListingData.objects.bulk_create(listings)
+        PartConsensusState.objects.bulk_create(
+            [PartConsensusState(part_number=f'PAR-{index:03d}') for index in range(PART_COUNT)]
+        )
+
+    def tearDown(self):
+        multiprocessing.set_start_method(self.start_method, force=True)
+
+    def test_workers_drain_queue_once(self):
+        result = drain_in_parallel(FitmentConsensusProcessor(engine=ENGINE_SQL), workers=4, claim_size=3)
+
+        # Every part number claimed exactly once across the workers
+        self.assertEqual(result['claimed'], PART_COUNT)
+        self.assertEqual(result['changed'], PART_COUNT)
+        self.assertEqual(result['failed'], 0)
+        self.assertEqual(dirty_part_numbers(), [])
+        self.assertFalse(PartConsensusState.objects.exclude(leased_by='').exists())
+        self.assertEqual(
+            ConsensusFitment.objects.values('part_number').distinct().count(), PART_COUNT
+        )
+        self.assertEqual(ConflictingFitment.objects.count(), PART_COUNT // 2)
@@ -0,0 +1,109 @@
+"""Price index: queued recompute, archived prices and benchmark exclusion"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+
+from ..consensus.archive import archive_listings
+from ..models import PartPriceQueue, PartPriceRollup, RawListingData
+from ..pricing import mark_prices_dirty, refresh_price_rollups
+from .helpers import create_listing, make_listing
+
+
+def rollup(part_number, make='', model=''):
+    return PartPriceRollup.objects.get(part_number=part_number, vehicle_make=make, vehicle_model=model)
+
+
+class PriceRefreshTests(TestCase):
+    def test_part_and_vehicle_rollups(self):
+        create_listing('38810-A', listing_price=Decimal('100.00'))
+        create_listing('38810-A', listing_price=Decimal('300.00'), vehicle_make='honda', vehicle_model='accord')
+        create_listing('38810-A', listing_price=None)
+
+        refresh_price_rollups()
+
+        overall = rollup('38810-A')
+        self.assertEqual((overall.listing_count, overall.min_price, overall.max_price), (2, Decimal('100'), Decimal('300')))
+        self.assertEqual(overall.mean_price, Decimal('200.00'))
+        self.assertEqual(rollup('38810-A', 'HONDA', 'ACCORD').listing_count, 1)
+        self.assertFalse(PartPriceQueue.objects.exists())
+
+    def test_late_commits_updates_and_deletes_are_picked_up(self):
+        first = create_listing('38810-A', listing_price=Decimal('100.00'))
+        refresh_price_rollups()
+
+        # A listing with a lower id than one already indexed (a late commit)
+        late = make_listing('38810-A', listing_price=Decimal('50.00'))
+        late.id = first.id - 1 if first.id > 1 else first.id + 1000
+        late.save(force_insert=True)
+        refresh_price_rollups()
+        self.assertEqual(rollup('38810-A').listing_count, 2)
+
+        first.listing_price = Decimal('400.00')
+        first.save()
+        refresh_price_rollups()
+        self.assertEqual(rollup('38810-A').max_price, Decimal('400.00'))
+
+        late.delete()
+        refresh_price_rollups()
+        self.assertEqual((rollup('38810-A').listing_count, rollup('38810-A').min_price), (1, Decimal('400.00')))
+
+        first.delete()
+        refresh_price_rollups()
+        self.assertFalse(PartPriceRollup.objects.exists())
+
+    def test_moved_listing_leaves_its_old_part(self):
+        listing = create_listing('38810-A', listing_price=Decimal('100.00'))
+        refresh_price_rollups()
+
+        listing.part_number = '38810-B'
+        listing.save()
+        refresh_price_rollups()
+
+        self.assertFalse(PartPriceRollup.objects.filter(part_number='38810-A').exists())
+        self.assertEqual(rollup('38810-B').listing_count, 1)
+
+    def test_requeued_part_stays_queued(self):
+        create_listing('38810-A', listing_price=Decimal('100.00'))
+        queued_at = PartPriceQueue.objects.get().queued_at
+        PartPriceQueue.objects.update(queued_at=queued_at + timedelta(seconds=1))
+
+        from ..pricing import dequeue
+        dequeue([('38810-A', queued_at)])
+
+        self.assertTrue(PartPriceQueue.objects.exists())
+
+    def test_benchmark_listings_are_not_indexed(self):
+        create_listing('BENCH-00001', listing_price=Decimal('100.00'))
+        self.assertEqual(mark_prices_dirty(['BENCH-00001']), 0)
+
+        refresh_price_rollups(rebuild=True)
+
+        self.assertFalse(PartPriceRollup.objects.exists())
+
+
+class ArchivedPriceTests(TestCase):
+    def setUp(self):
+        create_listing('38810-A', listing_price=Decimal('100.00'))
+        create_listing('38810-A', listing_price=Decimal('500.00'))
+        create_listing('38810-A', listing_price=Decimal('200.00'))
+        old = timezone.now() - timedelta(days=400)
+        RawListingData.objects.filter(listing_price=Decimal('500.00')).update(extraction_date=old)
+
+    def test_archived_prices_stay_in_the_index(self):
+        archive_listings(older_than_days=180)
+        refresh_price_rollups()
+
+        overall = rollup('38810-A')
+        self.assertEqual((overall.listing_count, overall.max_price), (3, Decimal('500.00')))
+        self.assertEqual((overall.archived_count, overall.archived_price_sum), (1, Decimal('500.00')))
+
+        refresh_price_rollups(rebuild=True)
+        self.assertEqual(rollup('38810-A').listing_count, 3)
+
+        RawListingData.objects.all().delete()
+        refresh_price_rollups()
+        overall = rollup('38810-A')
+        self.assertEqual((overall.listing_count, overall.min_price), (1, Decimal('500.00')))
@@ -0,0 +1,90 @@
+"""Consensus promotion: incremental selection and vehicle resolution"""
+
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.admin.sites import AdminSite
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.fitments.models import Fitment
+from apps.vehicles.models import Make, Model, Trim, Vehicle
+from ..admin import ConsensusFitmentAdmin
+from ..consensus.incremental import process_dirty_parts
+from ..consensus.processor import ENGINE_SQL, FitmentConsensusProcessor
+from ..consensus.promotion import ConsensusPromoter
+from ..models import ConsensusFitment, ConsensusPromotionIssue, Manufacturer, Part, PartCategory
+from .helpers import create_listing
+
+
+class PromotableSinceTests(TestCase):
+    def setUp(self):
+        for _ in range(3):
+            create_listing('39500-A', seller_is_business=True, has_oem_reference=True)
+        create_listing('39500-A', vehicle_year=2007)
+        create_listing('39500-A', vehicle_year=2007)
+        self.processor = FitmentConsensusProcessor(engine=ENGINE_SQL)
+        process_dirty_parts(self.processor)
+
+        self.since = timezone.now()
+        ConsensusFitment.objects.update(last_updated=self.since - timedelta(days=1))
+
+    def promotable_years(self):
+        return sorted(ConsensusPromoter().promotable(self.since).values_list('vehicle_year', flat=True))
+
+    def test_admin_verification_is_promoted(self):
+        self.assertEqual(self.promotable_years(), [])
+
+        admin = ConsensusFitmentAdmin(ConsensusFitment, AdminSite())
+        with mock.patch.object(admin, 'message_user'):
+            admin.mark_verified(None, ConsensusFitment.objects.filter(vehicle_year=2007))
+
+        self.assertEqual(self.promotable_years(), [2007])
+
+    def test_rescore_touches_changed_rows_only(self):
+        statuses = dict(ConsensusFitment.objects.values_list('vehicle_year', 'status'))
+        self.assertEqual(statuses, {2006: 'HIGH_CONFIDENCE', 2007: 'LOW_CONFIDENCE'})
+
+        self.processor.status_thresholds = (30, 40, 55)
+        self.processor.rescore_consensus()
+
+        self.assertEqual(self.promotable_years(), [2007])
+        unchanged = ConsensusFitment.objects.get(vehicle_year=2006)
+        self.assertLess(unchanged.last_updated, self.since)
+
+
+class VehicleResolutionTests(TestCase):
+    def setUp(self):
+        acura = Make.objects.create(name='Acura')
+        tl = Model.objects.create(make=acura, name='TL')
+        self.vehicles = {
+            trim: Vehicle.objects.create(year=2006, make=acura, model=tl, trim=Trim.objects.create(name=trim))
+            for trim in ('Base', 'Type-S')
+        }
+        self.part = Part.objects.create(
+            manufacturer=Manufacturer.objects.create(name='Denso', abbreviation='DENS'),
+            category=PartCategory.objects.create(name='HVAC & Climate Control'),
+            part_number='39500-A',
+            name='AC Compressor',
+        )
+
+    def promote(self, trim):
+        for _ in range(3):
+            create_listing('39500-A', vehicle_trim=trim, seller_is_business=True, has_oem_reference=True)
+        process_dirty_parts(FitmentConsensusProcessor(engine=ENGINE_SQL))
+        return ConsensusPromoter().run(full=True)
+
+    def promoted_trims(self):
+        return sorted(Fitment.objects.filter(part=self.part).values_list('vehicle__trim__name', flat=True))
+
+    def test_blank_trim_is_promoted_to_every_trim(self):
+        stats = self.promote('')
+
+        self.assertEqual((stats['matched'], stats['unmatched']), (1, 0))
+        self.assertEqual(self.promoted_trims(), ['Base', 'Type-S'])
+        self.assertFalse(ConsensusPromotionIssue.objects.exists())
+
+    def test_trim_is_promoted_to_that_vehicle_only(self):
+        self.promote('type-s')
+
+        self.assertEqual(self.promoted_trims(), ['Type-S'])
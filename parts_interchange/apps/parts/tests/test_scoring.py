@@ -0,0 +1,83 @@
+"""Vectorized and SQL consensus scoring must match the scalar reference path"""
+
+from collections import defaultdict
+from decimal import Decimal
+import random
+
+from django.test import TestCase
+
+from ..consensus.processor import ENGINE_SQL, FitmentConsensusProcessor
+from ..consensus.scoring import quality_weights_milli
+from ..models import RawListingData
+from .helpers import make_listing
+
+FEEDBACK_VALUES = [None, 0, 1, -3, 123, 499, 500, 501, 999, 5000]
+
+
+def random_listings(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    return [
+        make_listing(
+            f'SCORE-{index % 7}',
+            vehicle_year=2000 + rng.randint(0, 3),
+            vehicle_make=rng.choice(['Ford', 'Honda']),
+            vehicle_model='Model',
+            source_ebay_item_id=str(index),
+            seller_feedback_count=rng.choice(FEEDBACK_VALUES + [rng.randint(0, 2000)]),
+            seller_is_business=rng.random() < 0.5,
+            is_verified_seller=rng.random() < 0.5,
+            has_oem_reference=rng.random() < 0.5,
+            has_detailed_description=rng.random() < 0.5,
+        )
+        for index in range(count)
+    ]
+
+
+class BatchScoringTests(TestCase):
+    def setUp(self):
+        self.processor = FitmentConsensusProcessor()
+        self.listings = random_listings(2000)
+
+    def assertMatchesScalar(self, batch, scalar):
+        self.assertEqual(batch['total_weight_score'], scalar['total_weight_score'])
+        self.assertEqual(batch['confidence_score'], scalar['confidence_score'].quantize(Decimal('0.01')))
+        self.assertEqual(batch['status'], scalar['status'])
+        self.assertEqual(batch['supporting_listings_count'], scalar['supporting_listings_count'])
+
+    def test_listing_weights(self):
+        weights = quality_weights_milli(
+            [listing.seller_feedback_count for listing in self.listings],
+            [listing.seller_is_business for listing in self.listings],
+            [listing.is_verified_seller for listing in self.listings],
+            [listing.has_oem_reference for listing in self.listings],
+            [listing.has_detailed_description for listing in self.listings],
+        )
+        for listing, weight in zip(self.listings, weights):
+            self.assertEqual(Decimal(int(weight)) / 1000, listing.calculate_quality_weight())
+
+    def test_vectorized_groups(self):
+        # Group sizes of 1-4 exercise the count bonus
+        fitment_groups = defaultdict(list)
+        for index, listing in enumerate(self.listings):
+            fitment_groups[f'{index // 4}|{listing.get_fitment_signature()}'].append(listing)
+
+        batch = self.processor.score_fitment_groups(fitment_groups)
+
+        self.assertEqual(batch.keys(), fitment_groups.keys())
+        for signature, group in fitment_groups.items():
+            with self.subTest(signature=signature):
+                self.assertMatchesScalar(batch[signature], self.processor.calculate_consensus(group))
+
+    def test_sql_groups(self):
+        RawListingData.objects.bulk_create(self.listings)
+        part_numbers = sorted({listing.part_number for listing in self.listings})
+        processor = FitmentConsensusProcessor(engine=ENGINE_SQL)
+
+        aggregated = processor.aggregate_fitment_groups(part_numbers)
+
+        for part_number in part_numbers:
+            groups = processor.group_by_fitment_signature(RawListingData.objects.filter(part_number=part_number))
+            self.assertEqual(aggregated[part_number].keys(), groups.keys())
+            for fitment_hash, group in groups.items():
+                with self.subTest(part_number=part_number, fitment_hash=fitment_hash):
+                    self.assertMatchesScalar(aggregated[part_number][fitment_hash], processor.calculate_consensus(group))
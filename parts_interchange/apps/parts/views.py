@@ -1,14 +1,16 @@
 from django.shortcuts import render
 from django.http import JsonResponse
-from .models import Part, InterchangeGroup
+from .models import Part
+from .stats import get_statistics
 
 
 def home(request):
     """Basic home page showing system status"""
+    stats = get_statistics()
     context = {
-        'total_parts': Part.objects.count(),
-        'total_manufacturers': Part.objects.values('manufacturer').distinct().count(),
-        'total_interchange_groups': InterchangeGroup.objects.count(),
+        'total_parts': stats['parts']['total'],
+        'total_manufacturers': stats['parts']['manufacturers'],
+        'total_interchange_groups': stats['interchange_groups'],
     }
     return render(request, 'parts/home.html', context)
 
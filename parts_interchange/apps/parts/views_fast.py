@@ -7,6 +7,7 @@ from django.db.models import Q
 from apps.parts.models import Part, Manufacturer, PartCategory
 from apps.vehicles.models import Vehicle, Make, Model
 from apps.fitments.models import Fitment
+from apps.parts.stats import get_statistics
 
 
 @staff_member_required
@@ -154,10 +155,11 @@ def autocomplete_categories(request):
 @staff_member_required
 def fast_dashboard(request):
     """Fast admin dashboard with key stats"""
+    snapshot = get_statistics()
     stats = {
-        'total_parts': Part.objects.filter(is_active=True).count(),
-        'total_vehicles': Vehicle.objects.filter(is_active=True).count(),
-        'total_fitments': Fitment.objects.count(),
+        'total_parts': snapshot['parts']['active'],
+        'total_vehicles': snapshot['vehicles']['active'],
+        'total_fitments': snapshot['fitments']['total'],
         'recent_parts': Part.objects.select_related('manufacturer').filter(is_active=True).order_by('-created_at')[:5]
     }
     
@@ -3,9 +3,9 @@ Django management command to explore NHTSA VIN decoding capabilities
 Usage: python manage.py explore_vin_data --vin <VIN> or --sample-vins
 """
 
-import requests
 import json
 from django.core.management.base import BaseCommand
+from parts_interchange.http_client import get_client
 
 
 class Command(BaseCommand):
@@ -61,7 +61,7 @@ class Command(BaseCommand):
         """Get list of all VIN decode variables available from NHTSA"""
         url = f'{self.base_url}/vehicles/GetVehicleVariableList?format=json'
         try:
-            response = requests.get(url, timeout=30)
+            response = get_client().get(url)
             response.raise_for_status()
             data = response.json()
             
@@ -130,7 +130,7 @@ class Command(BaseCommand):
         """Decode VIN using NHTSA API"""
         url = f'{self.base_url}/vehicles/DecodeVinValues/{vin}?format=json'
         try:
-            response = requests.get(url, timeout=30)
+            response = get_client().get(url)
             response.raise_for_status()
             data = response.json()
             
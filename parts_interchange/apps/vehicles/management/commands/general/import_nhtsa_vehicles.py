@@ -8,6 +8,7 @@ import time
 import re
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from parts_interchange.http_client import get_client
 from apps.vehicles.models import Make, Model, Engine, Trim, Vehicle
 
 
@@ -212,7 +213,7 @@ class Command(BaseCommand):
         """Get all vehicle makes from NHTSA"""
         url = f'{self.base_url}/vehicles/GetMakesForVehicleType/car?format=json'
         try:
-            response = requests.get(url, timeout=30)
+            response = get_client().get(url)
             response.raise_for_status()
             data = response.json()
             return data['Results']
@@ -224,7 +225,7 @@ class Command(BaseCommand):
         """Get models for a specific make and year (more accurate than just make)"""
         url = f'{self.base_url}/vehicles/GetModelsForMakeYear/make/{make_name}/modelyear/{year}?format=json'
         try:
-            response = requests.get(url, timeout=30)
+            response = get_client().get(url)
             response.raise_for_status()
             data = response.json()
             return data['Results']
@@ -236,7 +237,7 @@ class Command(BaseCommand):
         """Get all models for a specific make (fallback method)"""
         url = f'{self.base_url}/vehicles/GetModelsForMake/{make_name}?format=json'
         try:
-            response = requests.get(url, timeout=30)
+            response = get_client().get(url)
             response.raise_for_status()
             data = response.json()
             return data['Results']
@@ -248,7 +249,7 @@ class Command(BaseCommand):
         """Decode a VIN to get detailed specifications"""
         url = f'{self.base_url}/vehicles/DecodeVinValues/{vin}?format=json'
         try:
-            response = requests.get(url, timeout=10)
+            response = get_client().get(url, timeout=10)
             response.raise_for_status()
             data = response.json()
             
@@ -435,16 +436,3 @@ class Command(BaseCommand):
             except ValueError:
                 pass
         return None
-    
-    def handle_api_error(self, response, context=""):
-        """Handle API errors gracefully"""
-        if response.status_code == 429:  # Too Many Requests
-            self.stdout.write(f'Rate limited, waiting 60 seconds... {context}')
-            time.sleep(60)
-            return True  # Retry
-        elif response.status_code >= 500:
-            self.stdout.write(f'Server error ({response.status_code}), skipping... {context}')
-            return False  # Skip
-        else:
-            response.raise_for_status()
-            return False
@@ -3,10 +3,11 @@ VIN Pattern Generator for NHTSA API
 Generates VIN patterns for make/model/year combinations to get detailed specs
 """
 
-import requests
 import time
 from typing import List, Dict, Optional
 
+from parts_interchange.http_client import get_client
+
 
 class VINPatternGenerator:
     """Generate VIN patterns for make/model/year combinations"""
@@ -130,7 +131,7 @@ class VINPatternGenerator:
         """Decode a VIN pattern using NHTSA API"""
         url = f'{self.base_url}/vehicles/DecodeVinValues/{vin_pattern}?format=json'
         try:
-            response = requests.get(url, timeout=10)
+            response = get_client().get(url, timeout=10)
             response.raise_for_status()
             data = response.json()
             
@@ -0,0 +1,181 @@
+"""
+Shared HTTP client for outbound API calls (eBay, NHTSA)
+
+- One requests.Session per host, so keep-alive connections and TLS sessions are reused
+- Jittered exponential backoff on 429/5xx and connection errors, honoring Retry-After
+- In-memory OAuth client-credentials token cache keyed on expiry
+
+Plain requests only (no Django imports), so the standalone eBay scripts can use it too.
+"""
+
+import base64
+import random
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 30
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+TOKEN_REFRESH_MARGIN = 300  # Refresh tokens this many seconds before they expire
+
+
+class HttpClient:
+    """Per-host pooled sessions with retry and jittered exponential backoff"""
+
+    def __init__(self,
+                 max_retries: int = 3,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 60.0,
+                 pool_size: int = 10,
+                 timeout: float = DEFAULT_TIMEOUT,
+                 sleep=time.sleep):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.sleep = sleep
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def session(self, url: str) -> requests.Session:
+        """The pooled session for the scheme and host of url"""
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        session = self._sessions.get(host)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(host)
+                if session is None:
+                    session = requests.Session()
+                    session.mount(f"{parts.scheme}://", HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size))
+                    self._sessions[host] = session
+        return session
+
+    def backoff_delay(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        """Retry-After if the server sent one, else full-jitter exponential backoff"""
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request, retrying 429/5xx responses and connection errors up to max_retries times.
+
+        Returns the last response (the caller decides about raise_for_status); raises the
+        last connection error if every attempt failed to connect.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        session = self.session(url)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff_delay(attempt)
+                logger.warning(f"{method} {url} failed ({e}), retrying in {delay:.1f}s")
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    return response
+                delay = self.backoff_delay(attempt, response)
+                logger.warning(f"{method} {url} returned {response.status_code}, retrying in {delay:.1f}s")
+                response.close()
+            self.sleep(delay)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def get_json(self, url: str, **kwargs):
+        """GET and decode JSON; raises requests.HTTPError on an error status"""
+        response = self.get(url, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+class OAuthTokenCache:
+    """OAuth client-credentials tokens, cached in memory until shortly before they expire"""
+
+    def __init__(self, client: HttpClient = None, refresh_margin: int = TOKEN_REFRESH_MARGIN):
+        self.client = client
+        self.refresh_margin = refresh_margin
+        self._tokens: Dict[Tuple, Tuple[str, float]] = {}  # key -> (token, expires at, monotonic)
+        self._locks: Dict[Tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get_token(self, token_url: str, client_id: str, client_secret: str, scope: str) -> str:
+        """A valid access token, fetched once per expiry even when many threads ask at the same time"""
+        key = (token_url, client_id, scope)
+        cached = self._tokens.get(key)
+        if cached and time.monotonic() < cached[1]:
+            return cached[0]
+
+        with self._lock:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+        with key_lock:
+            cached = self._tokens.get(key)
+            if cached and time.monotonic() < cached[1]:
+                return cached[0]
+            token, expires_in = self.fetch_token(token_url, client_id, client_secret, scope)
+            self._tokens[key] = (token, time.monotonic() + max(expires_in - self.refresh_margin, 0))
+            return token
+
+    def fetch_token(self, token_url: str, client_id: str, client_secret: str, scope: str) -> Tuple[str, int]:
+        logger.info(f"Requesting OAuth token from {token_url}")
+        credentials = base64.b64encode(f"{client_id}:{client_secret}".encode()).decode()
+        response = (self.client or get_client()).post(
+            token_url,
+            headers={
+                'Content-Type': 'application/x-www-form-urlencoded',
+                'Authorization': f'Basic {credentials}',
+            },
+            data={'grant_type': 'client_credentials', 'scope': scope},
+        )
+        response.raise_for_status()
+        data = response.json()
+        return data['access_token'], int(data.get('expires_in', 7200))
+
+    def invalidate(self, token_url: str, client_id: str, scope: str):
+        """Drop a cached token, e.g. after the API rejected it with 401"""
+        self._tokens.pop((token_url, client_id, scope), None)
+
+
+_client = None
+_token_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    """The process-wide HttpClient"""
+    global _client
+    if _client is None:
+        with _shared_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
+
+
+def get_token_cache() -> OAuthTokenCache:
+    """The process-wide OAuthTokenCache"""
+    global _token_cache
+    if _token_cache is None:
+        with _shared_lock:
+            if _token_cache is None:
+                _token_cache = OAuthTokenCache()
+    return _token_cache
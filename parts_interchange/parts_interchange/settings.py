@@ -188,7 +188,8 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/hour',  # Reduced from 200 for stability
-        'user': '500/hour'   # Reduced from 1000 for stability
+        'user': '500/hour',  # Reduced from 1000 for stability
+        'listing_ingest': '600/minute',  # Crawler batches to /api/ingest/listings/
     },
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
@@ -332,6 +333,9 @@ PARTS_INTERCHANGE = {
     'CACHE_TIMEOUT_LONG': 7200,   # 2 hours
     'DB_QUERY_TIMEOUT': 15,       # 15 seconds max query time (reduced)
     'ADMIN_LIST_PER_PAGE': 10,    # Smaller pages for faster loading
+    'PACKED_LISTING_IDS': False,  # Store consensus/conflict listing links as packed id blobs
+    'INGEST_MAX_BATCH_SIZE': 10000,  # Listings per /api/ingest/listings/ request
+    'RAW_LISTING_HOT_DAYS': 180,  # archive_raw_listings folds older listings into ArchivedListingGroup
 }
 
 # Silence system check warnings and info messages
@@ -182,10 +182,21 @@ def test_phase2_implementation():
                 pass
             return False
     
-    # Test 5: Check file structure
-    print("\n✅ Test 5: File Structure")
+    # Test 5: Batch scoring matches the scalar Decimal path
+    print("\n✅ Test 5: Batch Scoring")
+    try:
+        if not check_batch_scoring(processor):
+            return False
+        print("   ✅ Batch scoring matches scalar scoring")
+    except Exception as e:
+        print(f"   ❌ Batch scoring test failed: {e}")
+        return False
+    
+    # Test 6: Check file structure
+    print("\n✅ Test 6: File Structure")
     required_files = [
         'parts_interchange/apps/parts/consensus/processor.py',
+        'parts_interchange/apps/parts/consensus/scoring.py',
         'parts_interchange/apps/parts/management/commands/process_consensus_fitments.py',
         'parts_interchange/apps/parts/management/commands/review_fitment_conflicts.py',
         'parts_interchange/apps/parts/management/commands/consensus_quality_analysis.py',
@@ -220,6 +231,64 @@ def test_phase2_implementation():
     return True
 
 
+def check_batch_scoring(processor, listing_count=5000, seed=42):
+    """Compare NumPy batch scores with calculate_quality_weight/calculate_consensus"""
+    import random
+    from collections import defaultdict
+    from apps.parts.consensus.scoring import quality_weights_milli
+    
+    rng = random.Random(seed)
+    feedback_values = [None, 0, 1, -3, 123, 499, 500, 501, 999, 5000]
+    listings = [
+        RawListingData(
+            part_number='SCORE',
+            vehicle_year=2000 + rng.randint(0, 3),
+            vehicle_make=rng.choice(['Ford', 'Honda']),
+            vehicle_model='Model',
+            seller_feedback_count=rng.choice(feedback_values + [rng.randint(0, 2000)]),
+            seller_is_business=rng.random() < 0.5,
+            is_verified_seller=rng.random() < 0.5,
+            has_oem_reference=rng.random() < 0.5,
+            has_detailed_description=rng.random() < 0.5
+        )
+        for _ in range(listing_count)
+    ]
+    
+    # Per-listing weights
+    weights = quality_weights_milli(
+        [listing.seller_feedback_count for listing in listings],
+        [listing.seller_is_business for listing in listings],
+        [listing.is_verified_seller for listing in listings],
+        [listing.has_oem_reference for listing in listings],
+        [listing.has_detailed_description for listing in listings]
+    )
+    mismatches = sum(
+        1 for listing, weight in zip(listings, weights)
+        if Decimal(int(weight)) / 1000 != listing.calculate_quality_weight()
+    )
+    
+    # Per-group consensus; group sizes of 1-4 exercise the count bonus
+    fitment_groups = defaultdict(list)
+    for index, listing in enumerate(listings):
+        fitment_groups[f'{index // 4}|{listing.get_fitment_signature()}'].append(listing)
+    
+    batch = processor.score_fitment_groups(fitment_groups)
+    for signature, group in fitment_groups.items():
+        scalar = processor.calculate_consensus(group)
+        scalar_confidence = scalar['confidence_score'].quantize(Decimal('0.01'))
+        if (batch[signature]['total_weight_score'] != scalar['total_weight_score']
+                or batch[signature]['confidence_score'] != scalar_confidence
+                or batch[signature]['status'] != scalar['status']
+                or batch[signature]['supporting_listings_count'] != scalar['supporting_listings_count']):
+            mismatches += 1
+    
+    print(f"   Compared {listing_count} listing weights and {len(fitment_groups)} group scores")
+    if mismatches:
+        print(f"   ❌ {mismatches} batch/scalar mismatches")
+        return False
+    return True
+
+
 if __name__ == '__main__':
     success = test_phase2_implementation()
     if success: